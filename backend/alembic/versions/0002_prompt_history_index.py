@@ -0,0 +1,18 @@
+"""Index prompts by user and creation time for history pages and imports
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 09:00:00
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_index("ix_prompts_user_id_created_at", "prompts", ["user_id", "created_at"])
+
+def downgrade() -> None:
+    op.drop_index("ix_prompts_user_id_created_at", table_name="prompts")
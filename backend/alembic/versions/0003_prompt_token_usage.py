@@ -0,0 +1,21 @@
+"""Record prompt and completion token usage per lesson
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column("prompts", sa.Column("prompt_tokens", sa.Integer(), nullable=True))
+    op.add_column("prompts", sa.Column("completion_tokens", sa.Integer(), nullable=True))
+
+def downgrade() -> None:
+    op.drop_column("prompts", "completion_tokens")
+    op.drop_column("prompts", "prompt_tokens")
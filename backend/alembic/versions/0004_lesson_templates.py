@@ -0,0 +1,23 @@
+"""Per-category and per-subcategory system prompts and lesson lengths
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column("categories", sa.Column("system_prompt", sa.Text(), nullable=True))
+    op.add_column("sub_categories", sa.Column("system_prompt", sa.Text(), nullable=True))
+    op.add_column("sub_categories", sa.Column("lesson_tokens", sa.Integer(), nullable=True))
+
+def downgrade() -> None:
+    op.drop_column("sub_categories", "lesson_tokens")
+    op.drop_column("sub_categories", "system_prompt")
+    op.drop_column("categories", "system_prompt")
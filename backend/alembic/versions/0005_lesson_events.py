@@ -0,0 +1,31 @@
+"""Outbox of lesson_ready events for WebSocket delivery and replay
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "lesson_events",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("prompt_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["prompt_id"], ["prompts.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_lesson_events_id", "lesson_events", ["id"])
+    op.create_index("ix_lesson_events_created_at", "lesson_events", ["created_at"])
+    op.create_index("ix_lesson_events_user_id_id", "lesson_events", ["user_id", "id"])
+
+def downgrade() -> None:
+    op.drop_table("lesson_events")
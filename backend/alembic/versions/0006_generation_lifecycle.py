@@ -0,0 +1,42 @@
+"""Track each prompt's generation status, model and timings
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # sqlite cannot add a column with a non-constant default, so rebuild the table there
+    recreate = "always" if op.get_bind().dialect.name == "sqlite" else "auto"
+    with op.batch_alter_table("prompts", recreate=recreate) as batch:
+        batch.add_column(sa.Column("status", sa.String(16), server_default="queued", nullable=False))
+        batch.add_column(sa.Column("model", sa.String(100), nullable=True))
+        batch.add_column(sa.Column("enqueued_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True))
+        batch.add_column(sa.Column("started_at", sa.DateTime(timezone=True), nullable=True))
+        batch.add_column(sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True))
+
+    # Older rows: lessons that exist are done (or the canned fallback), the rest never finished
+    op.execute(
+        "UPDATE prompts SET enqueued_at = created_at, status = CASE"
+        " WHEN response IS NULL THEN 'queued'"
+        " WHEN response LIKE '%This is a comprehensive lesson about **%' THEN 'fallback'"
+        " ELSE 'done' END"
+    )
+    op.create_index("ix_prompts_status_enqueued_at", "prompts", ["status", "enqueued_at"])
+    op.create_index("ix_prompts_finished_at", "prompts", ["finished_at"])
+
+def downgrade() -> None:
+    op.drop_index("ix_prompts_finished_at", table_name="prompts")
+    op.drop_index("ix_prompts_status_enqueued_at", table_name="prompts")
+    op.drop_column("prompts", "finished_at")
+    op.drop_column("prompts", "started_at")
+    op.drop_column("prompts", "enqueued_at")
+    op.drop_column("prompts", "model")
+    op.drop_column("prompts", "status")
@@ -0,0 +1,25 @@
+"""Count lesson sweeper retries and index prompts still waiting for a lesson
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column("prompts", sa.Column("attempts", sa.Integer(), server_default="0", nullable=False))
+    op.create_index(
+        "ix_prompts_retryable_id", "prompts", ["id"],
+        postgresql_where=sa.text("status <> 'done'"),
+        sqlite_where=sa.text("status <> 'done'")
+    )
+
+def downgrade() -> None:
+    op.drop_index("ix_prompts_retryable_id", table_name="prompts")
+    op.drop_column("prompts", "attempts")
@@ -0,0 +1,76 @@
+"""Keep users.prompt_count in step with prompts; trigram indexes for admin search
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+# Statement-level triggers, so bulk imports update each user once per statement
+POSTGRES_TRIGGERS = [
+    """
+    CREATE OR REPLACE FUNCTION prompts_count_inserted() RETURNS trigger AS $$
+    BEGIN
+        UPDATE users SET prompt_count = users.prompt_count + added.count
+        FROM (SELECT user_id, count(*) AS count FROM new_prompts GROUP BY user_id) AS added
+        WHERE users.id = added.user_id;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION prompts_count_deleted() RETURNS trigger AS $$
+    BEGIN
+        UPDATE users SET prompt_count = greatest(users.prompt_count - removed.count, 0)
+        FROM (SELECT user_id, count(*) AS count FROM old_prompts GROUP BY user_id) AS removed
+        WHERE users.id = removed.user_id;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "CREATE TRIGGER prompts_count_insert AFTER INSERT ON prompts"
+    " REFERENCING NEW TABLE AS new_prompts FOR EACH STATEMENT EXECUTE FUNCTION prompts_count_inserted()",
+    "CREATE TRIGGER prompts_count_delete AFTER DELETE ON prompts"
+    " REFERENCING OLD TABLE AS old_prompts FOR EACH STATEMENT EXECUTE FUNCTION prompts_count_deleted()",
+]
+
+SQLITE_TRIGGERS = [
+    "CREATE TRIGGER prompts_count_insert AFTER INSERT ON prompts BEGIN"
+    " UPDATE users SET prompt_count = prompt_count + 1 WHERE id = NEW.user_id; END",
+    "CREATE TRIGGER prompts_count_delete AFTER DELETE ON prompts BEGIN"
+    " UPDATE users SET prompt_count = max(prompt_count - 1, 0) WHERE id = OLD.user_id; END",
+]
+
+TRIGRAM_COLUMNS = ("username", "full_name", "email", "phone")
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    op.add_column("users", sa.Column("prompt_count", sa.Integer(), server_default="0", nullable=False))
+    op.execute("UPDATE users SET prompt_count = (SELECT count(*) FROM prompts WHERE prompts.user_id = users.id)")
+
+    for statement in {"postgresql": POSTGRES_TRIGGERS, "sqlite": SQLITE_TRIGGERS}.get(dialect, []):
+        op.execute(statement)
+
+    if dialect == "postgresql":
+        # Admin search matches ILIKE '%term%' anywhere in these columns
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for column in TRIGRAM_COLUMNS:
+            op.execute(f"CREATE INDEX ix_users_{column}_trgm ON users USING gin ({column} gin_trgm_ops)")
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        for column in TRIGRAM_COLUMNS:
+            op.execute(f"DROP INDEX IF EXISTS ix_users_{column}_trgm")
+    op.execute("DROP TRIGGER IF EXISTS prompts_count_insert" + (" ON prompts" if dialect == "postgresql" else ""))
+    op.execute("DROP TRIGGER IF EXISTS prompts_count_delete" + (" ON prompts" if dialect == "postgresql" else ""))
+    if dialect == "postgresql":
+        op.execute("DROP FUNCTION IF EXISTS prompts_count_inserted()")
+        op.execute("DROP FUNCTION IF EXISTS prompts_count_deleted()")
+    op.drop_column("users", "prompt_count")
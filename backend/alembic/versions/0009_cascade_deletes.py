@@ -0,0 +1,74 @@
+"""Cascade deletes from users, categories and subcategories; index every foreign key
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+# (table, column, referred table)
+FOREIGN_KEYS = [
+    ("prompts", "user_id", "users"),
+    ("prompts", "category_id", "categories"),
+    ("prompts", "sub_category_id", "sub_categories"),
+    ("sub_categories", "category_id", "categories"),
+]
+
+# Rebuilding prompts on sqlite drops its triggers; these match revision 0008
+SQLITE_TRIGGERS = [
+    "CREATE TRIGGER prompts_count_insert AFTER INSERT ON prompts BEGIN"
+    " UPDATE users SET prompt_count = prompt_count + 1 WHERE id = NEW.user_id; END",
+    "CREATE TRIGGER prompts_count_delete AFTER DELETE ON prompts BEGIN"
+    " UPDATE users SET prompt_count = max(prompt_count - 1, 0) WHERE id = OLD.user_id; END",
+]
+
+# Postgres named the baseline foreign keys <table>_<column>_fkey; these are the
+# names sqlite batch mode gives the unnamed foreign keys it reflects
+SQLITE_NAMING = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+def _set_ondelete(ondelete) -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        for table, column, referred in FOREIGN_KEYS:
+            name = f"{table}_{column}_fkey"
+            rule = f" ON DELETE {ondelete}" if ondelete else ""
+            op.execute(f"ALTER TABLE {table} DROP CONSTRAINT {name}")
+            # NOT VALID + VALIDATE avoids holding an exclusive lock while existing rows are checked
+            op.execute(
+                f"ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY ({column}) "
+                f"REFERENCES {referred} (id){rule} NOT VALID"
+            )
+            op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
+        return
+
+    op.drop_index("ix_prompts_retryable_id", table_name="prompts")
+    for table in ("prompts", "sub_categories"):
+        with op.batch_alter_table(table, recreate="always", naming_convention=SQLITE_NAMING) as batch:
+            for fk_table, column, referred in FOREIGN_KEYS:
+                if fk_table != table:
+                    continue
+                name = f"fk_{table}_{column}_{referred}"
+                batch.drop_constraint(name, type_="foreignkey")
+                batch.create_foreign_key(name, referred, [column], ["id"], ondelete=ondelete)
+    op.create_index("ix_prompts_retryable_id", "prompts", ["id"], sqlite_where=sa.text("status <> 'done'"))
+    for statement in SQLITE_TRIGGERS:
+        op.execute(statement)
+
+def upgrade() -> None:
+    _set_ondelete("CASCADE")
+    op.create_index("ix_prompts_category_id", "prompts", ["category_id"])
+    op.create_index("ix_prompts_sub_category_id", "prompts", ["sub_category_id"])
+    op.create_index("ix_sub_categories_category_id", "sub_categories", ["category_id"])
+    op.create_index("ix_lesson_events_prompt_id", "lesson_events", ["prompt_id"])
+
+def downgrade() -> None:
+    op.drop_index("ix_lesson_events_prompt_id", table_name="lesson_events")
+    op.drop_index("ix_sub_categories_category_id", table_name="sub_categories")
+    op.drop_index("ix_prompts_sub_category_id", table_name="prompts")
+    op.drop_index("ix_prompts_category_id", table_name="prompts")
+    _set_ondelete(None)
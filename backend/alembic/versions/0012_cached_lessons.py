@@ -0,0 +1,36 @@
+"""Pre-generated lessons for popular prompts
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19 09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "cached_lessons",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("sub_category_id", sa.Integer(), nullable=False),
+        sa.Column("prompt_hash", sa.String(64), nullable=False),
+        sa.Column("prompt", sa.Text(), nullable=False),
+        sa.Column("response", sa.Text(), nullable=False),
+        sa.Column("model", sa.String(), nullable=True),
+        sa.Column("prompt_tokens", sa.Integer(), nullable=True),
+        sa.Column("completion_tokens", sa.Integer(), nullable=True),
+        sa.Column("popularity", sa.Integer(), nullable=False),
+        sa.Column("hits", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("generated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(["sub_category_id"], ["sub_categories.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("sub_category_id", "prompt_hash", name="uq_cached_lessons_sub_category_id_prompt_hash"),
+    )
+    op.create_index("ix_cached_lessons_id", "cached_lessons", ["id"])
+
+def downgrade() -> None:
+    op.drop_table("cached_lessons")
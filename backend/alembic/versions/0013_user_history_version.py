@@ -0,0 +1,19 @@
+"""Per-user history version for the learning history cache
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-19 09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0013"
+down_revision = "0012"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("history_version", sa.Integer(), server_default="0", nullable=False))
+
+def downgrade() -> None:
+    op.drop_column("users", "history_version")
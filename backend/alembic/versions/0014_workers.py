@@ -0,0 +1,30 @@
+"""Worker heartbeats and the worker holding each queued prompt
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-19 09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0014"
+down_revision = "0013"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "workers",
+        sa.Column("id", sa.String(32), nullable=False),
+        sa.Column("hostname", sa.String(255), nullable=False),
+        sa.Column("pid", sa.Integer(), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("seen_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_workers_seen_at", "workers", ["seen_at"])
+    op.add_column("prompts", sa.Column("worker_id", sa.String(32), nullable=True))
+
+def downgrade() -> None:
+    op.drop_column("prompts", "worker_id")
+    op.drop_table("workers")
@@ -1,37 +1,37 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
-import os
-from dotenv import load_dotenv
 
-from app.database import get_db
+from app.config import get_settings
+from app.database import get_db, open_read_session
+from app.logging_config import bind_log_context
 from app.models.user import User
 from app.schemas.user import TokenData
 
-load_dotenv()
-
 # Configuration
-SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
+@lru_cache()
+def get_pwd_context():
+    """Password hashing context, created on first use"""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """Hash a password"""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
@@ -39,10 +39,10 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = datetime.utcnow() + timedelta(minutes=get_settings().access_token_expire_minutes)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, get_settings().secret_key, algorithm=ALGORITHM)
     return encoded_jwt
 
 def get_user_by_username(db: Session, username: str) -> Optional[User]:
@@ -58,6 +58,18 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
         return None
     return user
 
+def get_user_from_token(db: Session, token: str) -> Optional[User]:
+    """Resolve a JWT access token to its user, or None if it is invalid"""
+    try:
+        payload = jwt.decode(token, get_settings().secret_key, algorithms=[ALGORITHM])
+        username: str = payload.get("sub")
+        if username is None:
+            return None
+        token_data = TokenData(username=username)
+    except JWTError:
+        return None
+    return get_user_by_username(db, username=token_data.username)
+
 async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
     """Get current user from JWT token"""
     credentials_exception = HTTPException(
@@ -66,18 +78,13 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
-        raise credentials_exception
-    
-    user = get_user_by_username(db, username=token_data.username)
+    user = get_user_from_token(db, token)
     if user is None:
         raise credentials_exception
+    # Hand the connection back to the pool; the user stays loaded (detached) and
+    # the route's own queries check out a connection only when they run
+    db.close()
+    bind_log_context(user_id=user.id)
     return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
@@ -93,4 +100,12 @@ async def get_current_admin_user(current_user: User = Depends(get_current_active
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
         )
-    return current_user
\ No newline at end of file
+    return current_user
+
+def get_read_db(current_user: User = Depends(get_current_active_user)):
+    """Session for read-only endpoints, served by a read replica when one is configured"""
+    db = open_read_session()
+    try:
+        yield db
+    finally:
+        db.close()
\ No newline at end of file
@@ -0,0 +1,48 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+def make_etag(body: bytes) -> str:
+    """Strong validator for an exact response body"""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison: compression turns our strong ETags into W/ ones
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+def cached_json_response(
+    request: Request,
+    body: bytes,
+    last_modified: Optional[datetime] = None,
+    cache_control: str = "private, no-cache"
+) -> Response:
+    """JSON response with ETag/Last-Modified that answers conditional requests with 304"""
+    etag = make_etag(body)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    else:
+        not_modified = bool(if_modified_since and last_modified and _not_modified_since(if_modified_since, last_modified))
+    if not_modified:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
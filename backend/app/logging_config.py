@@ -0,0 +1,184 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import get_settings
+
+# Fields such as request_id and user_id attached to every record logged in this context.
+# A dict, so a dependency running deeper in the request can add the user for everything after it.
+_log_context: contextvars.ContextVar[Optional[Dict]] = contextvars.ContextVar("log_context", default=None)
+
+# Attributes every LogRecord has; anything else came in through extra= and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+def current_log_context() -> Dict:
+    return dict(_log_context.get() or {})
+
+def bind_log_context(**fields) -> None:
+    """Add fields to the current context, visible to the rest of the request and its background tasks"""
+    context = _log_context.get()
+    if context is None:
+        _log_context.set(fields)
+    else:
+        context.update(fields)
+
+@contextmanager
+def log_context(**fields):
+    """Fields layered over the current context for the duration of the block"""
+    token = _log_context.set({**current_log_context(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of high-volume INFO records, those logged with extra={"sample": True}
+
+    Warnings and errors are never dropped. Kept records carry sample_rate so
+    counts can be scaled back up.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "sample", False) or record.levelno > logging.INFO:
+            return True
+        record.sample_rate = self.rate
+        return random.random() < self.rate
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records with their request context; formatting and I/O happen on the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        # Resolve everything that depends on the caller's state before the record crosses threads
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        for key, value in current_log_context().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return record
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key != "sample":
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    """Readable lines for local development, context fields appended as key=value"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = " ".join(
+            f"{key}={value}" for key, value in vars(record).items()
+            if key not in _RECORD_ATTRIBUTES and key != "sample"
+        )
+        return f"{line} [{fields}]" if fields else line
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[ContextQueueHandler] = None
+
+def configure_logging() -> None:
+    """Route the root logger through a queue drained by a background thread; safe to call twice"""
+    global _listener, _handler
+    if _listener is not None:
+        return
+    settings = get_settings()
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if settings.log_format == "json" else TextFormatter())
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _handler = ContextQueueHandler(log_queue)
+    _handler.addFilter(SamplingFilter(settings.log_sample_rate))
+
+    root = logging.getLogger()
+    root.handlers = [_handler]
+    root.setLevel(settings.log_level.upper())
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener, _handler
+    if _listener is not None:
+        logging.getLogger().removeHandler(_handler)
+        _listener.stop()
+        _listener, _handler = None, None
+
+logger = logging.getLogger("app.requests")
+
+class RequestContextMiddleware:
+    """Gives every request an id (X-Request-ID, taken from the client or generated) for its logs"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        started = time.perf_counter()
+        status_code = None
+
+        async def send_with_request_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append("X-Request-ID", request_id)
+            await send(message)
+            # Logged once the body is sent, so background tasks after the response are not counted
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                logger.info(
+                    "%s %s %s", scope["method"], scope["path"], status_code,
+                    extra={
+                        "sample": True,
+                        "status": status_code,
+                        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                    }
+                )
+
+        token = _log_context.set({"request_id": request_id})
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            _log_context.reset(token)
\ No newline at end of file
@@ -1,42 +1,111 @@
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
-import os
-from dotenv import load_dotenv
 
-from app.database import engine
-from app.models import user, category, prompt
-from app.routes import users, categories, prompts, auth
+from app.config import get_settings
+from app.database import dispose_engine, init_db
+from app.logging_config import RequestContextMiddleware, configure_logging, stop_logging
+from app.middleware import CompressionMiddleware, ReadYourWritesMiddleware
+from app.profiling import ProfilingMiddleware
+from app.query_stats import QueryStatsMiddleware
+from app.routes import users, categories, prompts, auth, events, admin, bootstrap
+from app.services.ai_service import close_ai_service, get_ai_service
+from app.services.idempotency import start_idempotency_purge, stop_idempotency_purge
+from app.services.lesson_cache import start_hits_flush, stop_hits_flush
+from app.services.lesson_events import lesson_event_hub
+from app.services.lesson_sweeper import stop_sweep_job
+from app.services.template_registry import template_registry
+from app.services.worker_registry import start_worker_heartbeat, stop_worker_heartbeat
 
-# Load environment variables
-load_dotenv()
+settings = get_settings()
+logger = logging.getLogger(__name__)
 
-# Create database tables
-user.Base.metadata.create_all(bind=engine)
-category.Base.metadata.create_all(bind=engine)
-prompt.Base.metadata.create_all(bind=engine)
+def load_templates():
+    """Precompile system message templates once per process"""
+    try:
+        count = template_registry.reload()
+        logger.info("Loaded %s system message templates", count)
+    except Exception:
+        # Templates are compiled on demand until the next refresh succeeds
+        logger.exception("Error loading system message templates")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Per-worker startup and graceful shutdown"""
+    # JSON logs written by a background thread, so log I/O never blocks the event loop.
+    # Started here rather than at import so the thread belongs to the worker process.
+    configure_logging()
+    # Single-process development; deployments migrate once with init_db.py and turn this off
+    if settings.auto_create_tables:
+        init_db()
+    load_templates()
+    # Registered before serving, so prompts queued here are never mistaken for orphans
+    await start_worker_heartbeat()
+    await lesson_event_hub.start()
+    start_idempotency_purge()
+    start_hits_flush()
+    
+    yield
+    
+    await stop_sweep_job()
+    await stop_idempotency_purge()
+    await stop_hits_flush()
+    # Seconds to let in-flight lesson generations finish on shutdown
+    remaining = await get_ai_service().drain(settings.shutdown_drain_seconds)
+    if remaining:
+        logger.warning("Shutting down with %s lesson generation(s) still running", remaining)
+    # Whatever is still queued here is left to the lesson sweeper
+    await stop_worker_heartbeat()
+    await lesson_event_hub.stop()
+    await close_ai_service()
+    dispose_engine()
+    stop_logging()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="AI Learning Platform API",
     description="A REST API for managing users, categories, and AI-generated learning content with JWT authentication",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
+# Compress JSON payloads such as lesson history (brotli when installed, else gzip)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_min_bytes)
+
+# Opt-in: route labels for the sampling profiler; not installed at all when disabled
+if settings.profiling_enabled:
+    app.add_middleware(ProfilingMiddleware)
+
+# Tag SQL statements with the route that issued them for the slow-query stats
+if settings.query_stats_enabled:
+    app.add_middleware(QueryStatsMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://127.0.0.1:3000"],
+    allow_origins=settings.cors_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Last-Write"],
 )
 
+# Read-your-writes across workers: keeps a client that just wrote on the primary
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Outermost: request id (X-Request-ID) and user id on every log line of the request
+app.add_middleware(RequestContextMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(categories.router, prefix="/api/categories", tags=["categories"])
 app.include_router(prompts.router, prefix="/api/prompts", tags=["prompts"])
+app.include_router(events.router, prefix="/api/ws", tags=["events"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
+app.include_router(bootstrap.router, prefix="/api/bootstrap", tags=["bootstrap"])
 
 @app.get("/")
 async def root():
@@ -50,6 +119,4 @@ async def health_check():
 
 if __name__ == "__main__":
     import uvicorn
-    host = os.getenv("API_HOST", "0.0.0.0")
-    port = int(os.getenv("API_PORT", 8000))
-    uvicorn.run(app, host=host, port=port)
\ No newline at end of file
+    uvicorn.run(app, host=settings.api_host, port=settings.api_port)
\ No newline at end of file
@@ -1,5 +1,10 @@
 from .user import User
 from .category import Category, SubCategory
 from .prompt import Prompt
+from .lesson_event import LessonEvent
+from .refresh_token import RefreshToken
+from .idempotency_key import IdempotencyKey
+from .cached_lesson import CachedLesson
+from .worker import Worker
 
-__all__ = ['User', 'Category', 'SubCategory', 'Prompt']
\ No newline at end of file
+__all__ = ['User', 'Category', 'SubCategory', 'Prompt', 'LessonEvent', 'RefreshToken', 'IdempotencyKey', 'CachedLesson', 'Worker']
\ No newline at end of file
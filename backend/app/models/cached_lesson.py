@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+class CachedLesson(Base):
+    """Pre-generated lesson for a popular prompt in a subcategory, served without calling the LLM"""
+    __tablename__ = "cached_lessons"
+    __table_args__ = (
+        UniqueConstraint("sub_category_id", "prompt_hash", name="uq_cached_lessons_sub_category_id_prompt_hash"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    sub_category_id = Column(Integer, ForeignKey("sub_categories.id", ondelete="CASCADE"), nullable=False)
+    # SHA-256 of the normalized prompt (lowercase, single spaces)
+    prompt_hash = Column(String(64), nullable=False)
+    prompt = Column(Text, nullable=False)
+    response = Column(Text, nullable=False)
+    model = Column(String, nullable=True)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    # Times the prompt was asked in the lookback window when last warmed, and times served since
+    popularity = Column(Integer, nullable=False, default=0)
+    hits = Column(Integer, nullable=False, default=0, server_default="0")
+    generated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -8,20 +8,26 @@ class Category(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False, index=True)
+    # Extra system-message guidance for every lesson in this category
+    system_prompt = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
-    sub_categories = relationship("SubCategory", back_populates="category", cascade="all, delete-orphan")
-    prompts = relationship("Prompt", back_populates="category")
+    # The database cascades deletes; the ORM must not load children to delete them
+    sub_categories = relationship("SubCategory", back_populates="category", cascade="all, delete-orphan", passive_deletes=True)
+    prompts = relationship("Prompt", back_populates="category", passive_deletes=True)
 
 class SubCategory(Base):
     __tablename__ = "sub_categories"
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False, index=True)
-    category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Extra system-message guidance and typical lesson length for this subcategory
+    system_prompt = Column(Text, nullable=True)
+    lesson_tokens = Column(Integer, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
     category = relationship("Category", back_populates="sub_categories")
-    prompts = relationship("Prompt", back_populates="sub_category")
\ No newline at end of file
+    prompts = relationship("Prompt", back_populates="sub_category", passive_deletes=True)
\ No newline at end of file
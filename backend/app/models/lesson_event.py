@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+class LessonEvent(Base):
+    """Outbox row written in the same transaction as a completed lesson"""
+    __tablename__ = "lesson_events"
+    __table_args__ = (
+        # WebSocket clients replay missed events per user by id
+        Index("ix_lesson_events_user_id_id", "user_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    prompt_id = Column(Integer, ForeignKey("prompts.id", ondelete="CASCADE"), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -1,19 +1,54 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
 
+# Lesson generation states
+STATUS_QUEUED = "queued"
+STATUS_GENERATING = "generating"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_FALLBACK = "fallback"
+STATUSES = (STATUS_QUEUED, STATUS_GENERATING, STATUS_DONE, STATUS_FAILED, STATUS_FALLBACK)
+
 class Prompt(Base):
     __tablename__ = "prompts"
+    __table_args__ = (
+        # Learning history and import de-duplication look prompts up per user
+        Index("ix_prompts_user_id_created_at", "user_id", "created_at"),
+        # Stuck-job queries: oldest prompts still queued or generating
+        Index("ix_prompts_status_enqueued_at", "status", "enqueued_at"),
+        # Latency reports over a time window
+        Index("ix_prompts_finished_at", "finished_at"),
+        # Lesson sweeper keyset scans over prompts without a finished lesson
+        Index(
+            "ix_prompts_retryable_id", "id",
+            postgresql_where=text("status <> 'done'"),
+            sqlite_where=text("status <> 'done'")
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
-    sub_category_id = Column(Integer, ForeignKey("sub_categories.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.id", ondelete="CASCADE"), nullable=False, index=True)
+    sub_category_id = Column(Integer, ForeignKey("sub_categories.id", ondelete="CASCADE"), nullable=False, index=True)
     prompt = Column(Text, nullable=False)
     response = Column(Text)
+    prompt_tokens = Column(Integer)
+    completion_tokens = Column(Integer)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Generation lifecycle
+    status = Column(String(16), nullable=False, default=STATUS_QUEUED, server_default=STATUS_QUEUED)
+    model = Column(String(100))
+    enqueued_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    # Worker whose scheduler holds the prompt while it is queued or generating
+    worker_id = Column(String(32))
+    # Times the lesson sweeper re-enqueued this prompt
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+
     # Relationships
     user = relationship("User", back_populates="prompts")
     category = relationship("Category", back_populates="prompts")
@@ -5,7 +5,6 @@ from app.database import Base
 
 class User(Base):
     __tablename__ = "users"
-
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, nullable=False, index=True)
     email = Column(String, unique=True, nullable=True, index=True)
@@ -16,6 +15,10 @@ class User(Base):
     is_admin = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Maintained by triggers on prompts (created in migration 0008, like the trigram search indexes)
+    prompt_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped with every write to the user's prompts; cached history is only served at the current version
+    history_version = Column(Integer, nullable=False, default=0, server_default="0")
 
-    # Relationship to prompts
-    prompts = relationship("Prompt", back_populates="user", cascade="all, delete-orphan")
\ No newline at end of file
+    # Relationship to prompts; ON DELETE CASCADE removes them without loading them
+    prompts = relationship("Prompt", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
\ No newline at end of file
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+class Worker(Base):
+    """A running API or sweeper process; seen_at is refreshed by its heartbeat"""
+    __tablename__ = "workers"
+
+    id = Column(String(32), primary_key=True)
+    hostname = Column(String(255), nullable=False)
+    pid = Column(Integer, nullable=False)
+    started_at = Column(DateTime(timezone=True), server_default=func.now())
+    seen_at = Column(DateTime(timezone=True), nullable=False, index=True)
\ No newline at end of file
@@ -0,0 +1,205 @@
+import asyncio
+import linecache
+import os
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Numeric path segments are folded so /api/prompts/17 and /api/prompts/18 share a label
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+def route_label(method: str, path: str) -> str:
+    return f"{method} {_ID_SEGMENT.sub('/{id}', path)}"
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+def _thread_stack(frame) -> List[str]:
+    """Frame names from the outermost call to the innermost"""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+def _task_stack(task: asyncio.Task) -> List[str]:
+    """Frames of a task's coroutine chain down to the await it is suspended on"""
+    names = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            # Awaiting a future (socket read, DB driver, sleep)
+            names.append(f"<awaiting {type(awaitable).__name__}>")
+            break
+        names.append(_frame_name(frame))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    return names
+
+class SamplingProfiler:
+    """Wall-clock sampler for one worker, writing collapsed stacks (flamegraph.pl / speedscope)
+
+    A background thread samples every thread's stack, and every tracked
+    request task, so time spent awaiting the database or an LLM shows up
+    under the route that waited, not as an idle event loop.
+    """
+
+    def __init__(self, interval: float = 0.01, route_rates: Optional[Dict[str, float]] = None, default_rate: float = 1.0):
+        self.interval = interval
+        self.route_rates = route_rates or {}
+        self.default_rate = default_rate
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._tasks: Dict[asyncio.Task, str] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def rate_for(self, label: str) -> float:
+        """Sampling rate of the longest matching route prefix ("GET /api/prompts" or "/api/prompts")"""
+        path = label.split(" ", 1)[-1]
+        best, best_length = self.default_rate, -1
+        for prefix, rate in self.route_rates.items():
+            if (label.startswith(prefix) or path.startswith(prefix)) and len(prefix) > best_length:
+                best, best_length = rate, len(prefix)
+        return best
+
+    def track(self, task: asyncio.Task, label: str) -> bool:
+        """Sample this request's task if its route's rate allows"""
+        if random.random() >= self.rate_for(label):
+            return False
+        self._tasks[task] = label
+        return True
+
+    def untrack(self, task: asyncio.Task) -> None:
+        self._tasks.pop(task, None)
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        thread_names = {}
+        while not self._stop.wait(self.interval):
+            self.sample_count += 1
+            for thread in threading.enumerate():
+                thread_names[thread.ident] = thread.name
+            loop_thread = getattr(self._loop, "_thread_id", None)
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = _thread_stack(frame)
+                if thread_id == loop_thread and stack and "select" in stack[-1] and self._tasks:
+                    # The loop is idle; the tracked tasks below account for this time
+                    continue
+                self.samples[";".join([f"thread:{thread_names.get(thread_id, thread_id)}"] + stack)] += 1
+            for task, label in dict(self._tasks).items():
+                if task.done():
+                    continue
+                self.samples[";".join([f"route:{label}"] + _task_stack(task))] += 1
+
+    def collapsed(self) -> str:
+        """One "frame;frame;frame count" line per distinct stack"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common()) + "\n"
+
+# The profile running in this worker, if any; None keeps the middleware a no-op
+_active: Optional[SamplingProfiler] = None
+
+async def run_profile(seconds: float, interval: float, route_rates: Dict[str, float], default_rate: float) -> SamplingProfiler:
+    """Sample this worker for the given seconds; raises RuntimeError if a profile is already running"""
+    global _active
+    if _active is not None:
+        raise RuntimeError("A profile is already running in this worker")
+    profiler = SamplingProfiler(interval, route_rates, default_rate)
+    _active = profiler
+    profiler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        _active = None
+        await asyncio.to_thread(profiler.stop)
+    return profiler
+
+class ProfilingMiddleware:
+    """Labels request tasks with their route while a profile is running"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profiler = _active
+        # Admin calls (including the profile request itself) are left out
+        if profiler is None or scope["type"] != "http" or scope["path"].startswith("/api/admin/"):
+            await self.app(scope, receive, send)
+            return
+        task = asyncio.current_task()
+        tracked = profiler.track(task, route_label(scope["method"], scope["path"]))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if tracked:
+                profiler.untrack(task)
+
+# Memory: a baseline snapshot to diff later snapshots against
+_baseline: Optional[tracemalloc.Snapshot] = None
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, linecache.__file__),
+    ))
+
+def _describe(stat) -> dict:
+    frame = stat.traceback[0]
+    return {
+        "location": f"{frame.filename}:{frame.lineno}",
+        "size_kb": round(stat.size / 1024, 1),
+        "count": stat.count,
+        "size_diff_kb": round(getattr(stat, "size_diff", 0) / 1024, 1),
+        "count_diff": getattr(stat, "count_diff", 0),
+    }
+
+def take_memory_snapshot(limit: int = 25, frames: int = 1) -> dict:
+    """Start tracing if needed and record the baseline; returns the largest allocation sites"""
+    global _baseline
+    if not tracemalloc.is_tracing():
+        # Allocations made before this point are not attributed
+        tracemalloc.start(frames)
+    _baseline = _snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    stats = _baseline.statistics("lineno")[:limit]
+    return {"pid": os.getpid(), "traced_kb": current // 1024, "peak_kb": peak // 1024, "top": [_describe(stat) for stat in stats]}
+
+def memory_diff(limit: int = 25) -> Optional[dict]:
+    """Allocation growth since the baseline snapshot, largest first; None without a baseline"""
+    if _baseline is None or not tracemalloc.is_tracing():
+        return None
+    stats = _snapshot().compare_to(_baseline, "lineno")[:limit]
+    current, peak = tracemalloc.get_traced_memory()
+    return {"pid": os.getpid(), "traced_kb": current // 1024, "peak_kb": peak // 1024, "top": [_describe(stat) for stat in stats]}
+
+def stop_memory_tracing() -> None:
+    """Stop tracemalloc so allocations run at full speed again"""
+    global _baseline
+    _baseline = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+def profile_filename() -> str:
+    return f"profile-{os.getpid()}-{int(time.time())}.folded"
\ No newline at end of file
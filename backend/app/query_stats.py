@@ -0,0 +1,214 @@
+import contextvars
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import get_settings
+from app.profiling import route_label
+
+logger = logging.getLogger(__name__)
+
+# Route (method + path template) of the request issuing a statement
+current_route: contextvars.ContextVar[str] = contextvars.ContextVar("current_route", default="-")
+
+# Beyond this many distinct fingerprints new statements are counted together
+OTHER_FINGERPRINT = "<other statements>"
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+|\$\d+|\?")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS = re.compile(r"(\(\?(?:, \?)*\))(?:\s*,\s*\1)+")
+_WHITESPACE = re.compile(r"\s+")
+
+def fingerprint(statement: str) -> str:
+    """Statement with literals and parameters replaced by ?, IN lists and VALUES rows collapsed"""
+    normalized = _STRING.sub("?", statement)
+    normalized = _PARAM.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _WHITESPACE.sub(" ", normalized).strip()
+    normalized = _ROWS.sub(r"\1, ...", normalized)
+    return _LIST.sub("(?, ...)", normalized)
+
+def fingerprint_id(normalized: str) -> str:
+    return hashlib.md5(normalized.encode()).hexdigest()[:12]
+
+@dataclass
+class _Timing:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def add(self, elapsed: float) -> None:
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+
+    def as_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 1),
+            "mean_ms": round(self.total * 1000 / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 1),
+        }
+
+@dataclass
+class _Fingerprint:
+    statement: str
+    timing: _Timing = field(default_factory=_Timing)
+    routes: Dict[str, _Timing] = field(default_factory=dict)
+    # The slowest execution, kept so its plan can be explained later
+    slowest_statement: Optional[str] = None
+    slowest_parameters: Optional[object] = None
+    slowest_route: Optional[str] = None
+
+class QueryStats:
+    """Per-worker statement timings aggregated by fingerprint and route"""
+
+    def __init__(self, slow_ms: float = 200, max_fingerprints: int = 2000, slow_log_size: int = 100):
+        self.slow_seconds = slow_ms / 1000
+        self.max_fingerprints = max_fingerprints
+        self._fingerprints: Dict[str, _Fingerprint] = {}
+        self._slow = deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def record(self, statement: str, parameters, elapsed: float, executemany: bool = False) -> None:
+        normalized = fingerprint(statement)
+        key = fingerprint_id(normalized)
+        route = current_route.get()
+        with self._lock:
+            entry = self._fingerprints.get(key)
+            if entry is None:
+                if len(self._fingerprints) >= self.max_fingerprints:
+                    key, normalized = fingerprint_id(OTHER_FINGERPRINT), OTHER_FINGERPRINT
+                    entry = self._fingerprints.get(key)
+                if entry is None:
+                    entry = self._fingerprints[key] = _Fingerprint(normalized)
+            if elapsed >= entry.timing.max and not executemany:
+                entry.slowest_statement = statement
+                entry.slowest_parameters = parameters
+                entry.slowest_route = route
+            entry.timing.add(elapsed)
+            entry.routes.setdefault(route, _Timing()).add(elapsed)
+            if elapsed >= self.slow_seconds:
+                self._slow.append({
+                    "id": key,
+                    "route": route,
+                    "ms": round(elapsed * 1000, 1),
+                    "statement": normalized,
+                    "at": time.time(),
+                })
+        if elapsed >= self.slow_seconds:
+            logger.warning(
+                "Slow query %.0fms [%s] %s: %s", elapsed * 1000, route, key, normalized[:300],
+                extra={"fingerprint": key, "route": route, "duration_ms": round(elapsed * 1000, 1)}
+            )
+
+    def top(self, limit: int = 20, order: str = "total", route_limit: int = 5) -> List[Dict]:
+        """Fingerprints ordered by total, max or count, each with its busiest routes"""
+        with self._lock:
+            entries = list(self._fingerprints.items())
+            sort_key = {
+                "total": lambda item: item[1].timing.total,
+                "max": lambda item: item[1].timing.max,
+                "count": lambda item: item[1].timing.count,
+            }[order]
+            entries.sort(key=sort_key, reverse=True)
+            results = []
+            for key, entry in entries[:limit]:
+                routes = sorted(entry.routes.items(), key=lambda item: item[1].total, reverse=True)[:route_limit]
+                results.append({
+                    "id": key,
+                    "statement": entry.statement,
+                    **entry.timing.as_dict(),
+                    "routes": [{"route": route, **timing.as_dict()} for route, timing in routes],
+                })
+            return results
+
+    def slow_log(self) -> List[Dict]:
+        with self._lock:
+            return list(reversed(self._slow))
+
+    def slowest_execution(self, key: str):
+        """(statement, parameters) of the fingerprint's slowest execution, or None"""
+        with self._lock:
+            entry = self._fingerprints.get(key)
+            if entry is None or entry.slowest_statement is None:
+                return None
+            return entry.slowest_statement, entry.slowest_parameters
+
+    def reset(self) -> None:
+        with self._lock:
+            self._fingerprints.clear()
+            self._slow.clear()
+            self.started_at = time.time()
+
+_query_stats: Optional[QueryStats] = None
+
+def get_query_stats() -> QueryStats:
+    global _query_stats
+    if _query_stats is None:
+        settings = get_settings()
+        _query_stats = QueryStats(settings.slow_query_ms, settings.query_stats_max_fingerprints)
+    return _query_stats
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started_at"].pop()
+    if statement.startswith("EXPLAIN"):
+        return
+    get_query_stats().record(statement, parameters, time.perf_counter() - started, executemany)
+
+def _handle_error(exception_context):
+    # Failed statements never reach after_cursor_execute; drop their start time
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started_at"):
+        connection.info["query_started_at"].pop()
+
+def install_query_stats(engine: Engine) -> None:
+    """Time every statement the engine executes"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+def explain(engine: Engine, key: str) -> Optional[List[str]]:
+    """Plan of the fingerprint's slowest execution (EXPLAIN, not ANALYZE: nothing is run)"""
+    execution = get_query_stats().slowest_execution(key)
+    if execution is None:
+        return None
+    statement, parameters = execution
+    if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        raise ValueError("Only SELECT statements can be explained")
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(prefix + statement, parameters).fetchall()
+    return [" | ".join(str(value) for value in row) for row in rows]
+
+class QueryStatsMiddleware:
+    """Tags statements with the route of the request that issued them"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        token = current_route.set(route_label(scope.get("method", "WS"), scope["path"]))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_route.reset(token)
\ No newline at end of file
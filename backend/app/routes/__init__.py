@@ -1,3 +1,3 @@
-from . import users, categories, prompts
+from . import users, categories, prompts, events, admin, bootstrap
 
-__all__ = ['users', 'categories', 'prompts']
\ No newline at end of file
+__all__ = ['users', 'categories', 'prompts', 'events', 'admin', 'bootstrap']
\ No newline at end of file
@@ -0,0 +1,132 @@
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+
+from app.auth import get_current_admin_user
+from app.config import get_settings
+from app.database import get_engine
+from app.models.user import User
+from app.profiling import memory_diff, profile_filename, run_profile, stop_memory_tracing, take_memory_snapshot
+from app.query_stats import explain, get_query_stats
+from app.services.history_cache import get_history_cache
+from app.schemas.admin import ProfileRequest
+
+router = APIRouter()
+
+def require_profiling(current_user: User = Depends(get_current_admin_user)) -> User:
+    """Admin access to the profiling endpoints, which only exist when PROFILING_ENABLED is set"""
+    if not get_settings().profiling_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return current_user
+
+def require_query_stats(current_user: User = Depends(get_current_admin_user)) -> User:
+    """Admin access to the query statistics, which are off when QUERY_STATS_ENABLED is false"""
+    if not get_settings().query_stats_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return current_user
+
+@router.post("/profile")
+async def profile_worker(
+    request: ProfileRequest,
+    current_user: User = Depends(require_profiling)
+):
+    """Sample the worker serving this request and return collapsed stacks (Admin only)
+
+    The file loads into speedscope or flamegraph.pl. Stacks under route:...
+    include time spent awaiting the database and LLM providers.
+    """
+    max_seconds = get_settings().profile_max_seconds
+    if request.seconds > max_seconds:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Profiles are limited to {max_seconds} seconds"
+        )
+    try:
+        profiler = await run_profile(
+            request.seconds,
+            request.interval_ms / 1000,
+            request.route_rates,
+            request.default_rate
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return Response(
+        content=profiler.collapsed(),
+        media_type="text/plain",
+        headers={
+            "Content-Disposition": f'attachment; filename="{profile_filename()}"',
+            "X-Profile-Samples": str(profiler.sample_count),
+        }
+    )
+
+@router.post("/memory/snapshot")
+async def memory_snapshot(
+    limit: int = Query(25, ge=1, le=500),
+    frames: int = Query(1, ge=1, le=50),
+    current_user: User = Depends(require_profiling)
+):
+    """Start tracemalloc if needed and record a baseline snapshot (Admin only)"""
+    return take_memory_snapshot(limit, frames)
+
+@router.get("/memory/diff")
+async def memory_snapshot_diff(
+    limit: int = Query(25, ge=1, le=500),
+    current_user: User = Depends(require_profiling)
+):
+    """Allocation growth since the baseline snapshot (Admin only)"""
+    diff = memory_diff(limit)
+    if diff is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Take a baseline with POST /api/admin/memory/snapshot first"
+        )
+    return diff
+
+@router.delete("/memory", status_code=status.HTTP_204_NO_CONTENT)
+async def stop_memory_snapshots(current_user: User = Depends(require_profiling)):
+    """Stop tracemalloc and drop the baseline (Admin only)"""
+    stop_memory_tracing()
+
+@router.get("/queries")
+async def top_queries(
+    limit: int = Query(20, ge=1, le=200),
+    order: str = Query("total", pattern="^(total|max|count)$"),
+    current_user: User = Depends(require_query_stats)
+):
+    """Statement fingerprints of this worker by total time, max time or count, with their routes (Admin only)"""
+    stats = get_query_stats()
+    return {
+        "pid": os.getpid(),
+        "since": stats.started_at,
+        "slow_query_ms": round(stats.slow_seconds * 1000),
+        "queries": stats.top(limit, order),
+    }
+
+@router.get("/queries/slow")
+async def slow_queries(current_user: User = Depends(require_query_stats)):
+    """Most recent statements slower than SLOW_QUERY_MS in this worker (Admin only)"""
+    return {"pid": os.getpid(), "queries": get_query_stats().slow_log()}
+
+@router.get("/queries/{fingerprint_id}/explain")
+def explain_query(
+    fingerprint_id: str,
+    current_user: User = Depends(require_query_stats)
+):
+    """Plan of the slowest execution recorded for a fingerprint (Admin only)"""
+    try:
+        plan = explain(get_engine(), fingerprint_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if plan is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown query fingerprint")
+    return {"id": fingerprint_id, "plan": plan}
+
+@router.delete("/queries", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_queries(current_user: User = Depends(require_query_stats)):
+    """Clear this worker's query statistics (Admin only)"""
+    get_query_stats().reset()
+
+@router.get("/history-cache")
+async def history_cache_stats(current_user: User = Depends(get_current_admin_user)):
+    """Hit rate and size of this worker's learning history cache (Admin only)"""
+    return {"pid": os.getpid(), **get_history_cache().stats()}
\ No newline at end of file
@@ -4,15 +4,21 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.schemas.user import Token, UserCreate, User as UserSchema, UserProfile
+from app.schemas.user import RefreshRequest, Token, UserCreate, User as UserSchema, UserProfile
 from app.models.user import User
 from app.auth import (
     authenticate_user,
     create_access_token,
     get_password_hash,
     get_user_by_username,
-    get_current_active_user,
-    ACCESS_TOKEN_EXPIRE_MINUTES
+    get_current_active_user
+)
+from app.config import get_settings
+from app.services.token_service import (
+    issue_refresh_token,
+    purge_expired_refresh_tokens,
+    revoke_refresh_token,
+    rotate_refresh_token
 )
 
 router = APIRouter()
@@ -72,12 +78,43 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
             detail="User account is inactive",
         )
     
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token_expires = timedelta(minutes=get_settings().access_token_expire_minutes)
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
     )
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    # The password (and bcrypt) is checked once per device; the refresh token renews access from then on
+    purge_expired_refresh_tokens(db, user.id)
+    refresh_token = issue_refresh_token(db, user.id)
+    db.commit()
+    
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(request: RefreshRequest, db: Session = Depends(get_db)):
+    """Exchange a refresh token for a new access token and a rotated refresh token"""
+    rotated = rotate_refresh_token(db, request.refresh_token)
+    # Commit either way: a detected token reuse must persist its revocation
+    db.commit()
+    if rotated is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    user, refresh_token = rotated
+    access_token = create_access_token(
+        data={"sub": user.username},
+        expires_delta=timedelta(minutes=get_settings().access_token_expire_minutes)
+    )
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(request: RefreshRequest, db: Session = Depends(get_db)):
+    """Revoke a refresh token and every token rotated from it"""
+    revoke_refresh_token(db, request.refresh_token)
+    db.commit()
 
 @router.get("/profile", response_model=UserProfile)
 async def get_user_profile(current_user: User = Depends(get_current_active_user)):
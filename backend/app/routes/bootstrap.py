@@ -0,0 +1,43 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, Query
+
+from app.auth import get_current_active_user
+from app.database import open_read_session
+from app.models.user import User
+from app.schemas.bootstrap import Bootstrap
+from app.services.category_service import get_category_tree
+from app.services.history_cache import recent_history
+
+router = APIRouter()
+
+@router.get("", response_model=Bootstrap)
+async def bootstrap(
+    history_limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Profile, category tree and first history page in one request
+
+    The token is decoded and the user loaded once. Categories and history
+    load concurrently, each on its own short session; the history page
+    usually comes from the history cache without a query.
+    """
+    def load_categories():
+        db = open_read_session()
+        try:
+            return get_category_tree(db)
+        finally:
+            db.close()
+
+    def load_history():
+        db = open_read_session()
+        try:
+            return recent_history(db, current_user, 0, history_limit)
+        finally:
+            db.close()
+
+    categories, history = await asyncio.gather(
+        asyncio.to_thread(load_categories),
+        asyncio.to_thread(load_history)
+    )
+    return {"profile": current_user, "categories": categories, "history": history}
\ No newline at end of file
@@ -1,39 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from typing import List
 
+from app.config import get_settings
 from app.database import get_db
 from app.models.category import Category, SubCategory
+from app.models.prompt import Prompt
+from app.models.user import User
 from app.schemas.category import (
     Category as CategorySchema,
     CategoryWithSubCategories,
     SubCategory as SubCategorySchema,
     CategoryCreate,
-    SubCategoryCreate
+    SubCategoryCreate,
+    CategoryTemplateUpdate,
+    SubCategoryTemplateUpdate
 )
+from app.services.category_service import get_category_tree
+from app.services.history_cache import prompts_deleted
+from app.services.lesson_cache import invalidate_cached_lessons
+from app.services.purge_service import count_prompts, purge_category, purge_subcategory
+from app.services.template_registry import template_registry
+from app.auth import get_current_admin_user
 
 router = APIRouter()
 
 @router.get("/", response_model=List[CategoryWithSubCategories])
 async def get_categories(db: Session = Depends(get_db)):
     """Get all categories with their subcategories"""
-    categories = db.query(Category).all()
-    result = []
-    
-    for category in categories:
-        sub_categories = db.query(SubCategory).filter(
-            SubCategory.category_id == category.id
-        ).all()
-        
-        category_with_subs = CategoryWithSubCategories(
-            id=category.id,
-            name=category.name,
-            created_at=category.created_at,
-            sub_categories=sub_categories
-        )
-        result.append(category_with_subs)
-    
-    return result
+    return get_category_tree(db)
 
 @router.get("/{category_id}", response_model=CategoryWithSubCategories)
 async def get_category(category_id: int, db: Session = Depends(get_db)):
@@ -117,4 +112,117 @@ async def create_subcategory(subcategory: SubCategoryCreate, db: Session = Depen
     db.commit()
     db.refresh(db_subcategory)
     return db_subcategory
-    
\ No newline at end of file
+
+@router.post("/templates/reload")
+async def reload_templates(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Recompile system message templates from the database (Admin only)"""
+    count = template_registry.load(db)
+    return {"message": "Templates reloaded", "templates": count}
+
+@router.put("/{category_id}/template", response_model=CategorySchema)
+async def update_category_template(
+    category_id: int,
+    template: CategoryTemplateUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Set lesson guidance for a category (Admin only)"""
+    category = db.query(Category).filter(Category.id == category_id).first()
+    if not category:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Category not found"
+        )
+    
+    category.system_prompt = template.system_prompt
+    # Pre-generated lessons were written with the old guidance
+    invalidate_cached_lessons(db, category_id=category_id)
+    db.commit()
+    db.refresh(category)
+    template_registry.load(db)
+    return category
+
+@router.put("/subcategories/{subcategory_id}/template", response_model=SubCategorySchema)
+async def update_subcategory_template(
+    subcategory_id: int,
+    template: SubCategoryTemplateUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Set lesson guidance and typical lesson length for a subcategory (Admin only)"""
+    subcategory = db.query(SubCategory).filter(SubCategory.id == subcategory_id).first()
+    if not subcategory:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Subcategory not found"
+        )
+    
+    subcategory.system_prompt = template.system_prompt
+    subcategory.lesson_tokens = template.lesson_tokens
+    invalidate_cached_lessons(db, sub_category_id=subcategory_id)
+    db.commit()
+    db.refresh(subcategory)
+    template_registry.load(db)
+    return subcategory
+
+@router.delete("/{category_id}")
+async def delete_category(
+    category_id: int,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Delete a category with its subcategories and prompts (Admin only)"""
+    category = db.query(Category).filter(Category.id == category_id).first()
+    if not category:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Category not found"
+        )
+
+    name = category.name
+    if count_prompts(db, Prompt.category_id, category_id) > get_settings().purge_inline_limit:
+        background_tasks.add_task(purge_category, category_id)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"message": f"Category {name} is being deleted"}
+
+    # Subcategories and prompts are removed by ON DELETE CASCADE
+    history = prompts_deleted(db, db.query(Prompt.id, Prompt.user_id).filter(Prompt.category_id == category_id))
+    db.delete(category)
+    db.commit()
+    history.apply()
+    template_registry.load(db)
+    return {"message": f"Category {name} deleted successfully"}
+
+@router.delete("/subcategories/{subcategory_id}")
+async def delete_subcategory(
+    subcategory_id: int,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Delete a subcategory and its prompts (Admin only)"""
+    subcategory = db.query(SubCategory).filter(SubCategory.id == subcategory_id).first()
+    if not subcategory:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Subcategory not found"
+        )
+
+    name = subcategory.name
+    if count_prompts(db, Prompt.sub_category_id, subcategory_id) > get_settings().purge_inline_limit:
+        background_tasks.add_task(purge_subcategory, subcategory_id)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"message": f"Subcategory {name} is being deleted"}
+
+    history = prompts_deleted(db, db.query(Prompt.id, Prompt.user_id).filter(Prompt.sub_category_id == subcategory_id))
+    db.delete(subcategory)
+    db.commit()
+    history.apply()
+    template_registry.load(db)
+    return {"message": f"Subcategory {name} deleted successfully"}
\ No newline at end of file
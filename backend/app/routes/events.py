@@ -0,0 +1,64 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect, status
+
+from app.auth import get_user_from_token
+from app.database import SessionLocal
+from app.services.lesson_events import SeenIds, lesson_event_hub, replay_lesson_events
+
+router = APIRouter()
+
+async def _wait_for_disconnect(websocket: WebSocket) -> None:
+    # Clients only listen; anything they send is ignored
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+@router.websocket("/lessons")
+async def lesson_events(
+    websocket: WebSocket,
+    token: str = Query(...),
+    since: Optional[int] = None
+):
+    """Push a lesson_ready event to the user whenever one of their lessons is stored.
+
+    Pass the last event id seen as ?since= when reconnecting to receive missed events.
+    """
+    db = SessionLocal()
+    try:
+        user = get_user_from_token(db, token)
+        user_id = user.id if user is not None and user.is_active else None
+    finally:
+        db.close()
+    if user_id is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    # Subscribe before replaying so nothing committed in between is lost
+    queue = lesson_event_hub.subscribe(user_id)
+    receiver = asyncio.create_task(_wait_for_disconnect(websocket))
+    # Events can commit out of id order, so duplicates are dropped by id rather than by comparing ids
+    seen = SeenIds()
+    try:
+        if since is not None:
+            for payload in replay_lesson_events(user_id, since):
+                seen.add(payload["id"])
+                await websocket.send_json(payload)
+
+        while True:
+            getter = asyncio.create_task(queue.get())
+            done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                getter.cancel()
+                break
+            payload = getter.result()
+            if seen.add(payload["id"]):
+                await websocket.send_json(payload)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        receiver.cancel()
+        lesson_event_hub.unsubscribe(user_id, queue)
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status, BackgroundTasks
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
+from datetime import timedelta
 from typing import List, Optional
 
-from app.database import get_db
-from app.models.prompt import Prompt
+from app.database import get_db, is_replica_session
+from app.http_cache import cached_json_response
+from app.models.prompt import Prompt, STATUS_DONE, STATUS_FAILED, STATUS_FALLBACK
 from app.models.user import User
 from app.models.category import Category, SubCategory
 from app.schemas.prompt import (
@@ -12,81 +14,90 @@ from app.schemas.prompt import (
     PromptCreate,
     PromptWithDetails,
     AILessonRequest,
-    AILessonResponse
+    AILessonResponse,
+    GenerationStats,
+    SweepRequest,
+    SweepStatus
 )
-from app.services.ai_service import ai_service
-from app.auth import get_current_active_user, get_current_admin_user
+from app.services.ai_service import get_ai_service
+from app.services.generation_scheduler import get_generation_scheduler
+from app.services.generation_stats import generation_stats
+from app.services.history_cache import prompts_deleted, recent_history
+from app.services.idempotency import attach_prompt, claim_idempotency_key, release_idempotency_key, request_fingerprint
+from app.services.lesson_generation import generate_ai_response, lesson_topic
+from app.services.lesson_sweeper import get_sweep_progress, start_sweep_job
+from app.services.prompt_service import add_prompt, prompt_topic_names
+from app.auth import get_current_active_user, get_current_admin_user, get_read_db
 
 router = APIRouter()
 
-async def generate_ai_response(prompt_id: int, topic: str, prompt_text: str, category_name: str, sub_category_name: str, db: Session):
-    """Background task to generate AI response"""
-    try:
-        ai_response = await ai_service.generate_lesson(
-            topic=topic,
-            prompt=prompt_text,
-            category=category_name,
-            sub_category=sub_category_name
-        )
-        
-        # Update the prompt with the AI response
-        db_prompt = db.query(Prompt).filter(Prompt.id == prompt_id).first()
-        if db_prompt:
-            db_prompt.response = ai_response
-            db.commit()
-    
-    except Exception as e:
-        print(f"Error generating AI response for prompt {prompt_id}: {e}")
-
 @router.post("/", response_model=PromptSchema, status_code=status.HTTP_201_CREATED)
 async def create_prompt(
     prompt: PromptCreate, 
     background_tasks: BackgroundTasks,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Create a new prompt and generate AI response"""
-    # Verify category exists
-    category = db.query(Category).filter(Category.id == prompt.category_id).first()
-    if not category:
+    """Create a new prompt and generate AI response
+
+    Retries carrying the same Idempotency-Key get the original prompt back
+    instead of a second generation.
+    """
+    if prompt.provider and not get_ai_service().has_provider(prompt.provider):
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Category not found"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown LLM provider: {prompt.provider}"
         )
     
-    # Verify subcategory exists and belongs to category
-    sub_category = db.query(SubCategory).filter(
-        SubCategory.id == prompt.sub_category_id,
-        SubCategory.category_id == prompt.category_id
-    ).first()
-    if not sub_category:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Subcategory not found or doesn't belong to the specified category"
-        )
+    # 404 for an unknown category or subcategory; the names are read before the commit expires the rows
+    category_name, sub_category_name = prompt_topic_names(db, prompt)
     
-    # Create the prompt with current user's ID
-    db_prompt = Prompt(
-        user_id=current_user.id,
-        category_id=prompt.category_id,
-        sub_category_id=prompt.sub_category_id,
-        prompt=prompt.prompt
-    )
+    if idempotency_key:
+        original_id = claim_idempotency_key(db, current_user.id, idempotency_key, request_fingerprint(prompt.dict()))
+        if original_id is not None:
+            original = db.query(Prompt).filter(Prompt.id == original_id).first()
+            if original is None:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="The prompt created with this Idempotency-Key has been deleted"
+                )
+            response.headers["Idempotent-Replayed"] = "true"
+            return original
     
-    db.add(db_prompt)
-    db.commit()
+    # The key is reserved from here on; any failure must release it or retries get 409 until it expires
+    try:
+        db_prompt, history = add_prompt(db, current_user.id, prompt)
+        if idempotency_key:
+            # Committed with the prompt, so a retry sees either no prompt or the finished one
+            attach_prompt(db, current_user.id, idempotency_key, db_prompt.id)
+        db.commit()
+    except Exception:
+        if idempotency_key:
+            release_idempotency_key(db, current_user.id, idempotency_key)
+        raise
+    history.apply()
     db.refresh(db_prompt)
+    # Background tasks run before get_db closes the session, so end the read
+    # transaction now rather than keep the connection through the generation
+    db.expunge(db_prompt)
+    db.commit()
+    if db_prompt.status == STATUS_DONE:
+        # Answered from a pre-generated lesson
+        return db_prompt
     
-    # Add background task to generate AI response
-    topic = f"{category.name} - {sub_category.name}"
+    # Add background task to generate AI response; it opens its own short sessions
+    topic = lesson_topic(category_name, sub_category_name)
     background_tasks.add_task(
         generate_ai_response,
         db_prompt.id,
         topic,
         prompt.prompt,
-        category.name,
-        sub_category.name,
-        db
+        category_name,
+        sub_category_name,
+        prompt.provider,
+        current_user.id
     )
     
     return db_prompt
@@ -96,7 +107,7 @@ async def get_all_prompts(
     skip: int = 0, 
     limit: int = 100, 
     user_id: Optional[int] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_admin_user)
 ):
     """Get all prompts (admin endpoint) with optional user filtering"""
@@ -107,11 +118,18 @@ async def get_all_prompts(
         Prompt.sub_category_id,
         Prompt.prompt,
         Prompt.response,
+        Prompt.prompt_tokens,
+        Prompt.completion_tokens,
+        Prompt.status,
+        Prompt.model,
         Prompt.created_at,
+        Prompt.enqueued_at,
+        Prompt.started_at,
+        Prompt.finished_at,
         User.full_name.label("user_name"),
         Category.name.label("category_name"),
         SubCategory.name.label("sub_category_name")
-    ).join(User).join(Category).join(SubCategory)
+    ).join(User).join(Category).join(SubCategory, Prompt.sub_category_id == SubCategory.id)
     
     if user_id:
         query = query.filter(Prompt.user_id == user_id)
@@ -126,7 +144,14 @@ async def get_all_prompts(
             sub_category_id=prompt.sub_category_id,
             prompt=prompt.prompt,
             response=prompt.response,
+            prompt_tokens=prompt.prompt_tokens,
+            completion_tokens=prompt.completion_tokens,
+            status=prompt.status,
+            model=prompt.model,
             created_at=prompt.created_at,
+            enqueued_at=prompt.enqueued_at,
+            started_at=prompt.started_at,
+            finished_at=prompt.finished_at,
             user_name=prompt.user_name,
             category_name=prompt.category_name,
             sub_category_name=prompt.sub_category_name
@@ -138,47 +163,22 @@ async def get_all_prompts(
 async def get_my_prompts(
     skip: int = 0,
     limit: int = 50,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get current user's prompts (learning history)"""
-    prompts = db.query(
-        Prompt.id,
-        Prompt.user_id,
-        Prompt.category_id,
-        Prompt.sub_category_id,
-        Prompt.prompt,
-        Prompt.response,
-        Prompt.created_at,
-        User.full_name.label("user_name"),
-        Category.name.label("category_name"),
-        SubCategory.name.label("sub_category_name")
-    ).join(User).join(Category).join(SubCategory).filter(
-        Prompt.user_id == current_user.id
-    ).order_by(desc(Prompt.created_at)).offset(skip).limit(limit).all()
-    
-    return [
-        PromptWithDetails(
-            id=prompt.id,
-            user_id=prompt.user_id,
-            category_id=prompt.category_id,
-            sub_category_id=prompt.sub_category_id,
-            prompt=prompt.prompt,
-            response=prompt.response,
-            created_at=prompt.created_at,
-            user_name=prompt.user_name,
-            category_name=prompt.category_name,
-            sub_category_name=prompt.sub_category_name
-        )
-        for prompt in prompts
-    ]
+    """Get current user's prompts (learning history)
+
+    The first page comes from this worker's history cache while the user's
+    history version is unchanged.
+    """
+    return recent_history(db, current_user, skip, limit)
 
 @router.get("/users/{user_id}", response_model=List[PromptWithDetails])
 async def get_user_prompts(
     user_id: int,
     skip: int = 0,
     limit: int = 50,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get prompts for a specific user (admin or own prompts only)"""
@@ -204,11 +204,18 @@ async def get_user_prompts(
         Prompt.sub_category_id,
         Prompt.prompt,
         Prompt.response,
+        Prompt.prompt_tokens,
+        Prompt.completion_tokens,
+        Prompt.status,
+        Prompt.model,
         Prompt.created_at,
+        Prompt.enqueued_at,
+        Prompt.started_at,
+        Prompt.finished_at,
         User.full_name.label("user_name"),
         Category.name.label("category_name"),
         SubCategory.name.label("sub_category_name")
-    ).join(User).join(Category).join(SubCategory).filter(
+    ).join(User).join(Category).join(SubCategory, Prompt.sub_category_id == SubCategory.id).filter(
         Prompt.user_id == user_id
     ).order_by(desc(Prompt.created_at)).offset(skip).limit(limit).all()
     
@@ -220,7 +227,14 @@ async def get_user_prompts(
             sub_category_id=prompt.sub_category_id,
             prompt=prompt.prompt,
             response=prompt.response,
+            prompt_tokens=prompt.prompt_tokens,
+            completion_tokens=prompt.completion_tokens,
+            status=prompt.status,
+            model=prompt.model,
             created_at=prompt.created_at,
+            enqueued_at=prompt.enqueued_at,
+            started_at=prompt.started_at,
+            finished_at=prompt.finished_at,
             user_name=prompt.user_name,
             category_name=prompt.category_name,
             sub_category_name=prompt.sub_category_name
@@ -228,27 +242,43 @@ async def get_user_prompts(
         for prompt in prompts
     ]
 
-@router.get("/{prompt_id}", response_model=PromptWithDetails)
-async def get_prompt(
-    prompt_id: int, 
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    """Get a specific prompt by ID"""
-    prompt = db.query(
+def _get_prompt_with_details(db: Session, prompt_id: int):
+    return db.query(
         Prompt.id,
         Prompt.user_id,
         Prompt.category_id,
         Prompt.sub_category_id,
         Prompt.prompt,
         Prompt.response,
+        Prompt.prompt_tokens,
+        Prompt.completion_tokens,
+        Prompt.status,
+        Prompt.model,
         Prompt.created_at,
+        Prompt.enqueued_at,
+        Prompt.started_at,
+        Prompt.finished_at,
         User.full_name.label("user_name"),
         Category.name.label("category_name"),
         SubCategory.name.label("sub_category_name")
-    ).join(User).join(Category).join(SubCategory).filter(
+    ).join(User).join(Category).join(SubCategory, Prompt.sub_category_id == SubCategory.id).filter(
         Prompt.id == prompt_id
     ).first()
+
+@router.get("/{prompt_id}", response_model=PromptWithDetails)
+async def get_prompt(
+    prompt_id: int, 
+    request: Request,
+    db: Session = Depends(get_read_db),
+    primary_db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get a specific prompt by ID"""
+    prompt = _get_prompt_with_details(db, prompt_id)
+    if is_replica_session(db) and (not prompt or prompt.status not in (STATUS_DONE, STATUS_FALLBACK, STATUS_FAILED)):
+        # A prompt created through another worker may not have replicated yet, and a
+        # lesson stored by a background task does not make the user sticky to the primary
+        prompt = _get_prompt_with_details(primary_db, prompt_id)
     
     if not prompt:
         raise HTTPException(
@@ -263,18 +293,38 @@ async def get_prompt(
             detail="Not enough permissions to view this prompt"
         )
     
-    return PromptWithDetails(
+    details = PromptWithDetails(
         id=prompt.id,
         user_id=prompt.user_id,
         category_id=prompt.category_id,
         sub_category_id=prompt.sub_category_id,
         prompt=prompt.prompt,
         response=prompt.response,
+        prompt_tokens=prompt.prompt_tokens,
+        completion_tokens=prompt.completion_tokens,
+        status=prompt.status,
+        model=prompt.model,
         created_at=prompt.created_at,
+        enqueued_at=prompt.enqueued_at,
+        started_at=prompt.started_at,
+        finished_at=prompt.finished_at,
         user_name=prompt.user_name,
         category_name=prompt.category_name,
         sub_category_name=prompt.sub_category_name
     )
+    if prompt.status not in (STATUS_DONE, STATUS_FALLBACK) or prompt.response is None:
+        # Still generating; clients wait for the lesson_ready event
+        return Response(
+            content=details.model_dump_json(),
+            media_type="application/json",
+            headers={"Cache-Control": "no-store"}
+        )
+    # A stored lesson only changes if it is regenerated, so revalidate with ETag / Last-Modified
+    return cached_json_response(
+        request,
+        details.model_dump_json().encode(),
+        last_modified=prompt.finished_at or prompt.created_at
+    )
 
 @router.post("/ai/generate-lesson", response_model=AILessonResponse)
 async def generate_lesson(
@@ -282,12 +332,19 @@ async def generate_lesson(
     current_user: User = Depends(get_current_active_user)
 ):
     """Generate AI lesson directly (for testing purposes)"""
+    if lesson_request.provider and not get_ai_service().has_provider(lesson_request.provider):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown LLM provider: {lesson_request.provider}"
+        )
+    
     try:
-        lesson = await ai_service.generate_lesson(
+        lesson = await get_ai_service().generate_lesson(
             topic=lesson_request.topic,
             prompt=lesson_request.prompt,
             category=lesson_request.category,
-            sub_category=lesson_request.sub_category
+            sub_category=lesson_request.sub_category,
+            provider=lesson_request.provider
         )
         
         return AILessonResponse(
@@ -302,6 +359,49 @@ async def generate_lesson(
             detail=f"Error generating lesson: {str(e)}"
         )
 
+@router.get("/ai/stats")
+async def get_ai_stats(current_user: User = Depends(get_current_admin_user)):
+    """Lesson generation counters, including coalesced requests (Admin only)"""
+    return get_ai_service().get_coalescing_stats()
+
+@router.get("/ai/scheduler")
+async def get_scheduler_stats(current_user: User = Depends(get_current_admin_user)):
+    """Generation queue depth, running count and wait times per priority lane in this worker (Admin only)"""
+    return get_generation_scheduler().stats()
+
+@router.get("/ai/generation-stats", response_model=GenerationStats)
+async def get_generation_stats(
+    hours: float = Query(24, gt=0, le=24 * 90),
+    stuck_minutes: float = Query(15, gt=0),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Queue and generation latency percentiles per category, plus stuck prompts (Admin only)"""
+    return generation_stats(db, timedelta(hours=hours), timedelta(minutes=stuck_minutes))
+
+@router.post("/ai/sweep", response_model=SweepStatus, status_code=status.HTTP_202_ACCEPTED)
+async def start_lesson_sweep(
+    sweep_request: SweepRequest,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Regenerate failed, fallback and stuck lessons in the background (Admin only)"""
+    try:
+        progress = start_sweep_job(limit=sweep_request.limit, dry_run=sweep_request.dry_run)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return SweepStatus.from_progress(progress)
+
+@router.get("/ai/sweep", response_model=SweepStatus)
+async def get_lesson_sweep(current_user: User = Depends(get_current_admin_user)):
+    """Progress of the last lesson sweep started on this worker (Admin only)"""
+    progress = get_sweep_progress()
+    if progress is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No lesson sweep has been started"
+        )
+    return SweepStatus.from_progress(progress)
+
 @router.delete("/{prompt_id}")
 async def delete_prompt(
     prompt_id: int, 
@@ -323,6 +423,8 @@ async def delete_prompt(
             detail="Not enough permissions to delete this prompt"
         )
     
+    history = prompts_deleted(db, [prompt])
     db.delete(prompt)
     db.commit()
+    history.apply()
     return {"message": "Prompt deleted successfully"}
\ No newline at end of file
@@ -1,36 +1,54 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
+from sqlalchemy import or_
+from typing import List, Optional
 
 from app.database import get_db
 from app.models.user import User
-from app.models.prompt import Prompt
 from app.schemas.user import User as UserSchema, UserWithPrompts
-from app.auth import get_current_active_user, get_current_admin_user
+from app.auth import get_current_active_user, get_current_admin_user, get_read_db
+from app.config import get_settings
+from app.services.history_cache import get_history_cache
+from app.services.purge_service import purge_user
 
 router = APIRouter()
 
+def _search_pattern(term: str) -> str:
+    """ILIKE pattern matching term anywhere, with LIKE wildcards escaped"""
+    escaped = term.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+    return f"%{escaped}%"
+
 @router.get("/", response_model=List[UserWithPrompts])
 async def get_users(
     skip: int = 0, 
-    limit: int = 100, 
-    db: Session = Depends(get_db),
+    limit: int = Query(100, ge=1, le=500), 
+    search: Optional[str] = None,
+    after_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_admin_user)
 ):
-    """Get all users with their prompt counts (Admin only)"""
-    users = db.query(
-        User.id,
-        User.username,
-        User.email,
-        User.full_name,
-        User.phone,
-        User.is_active,
-        User.is_admin,
-        User.created_at,
-        User.updated_at,
-        func.count(Prompt.id).label("prompt_count")
-    ).outerjoin(Prompt).group_by(User.id).offset(skip).limit(limit).all()
+    """Get users with their prompt counts, optionally filtered by search (Admin only).
+
+    search matches username, full name, email or phone (trigram indexed on
+    Postgres). Pass the last id of a page as after_id for the next one.
+    """
+    query = db.query(User)
+    
+    if search and search.strip():
+        pattern = _search_pattern(search.strip())
+        query = query.filter(or_(
+            User.username.ilike(pattern, escape="!"),
+            User.full_name.ilike(pattern, escape="!"),
+            User.email.ilike(pattern, escape="!"),
+            User.phone.ilike(pattern, escape="!")
+        ))
+    
+    # Keyset pagination stays fast deep into the list; skip is kept for old clients
+    if after_id is not None:
+        query = query.filter(User.id > after_id).order_by(User.id)
+    else:
+        query = query.order_by(User.id).offset(skip)
+    users = query.limit(limit).all()
     
     return [
         UserWithPrompts(
@@ -78,10 +96,16 @@ async def get_user(
 @router.delete("/{user_id}")
 async def delete_user(
     user_id: int, 
+    background_tasks: BackgroundTasks,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin_user)
 ):
-    """Delete a user and all associated prompts (Admin only)"""
+    """Delete a user and all associated prompts (Admin only)
+
+    Prompts go with the user through ON DELETE CASCADE. Accounts above
+    PURGE_INLINE_LIMIT prompts are deactivated and purged in chunks in the background.
+    """
     if current_user.id == user_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -95,6 +119,16 @@ async def delete_user(
             detail="User not found"
         )
     
+    username = user.username
+    if (user.prompt_count or 0) > get_settings().purge_inline_limit:
+        # Lock the account out now; the purge job deletes it once its prompts are gone
+        user.is_active = False
+        db.commit()
+        background_tasks.add_task(purge_user, user_id)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"message": f"User {username} is being deleted"}
+
     db.delete(user)
     db.commit()
-    return {"message": f"User {user.username} deleted successfully"}
\ No newline at end of file
+    get_history_cache().discard(user_id)
+    return {"message": f"User {username} deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,9 @@
+from pydantic import BaseModel, Field
+from typing import Dict
+
+class ProfileRequest(BaseModel):
+    seconds: float = Field(10, gt=0)
+    interval_ms: int = Field(10, ge=1, le=1000)
+    # Fraction of requests sampled per route prefix, e.g. {"/api/prompts": 1.0, "GET /api/users": 0.1}
+    route_rates: Dict[str, float] = {}
+    default_rate: float = Field(1.0, ge=0, le=1)
\ No newline at end of file
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import List
+
+from app.schemas.category import CategoryWithSubCategories
+from app.schemas.prompt import PromptWithDetails
+from app.schemas.user import UserProfile
+
+class Bootstrap(BaseModel):
+    profile: UserProfile
+    categories: List[CategoryWithSubCategories]
+    # First page of the learning history, newest first
+    history: List[PromptWithDetails]
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, validator
 from datetime import datetime
 from typing import List, Optional
 
@@ -33,4 +33,16 @@ class CategoryWithSubCategories(Category):
     sub_categories: List[SubCategory] = []
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class CategoryTemplateUpdate(BaseModel):
+    system_prompt: Optional[str] = None
+
+class SubCategoryTemplateUpdate(CategoryTemplateUpdate):
+    lesson_tokens: Optional[int] = None
+
+    @validator('lesson_tokens')
+    def lesson_tokens_must_be_positive(cls, v):
+        if v is not None and v <= 0:
+            raise ValueError('Lesson tokens must be positive')
+        return v
\ No newline at end of file
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, validator
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class PromptBase(BaseModel):
     prompt: str
@@ -14,6 +14,8 @@ class PromptBase(BaseModel):
 class PromptCreate(PromptBase):
     category_id: int
     sub_category_id: int
+    # Optional LLM provider override; defaults to the category routing
+    provider: Optional[str] = None
 
 class PromptUpdate(BaseModel):
     response: Optional[str] = None
@@ -24,7 +26,14 @@ class Prompt(PromptBase):
     category_id: int
     sub_category_id: int
     response: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    status: Optional[str] = None
+    model: Optional[str] = None
     created_at: datetime
+    enqueued_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -42,6 +51,7 @@ class AILessonRequest(BaseModel):
     prompt: str
     category: Optional[str] = None
     sub_category: Optional[str] = None
+    provider: Optional[str] = None
 
     @validator('topic', 'prompt')
     def fields_must_not_be_empty(cls, v):
@@ -52,4 +62,58 @@ class AILessonRequest(BaseModel):
 class AILessonResponse(BaseModel):
     lesson: str
     topic: str
-    success: bool = True
\ No newline at end of file
+    success: bool = True
+
+class LatencyStats(BaseModel):
+    count: int
+    p50_seconds: Optional[float] = None
+    p95_seconds: Optional[float] = None
+    p99_seconds: Optional[float] = None
+
+class CategoryLatency(BaseModel):
+    category_id: int
+    category_name: str
+    completed: int
+    failed: int
+    fallback: int
+    queue: LatencyStats
+    generation: LatencyStats
+
+class GenerationStats(BaseModel):
+    window_hours: float
+    since: datetime
+    stuck_threshold_minutes: float
+    stuck: int
+    categories: List[CategoryLatency]
+
+class SweepRequest(BaseModel):
+    # Regenerate at most this many prompts; all matching prompts when omitted
+    limit: Optional[int] = None
+    dry_run: bool = False
+
+class SweepStatus(BaseModel):
+    found: int
+    claimed: int
+    done: int
+    fallback: int
+    failed: int
+    dry_run: bool
+    running: bool
+    error: Optional[str] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+
+    @classmethod
+    def from_progress(cls, progress) -> "SweepStatus":
+        return cls(
+            found=progress.found,
+            claimed=progress.claimed,
+            done=progress.done,
+            fallback=progress.fallback,
+            failed=progress.failed,
+            dry_run=progress.dry_run,
+            running=progress.running,
+            error=progress.error,
+            started_at=datetime.fromtimestamp(progress.started_at),
+            finished_at=datetime.fromtimestamp(progress.finished_at) if progress.finished_at else None
+        )
\ No newline at end of file
@@ -1,158 +1,288 @@
-import openai
-import os
-from typing import Optional
-from dotenv import load_dotenv
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import AsyncContextManager, Callable, Dict, List, Optional, Tuple
 
-load_dotenv()
+from app.config import get_settings
+from app.services.llm_providers import (
+    MOCK,
+    CompletionRequest,
+    ProviderRouter,
+    generate_mock_lesson,
+)
+from app.services.template_registry import template_registry
+from app.services.token_budget import count_tokens, token_budget, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class LessonResult:
+    content: str
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    provider: Optional[str] = None
+    max_tokens: Optional[int] = None
+    truncated: bool = False
+    fallback: bool = False
+
+@dataclass
+class _InFlight:
+    future: asyncio.Future
+    prompt_ids: List[int] = field(default_factory=list)
+    # Set once the leader is admitted and the provider call begins
+    started: bool = False
+
+class _LeaderCancelled(Exception):
+    """The generation being waited on was cancelled; waiters retry on their own"""
+
+def normalize_prompt(prompt: str) -> str:
+    """Case- and whitespace-insensitive form of a prompt"""
+    return " ".join(prompt.lower().split())
+
+def coalescing_key(
+    provider: str,
+    topic: str,
+    prompt: str,
+    category: Optional[str],
+    sub_category: Optional[str]
+) -> Tuple:
+    """Requests with the same key produce interchangeable lessons"""
+    return (provider, category, sub_category, topic, normalize_prompt(prompt))
 
 class AIService:
-    def __init__(self):
-        self.api_key = os.getenv("OPENAI_API_KEY")
-        if self.api_key:
-            openai.api_key = self.api_key
-        if not self.api_key:
-            raise ValueError("OPENAI_API_KEY not found in environment variables")
-        self.model = "gpt-4o-mini"
-    
+    def __init__(self, router: Optional[ProviderRouter] = None):
+        self.router = router or ProviderRouter.from_env()
+        self._inflight: Dict[Tuple, _InFlight] = {}
+        self.coalescing_stats = {"generations": 0, "coalesced": 0}
+        self._active = 0
+
+    @property
+    def model(self) -> str:
+        """Model of the default provider"""
+        return self.router.providers[self.router.default].model
+
+    def has_provider(self, name: str) -> bool:
+        return name in self.router.providers
+
     async def generate_lesson(
-        self, 
-        topic: str, 
-        prompt: str, 
+        self,
+        topic: str,
+        prompt: str,
         category: Optional[str] = None,
-        sub_category: Optional[str] = None
+        sub_category: Optional[str] = None,
+        provider: Optional[str] = None
         ) -> str:
         """
         Generate an AI lesson based on topic and prompt.
-        Falls back to mock response if OpenAI API is not available.
+        Falls back to mock response if the provider is not available.
+        """
+        result = await self.generate(topic, prompt, category, sub_category, provider)
+        return result.content
+
+    async def generate(
+        self,
+        topic: str,
+        prompt: str,
+        category: Optional[str] = None,
+        sub_category: Optional[str] = None,
+        provider: Optional[str] = None
+        ) -> LessonResult:
+        """
+        Generate an AI lesson together with its token accounting.
+        Over-long prompts are truncated and max_tokens is sized from the
+        prompt length and the subcategory's typical lesson length. The
+        provider is picked per request, else per category routing.
         """
+        backend = self.router.resolve(category, sub_category, provider)
+        truncated = False
         try:
-            if not self.api_key:
-                return self._generate_mock_lesson(topic, prompt, category, sub_category)
-            
+            prompt, truncated = truncate_to_tokens(prompt, get_settings().max_prompt_tokens)
+
             # Construct the system message
             system_message = self._build_system_message(category, sub_category)
-            
+
             # Construct the user message
             user_message = f"Topic: {topic}\n\nRequest: {prompt}"
-            
-            response = await self._call_openai_api(system_message, user_message)
-            return response
-            
-        except Exception as e:
-            print(f"Error generating AI lesson: {e}")
+
+            prompt_tokens = count_tokens(system_message) + count_tokens(user_message)
+            max_tokens = token_budget.max_tokens_for(
+                sub_category,
+                prompt_tokens,
+                template_registry.lesson_tokens(category, sub_category)
+            )
+
+            completion = await backend.complete(CompletionRequest(
+                system_message=system_message,
+                user_message=user_message,
+                max_tokens=max_tokens,
+                topic=topic,
+                prompt=prompt,
+                category=category,
+                sub_category=sub_category
+            ))
+            completion_tokens = completion.completion_tokens or count_tokens(completion.content)
+            token_budget.record_lesson(sub_category, completion_tokens)
+            return LessonResult(
+                content=completion.content,
+                model=completion.model,
+                prompt_tokens=completion.prompt_tokens or prompt_tokens,
+                completion_tokens=completion_tokens,
+                provider=backend.name,
+                max_tokens=max_tokens,
+                truncated=truncated,
+                # No key or LLM_PROVIDER=mock: a canned lesson, not a real one
+                fallback=backend.name == MOCK
+            )
+
+        except Exception:
+            logger.exception("Error generating AI lesson with %s", backend.name, extra={"provider": backend.name})
             # Fallback to mock lesson
-            return self._generate_mock_lesson(topic, prompt, category, sub_category)
-    
-    def _build_system_message(self, category: Optional[str], sub_category: Optional[str]) -> str:
-        """Build system message for OpenAI based on category context"""
-        base_message = """You are an expert educator and tutor. Your role is to create engaging, 
-        educational lessons that are clear, informative, and easy to understand. 
-        
-        Guidelines:
-        - Provide comprehensive but digestible explanations
-        - Use examples and analogies when helpful
-        - Structure your response with clear sections
-        - Include key takeaways or summary points
-        - Keep the tone engaging and educational
+            return self._mock_result(topic, prompt, category, sub_category, truncated)
+
+    async def generate_coalesced(
+        self,
+        topic: str,
+        prompt: str,
+        category: Optional[str] = None,
+        sub_category: Optional[str] = None,
+        provider: Optional[str] = None,
+        prompt_id: Optional[int] = None,
+        admission: Optional[AsyncContextManager] = None,
+        on_start: Optional[Callable[[List[int]], None]] = None
+        ) -> Tuple[LessonResult, List[int]]:
+        """
+        Generate a lesson, sharing one in-flight generation between identical
+        concurrent requests. Returns the result and the ids of every prompt
+        that waited on it; only the caller that ran the generation gets the
+        ids (everyone else gets an empty list) so it can store the lesson for
+        all of them at once.
+
+        Only the caller that runs the generation enters admission (a scheduler
+        slot); identical requests wait on its result without taking one.
+        on_start is called with the prompt ids whose generation has begun.
         """
-        
-        if category and sub_category:
-            context = f"\n\nContext: You are teaching about {sub_category} in the {category} domain."
-            return base_message + context
-        elif category:
-            context = f"\n\nContext: You are teaching in the {category} domain."
-            return base_message + context
-        
-        return base_message
-    
-    async def _call_openai_api(self, system_message: str, user_message: str) -> str:
-        """Make API call to OpenAI"""
+        backend = self.router.resolve(category, sub_category, provider)
+        key = coalescing_key(backend.name, topic, prompt, category, sub_category)
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            if prompt_id is not None:
+                inflight.prompt_ids.append(prompt_id)
+            self.coalescing_stats["coalesced"] += 1
+            if inflight.started and on_start is not None and prompt_id is not None:
+                on_start([prompt_id])
+            try:
+                return await asyncio.shield(inflight.future), []
+            except _LeaderCancelled:
+                if prompt_id is not None and prompt_id in inflight.prompt_ids:
+                    inflight.prompt_ids.remove(prompt_id)
+                return await self.generate_coalesced(
+                    topic, prompt, category, sub_category, provider, prompt_id, admission, on_start
+                )
+
+        inflight = _InFlight(future=asyncio.get_running_loop().create_future())
+        if prompt_id is not None:
+            inflight.prompt_ids.append(prompt_id)
+        self._inflight[key] = inflight
+        self.coalescing_stats["generations"] += 1
+
+        async def run() -> LessonResult:
+            inflight.started = True
+            if on_start is not None:
+                on_start(list(inflight.prompt_ids))
+            return await self.generate(topic, prompt, category, sub_category, backend.name)
+
         try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": user_message}
-                ],
-                max_tokens=1500,
-                temperature=0.7
-            )
-            
-            return response.choices[0].message.content.strip()
-        
-        except Exception as e:
-            raise Exception(f"OpenAI API error: {e}")
-    
+            if admission is None:
+                result = await run()
+            else:
+                # Requests arriving while this one is queued join it instead of queueing too
+                async with admission:
+                    result = await run()
+        except BaseException:
+            inflight.future.set_exception(_LeaderCancelled())
+            # Nobody may be waiting; mark the exception as retrieved
+            inflight.future.exception()
+            raise
+        finally:
+            # Requests arriving from now on start a new generation
+            self._inflight.pop(key, None)
+
+        inflight.future.set_result(result)
+        return result, inflight.prompt_ids
+
+    def get_coalescing_stats(self) -> Dict[str, int]:
+        """Counters for shared in-flight generations"""
+        return {**self.coalescing_stats, "in_flight": len(self._inflight), "active": self._active}
+
+    @contextmanager
+    def in_flight(self):
+        """Mark a lesson generation as running so shutdown can wait for it"""
+        self._active += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+
+    async def drain(self, timeout: float) -> int:
+        """Wait up to timeout seconds for running generations; returns how many are left"""
+        deadline = time.monotonic() + timeout
+        while self._active and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        return self._active
+
+    async def aclose(self) -> None:
+        """Close provider clients"""
+        await self.router.aclose()
+
+    def _mock_result(
+        self,
+        topic: str,
+        prompt: str,
+        category: Optional[str],
+        sub_category: Optional[str],
+        truncated: bool
+        ) -> LessonResult:
+        content = self._generate_mock_lesson(topic, prompt, category, sub_category)
+        return LessonResult(
+            content=content,
+            model="mock",
+            prompt_tokens=count_tokens(prompt),
+            completion_tokens=count_tokens(content),
+            provider="mock",
+            truncated=truncated,
+            fallback=True
+        )
+
+    def _build_system_message(self, category: Optional[str], sub_category: Optional[str]) -> str:
+        """Look up the precompiled system message for the category context"""
+        return template_registry.system_message(category, sub_category)
+
     def _generate_mock_lesson(
-        self, 
-        topic: str, 
-        prompt: str, 
+        self,
+        topic: str,
+        prompt: str,
         category: Optional[str] = None,
         sub_category: Optional[str] = None
         ) -> str:
-        """Generate a mock lesson when OpenAI API is not available"""
-        
-        category_context = ""
-        if category and sub_category:
-            category_context = f" in {category} - {sub_category}"
-        elif category:
-            category_context = f" in {category}"
-        
-        mock_lesson = f"""
-        # {topic}{category_context}
-
-        ## Introduction
-        This is a comprehensive lesson about **{topic}** based on your request: "{prompt}"
-
-        ## Key Concepts
-
-        ### What is {topic}?
-        {topic} is an important subject that deserves careful study and understanding. This lesson will provide you with fundamental knowledge and practical insights.
-
-        ### Why Study {topic}?
-        Understanding {topic} is valuable because:
-        - It provides foundational knowledge in this field
-        - It helps develop critical thinking skills  
-        - It has practical applications in real-world scenarios
-        - It connects to broader concepts and ideas
-
-        ## Main Content
-
-        ### Core Principles
-        The fundamental principles of {topic} include several key elements that work together to create a comprehensive understanding. These principles have been developed through extensive research and practical application.
-
-        ### Practical Examples
-        Here are some practical examples to help illustrate the concepts:
-
-        1. **Example 1**: Real-world applications demonstrate how these principles work in practice
-        2. **Example 2**: Case studies show the impact and importance of understanding this topic
-        3. **Example 3**: Current examples highlight the relevance in today's world
-
-        ### Advanced Concepts
-        For those interested in deeper learning, advanced concepts in {topic} include:
-        - Complex interactions between different elements
-        - Historical development and evolution
-        - Future trends and developments
-        - Connections to other fields of study
-
-        ## Summary and Key Takeaways
-
-        ### What We've Learned
-        - {topic} is a multifaceted subject with many important aspects
-        - Understanding the core principles is essential for practical application
-        - Real-world examples help illustrate theoretical concepts
-        - Advanced concepts provide pathways for deeper learning
-
-        ### Next Steps
-        To continue your learning journey:
-        - Practice applying these concepts in different contexts
-        - Explore related topics and connections
-        - Seek out additional resources and materials
-        - Consider practical applications in your own life or work
-
-        *Note: This lesson was generated using the AI Learning Platform. For the most current information, consider consulting additional authoritative sources.*
-        """
-        return mock_lesson.strip()
+        """Generate a mock lesson when no provider is available"""
+        return generate_mock_lesson(topic, prompt, category, sub_category)
+
+_ai_service: Optional[AIService] = None
+
+def get_ai_service() -> AIService:
+    """Shared service instance; providers are configured on first use"""
+    global _ai_service
+    if _ai_service is None:
+        _ai_service = AIService()
+    return _ai_service
 
-# Create a global instance
-ai_service = AIService()
\ No newline at end of file
+async def close_ai_service() -> None:
+    """Close provider clients if the service was ever created"""
+    global _ai_service
+    if _ai_service is not None:
+        await _ai_service.aclose()
+        _ai_service = None
\ No newline at end of file
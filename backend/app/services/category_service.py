@@ -0,0 +1,19 @@
+from typing import List
+
+from sqlalchemy.orm import Session, selectinload
+
+from app.models.category import Category
+from app.schemas.category import CategoryWithSubCategories
+
+def get_category_tree(db: Session) -> List[CategoryWithSubCategories]:
+    """All categories with their subcategories, in two queries"""
+    categories = db.query(Category).options(selectinload(Category.sub_categories)).all()
+    return [
+        CategoryWithSubCategories(
+            id=category.id,
+            name=category.name,
+            created_at=category.created_at,
+            sub_categories=category.sub_categories
+        )
+        for category in categories
+    ]
\ No newline at end of file
@@ -0,0 +1,243 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Optional
+
+from app.config import get_settings
+
+LANE_INTERACTIVE = "interactive"
+LANE_BULK = "bulk"
+LANES = (LANE_INTERACTIVE, LANE_BULK)
+
+# Recent queue waits kept per lane for the percentiles
+WAIT_SAMPLES = 1000
+
+@dataclass
+class _Waiter:
+    user_id: Optional[int]
+    future: asyncio.Future
+    enqueued_at: float
+    # Expected work (lesson tokens), charged to the user when the generation is admitted
+    cost: float = 1.0
+
+@dataclass
+class _Lane:
+    name: str
+    weight: float
+    # Per-user FIFO queues
+    users: "OrderedDict[Optional[int], Deque[_Waiter]]" = field(default_factory=OrderedDict)
+    # Weighted fair queuing between users: each user's virtual time advances by the cost of
+    # what they were admitted, and the waiting user with the lowest runs next. Users share
+    # the lane by expected tokens rather than by request count, and one user's batch cannot
+    # starve others.
+    user_pass: Dict[Optional[int], float] = field(default_factory=dict)
+    virtual_time: float = 0.0
+    # Stride scheduling between lanes: the non-empty lane with the lowest pass runs next
+    pass_value: float = 0.0
+    queued: int = 0
+    running: int = 0
+    submitted: int = 0
+    completed: int = 0
+    waits: Deque[float] = field(default_factory=lambda: deque(maxlen=WAIT_SAMPLES))
+
+    def push(self, waiter: _Waiter) -> None:
+        if waiter.user_id not in self.users:
+            # A user returning from idle gets no credit for the time they had nothing queued
+            self.user_pass[waiter.user_id] = max(self.user_pass.get(waiter.user_id, 0.0), self.virtual_time)
+        self.users.setdefault(waiter.user_id, deque()).append(waiter)
+        self.queued += 1
+
+    def pop(self) -> _Waiter:
+        user_id = min(self.users, key=lambda user: self.user_pass[user])
+        waiters = self.users[user_id]
+        waiter = waiters.popleft()
+        if not waiters:
+            del self.users[user_id]
+        self.virtual_time = max(self.virtual_time, self.user_pass[user_id])
+        self.user_pass[user_id] += waiter.cost
+        self.queued -= 1
+        self._forget_idle_users()
+        return waiter
+
+    def charge(self, user_id: Optional[int], cost: float) -> None:
+        """Account for a generation admitted without queueing"""
+        start = max(self.user_pass.get(user_id, 0.0), self.virtual_time)
+        self.virtual_time = start
+        self.user_pass[user_id] = start + cost
+
+    def _forget_idle_users(self) -> None:
+        # Idle users at or behind the virtual time would restart from it anyway
+        if len(self.user_pass) > 2 * len(self.users) + 100:
+            for user_id in [user for user, at in self.user_pass.items()
+                            if user not in self.users and at <= self.virtual_time]:
+                del self.user_pass[user_id]
+
+    def remove(self, waiter: _Waiter) -> None:
+        waiters = self.users.get(waiter.user_id)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            self.queued -= 1
+            if not waiters:
+                del self.users[waiter.user_id]
+
+    def stats(self) -> Dict:
+        waits = sorted(self.waits)
+        def percentile(fraction: float) -> Optional[float]:
+            return round(waits[min(len(waits) - 1, int(fraction * len(waits)))], 3) if waits else None
+        return {
+            "queued": self.queued,
+            "running": self.running,
+            "waiting_users": len(self.users),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "wait_p50_seconds": percentile(0.5),
+            "wait_p95_seconds": percentile(0.95),
+            "wait_max_seconds": round(waits[-1], 3) if waits else None,
+        }
+
+class GenerationScheduler:
+    """Admission control for lesson generations in this worker
+
+    global_concurrency is the cap for all workers together; each worker runs
+    at most its share (max_concurrency), which follows the number of live
+    workers. Waiting generations are split into an interactive and a bulk
+    lane, shared by weight (stride scheduling), and within a lane users get
+    equal shares of expected lesson tokens (weighted fair queuing). A user
+    with many interactive generations outstanding has the rest demoted to
+    bulk, so a batch never sits in front of somebody else's single question.
+    """
+
+    def __init__(self, global_concurrency: int, interactive_weight: float = 4.0, interactive_per_user: int = 3):
+        self.global_concurrency = max(1, global_concurrency)
+        self.workers = 1
+        self.max_concurrency = self.global_concurrency
+        self.interactive_per_user = interactive_per_user
+        self._lanes = {
+            LANE_INTERACTIVE: _Lane(LANE_INTERACTIVE, max(interactive_weight, 1.0)),
+            LANE_BULK: _Lane(LANE_BULK, 1.0),
+        }
+        self._running = 0
+        self._interactive_load: Dict[Optional[int], int] = {}
+
+    @classmethod
+    def from_settings(cls) -> "GenerationScheduler":
+        settings = get_settings()
+        return cls(
+            settings.generation_concurrency,
+            settings.scheduler_interactive_weight,
+            settings.scheduler_interactive_per_user
+        )
+
+    def set_workers(self, workers: int) -> None:
+        """Resize this worker's share of the global cap; at least one slot per worker"""
+        self.workers = max(1, workers)
+        self.max_concurrency = max(1, self.global_concurrency // self.workers)
+        # Running generations finish normally when the share shrinks; a larger share admits waiters now
+        self._dispatch()
+
+    def lane_for(self, user_id: Optional[int], lane: str) -> str:
+        if lane == LANE_INTERACTIVE and self._interactive_load.get(user_id, 0) >= self.interactive_per_user:
+            return LANE_BULK
+        return lane
+
+    @asynccontextmanager
+    async def slot(self, user_id: Optional[int], lane: str = LANE_INTERACTIVE, cost: float = 1.0):
+        """Wait for a generation slot; the body runs while holding it
+
+        cost is the expected work (e.g. lesson tokens) charged to the user's fair share.
+        """
+        lane = self.lane_for(user_id, lane if lane in LANES else LANE_INTERACTIVE)
+        queue = self._lanes[lane]
+        queue.submitted += 1
+        if lane == LANE_INTERACTIVE:
+            self._interactive_load[user_id] = self._interactive_load.get(user_id, 0) + 1
+        try:
+            await self._acquire(queue, user_id, cost)
+            try:
+                yield lane
+            finally:
+                self._release(queue)
+        finally:
+            if lane == LANE_INTERACTIVE:
+                remaining = self._interactive_load.get(user_id, 1) - 1
+                if remaining:
+                    self._interactive_load[user_id] = remaining
+                else:
+                    self._interactive_load.pop(user_id, None)
+
+    async def _acquire(self, queue: _Lane, user_id: Optional[int], cost: float) -> None:
+        started = time.monotonic()
+        if self._running < self.max_concurrency and not self.queued:
+            queue.charge(user_id, cost)
+            self._grant(queue)
+            queue.waits.append(0.0)
+            return
+
+        if not queue.users:
+            # A lane returning from idle does not get credit for the time it had no work
+            queue.pass_value = max(queue.pass_value, self._min_pass())
+        waiter = _Waiter(user_id, asyncio.get_running_loop().create_future(), started, cost)
+        queue.push(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted and cancelled in the same tick: hand the slot on
+                self._release(queue)
+            else:
+                queue.remove(waiter)
+            raise
+        queue.waits.append(time.monotonic() - started)
+
+    def _grant(self, queue: _Lane) -> None:
+        self._running += 1
+        queue.running += 1
+
+    def _release(self, queue: _Lane) -> None:
+        self._running -= 1
+        queue.running -= 1
+        queue.completed += 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._running < self.max_concurrency:
+            waiting = [queue for queue in self._lanes.values() if queue.users]
+            if not waiting:
+                return
+            queue = min(waiting, key=lambda lane: lane.pass_value)
+            waiter = queue.pop()
+            if waiter.future.done():
+                continue
+            queue.pass_value += 1.0 / queue.weight
+            self._grant(queue)
+            waiter.future.set_result(None)
+
+    def _min_pass(self) -> float:
+        active = [queue.pass_value for queue in self._lanes.values() if queue.users]
+        return min(active) if active else max(queue.pass_value for queue in self._lanes.values())
+
+    @property
+    def queued(self) -> int:
+        return sum(queue.queued for queue in self._lanes.values())
+
+    def stats(self) -> Dict:
+        """Queue depth, running count and recent wait times per lane"""
+        return {
+            "global_concurrency": self.global_concurrency,
+            "workers": self.workers,
+            "max_concurrency": self.max_concurrency,
+            "running": self._running,
+            "queued": self.queued,
+            "lanes": {name: queue.stats() for name, queue in self._lanes.items()},
+        }
+
+_scheduler: Optional[GenerationScheduler] = None
+
+def get_generation_scheduler() -> GenerationScheduler:
+    """Shared scheduler for this worker, sized from settings on first use"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = GenerationScheduler.from_settings()
+    return _scheduler
\ No newline at end of file
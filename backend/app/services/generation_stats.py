@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Query, Session
+
+from app.models.category import Category
+from app.models.prompt import (
+    Prompt,
+    STATUS_DONE,
+    STATUS_FAILED,
+    STATUS_FALLBACK,
+    STATUS_GENERATING,
+    STATUS_QUEUED,
+)
+from app.schemas.prompt import CategoryLatency, GenerationStats, LatencyStats
+
+PERCENTILES = (0.5, 0.95, 0.99)
+
+def stuck_prompts_query(db: Session, older_than: timedelta) -> Query:
+    """Prompts still queued or generating after older_than; served by ix_prompts_status_enqueued_at"""
+    cutoff = datetime.now(timezone.utc) - older_than
+    return db.query(Prompt).filter(
+        Prompt.status.in_((STATUS_QUEUED, STATUS_GENERATING)),
+        Prompt.enqueued_at < cutoff
+    )
+
+def _percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Linear interpolation between closest ranks, like Postgres percentile_cont"""
+    if not values:
+        return None
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+def _latency(values: List[float]) -> LatencyStats:
+    values = sorted(values)
+    p50, p95, p99 = (_percentile(values, fraction) for fraction in PERCENTILES)
+    return LatencyStats(count=len(values), p50_seconds=p50, p95_seconds=p95, p99_seconds=p99)
+
+def _seconds(later, earlier) -> Optional[float]:
+    if later is None or earlier is None:
+        return None
+    # sqlite returns naive timestamps; both sides come from the same clock
+    if later.tzinfo is None or earlier.tzinfo is None:
+        later, earlier = later.replace(tzinfo=None), earlier.replace(tzinfo=None)
+    return (later - earlier).total_seconds()
+
+def _postgres_latencies(db: Session, since: datetime) -> Dict[int, dict]:
+    """Percentiles computed in the database with percentile_cont"""
+    queue_seconds = func.extract("epoch", Prompt.started_at - Prompt.enqueued_at)
+    generation_seconds = func.extract("epoch", Prompt.finished_at - Prompt.started_at)
+    columns = [Prompt.category_id]
+    for expression in (queue_seconds, generation_seconds):
+        columns.append(func.count(expression))
+        columns.extend(func.percentile_cont(fraction).within_group(expression) for fraction in PERCENTILES)
+    rows = db.query(*columns).filter(
+        Prompt.finished_at >= since,
+        Prompt.status.in_((STATUS_DONE, STATUS_FALLBACK))
+    ).group_by(Prompt.category_id).all()
+
+    def stats(values) -> LatencyStats:
+        count, p50, p95, p99 = values
+        return LatencyStats(count=count, p50_seconds=p50, p95_seconds=p95, p99_seconds=p99)
+
+    return {row[0]: {"queue": stats(row[1:5]), "generation": stats(row[5:9])} for row in rows}
+
+def _python_latencies(db: Session, since: datetime) -> Dict[int, dict]:
+    """Fallback for databases without percentile_cont (sqlite in development)"""
+    rows = db.query(
+        Prompt.category_id, Prompt.enqueued_at, Prompt.started_at, Prompt.finished_at
+    ).filter(
+        Prompt.finished_at >= since,
+        Prompt.status.in_((STATUS_DONE, STATUS_FALLBACK))
+    ).all()
+    samples: Dict[int, dict] = {}
+    for row in rows:
+        entry = samples.setdefault(row.category_id, {"queue": [], "generation": []})
+        queue_seconds = _seconds(row.started_at, row.enqueued_at)
+        generation_seconds = _seconds(row.finished_at, row.started_at)
+        if queue_seconds is not None:
+            entry["queue"].append(queue_seconds)
+        if generation_seconds is not None:
+            entry["generation"].append(generation_seconds)
+    return {
+        category_id: {"queue": _latency(entry["queue"]), "generation": _latency(entry["generation"])}
+        for category_id, entry in samples.items()
+    }
+
+def generation_stats(db: Session, window: timedelta, stuck_after: timedelta) -> GenerationStats:
+    """Queue and generation latency percentiles per category for prompts finished in the window"""
+    since = datetime.now(timezone.utc) - window
+    if db.get_bind().dialect.name == "postgresql":
+        latencies = _postgres_latencies(db, since)
+    else:
+        latencies = _python_latencies(db, since)
+
+    outcomes = db.query(
+        Prompt.category_id,
+        func.sum(case((Prompt.status == STATUS_DONE, 1), else_=0)),
+        func.sum(case((Prompt.status == STATUS_FAILED, 1), else_=0)),
+        func.sum(case((Prompt.status == STATUS_FALLBACK, 1), else_=0))
+    ).filter(Prompt.finished_at >= since).group_by(Prompt.category_id).all()
+    names = dict(db.query(Category.id, Category.name).all())
+
+    empty = LatencyStats(count=0)
+    categories = [
+        CategoryLatency(
+            category_id=category_id,
+            category_name=names.get(category_id, ""),
+            completed=done or 0,
+            failed=failed or 0,
+            fallback=fallback or 0,
+            queue=latencies.get(category_id, {}).get("queue", empty),
+            generation=latencies.get(category_id, {}).get("generation", empty)
+        )
+        for category_id, done, failed, fallback in outcomes
+    ]
+    return GenerationStats(
+        window_hours=window.total_seconds() / 3600,
+        since=since,
+        stuck_threshold_minutes=stuck_after.total_seconds() / 60,
+        stuck=stuck_prompts_query(db, stuck_after).count(),
+        categories=sorted(categories, key=lambda category: category.category_name)
+    )
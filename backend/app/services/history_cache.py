@@ -0,0 +1,251 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import desc
+from sqlalchemy.orm import Query, Session
+
+from app.config import get_settings
+from app.models.category import Category, SubCategory
+from app.models.prompt import Prompt
+from app.models.user import User
+
+def history_query(db: Session) -> Query:
+    """Prompt summaries joined with user, category and subcategory names, newest first"""
+    return db.query(
+        Prompt.id,
+        Prompt.user_id,
+        Prompt.category_id,
+        Prompt.sub_category_id,
+        Prompt.prompt,
+        Prompt.response,
+        Prompt.prompt_tokens,
+        Prompt.completion_tokens,
+        Prompt.status,
+        Prompt.model,
+        Prompt.created_at,
+        Prompt.enqueued_at,
+        Prompt.started_at,
+        Prompt.finished_at,
+        User.full_name.label("user_name"),
+        Category.name.label("category_name"),
+        SubCategory.name.label("sub_category_name")
+    ).join(User).join(Category).join(
+        # Explicit, or the subcategory would be joined through the category (one row per subcategory)
+        SubCategory, Prompt.sub_category_id == SubCategory.id
+    ).order_by(desc(Prompt.created_at), desc(Prompt.id))
+
+# Rough per-row cost of the dict and its short fields, on top of the text
+ROW_OVERHEAD_BYTES = 600
+
+def _rows_size(rows: List[dict]) -> int:
+    """Approximate memory held by cached rows, dominated by the lesson text"""
+    return sum(
+        ROW_OVERHEAD_BYTES + len(row["prompt"] or "") + len(row["response"] or "")
+        for row in rows
+    )
+
+@dataclass
+class _History:
+    version: int
+    # Newest first; rows are replaced, never mutated, so a page handed out stays intact
+    rows: List[dict]
+    # True when rows hold the user's whole history, not just the newest rows
+    complete: bool
+    size: int = 0
+
+class HistoryCache:
+    """Per-worker LRU of each active user's most recent prompt summaries
+
+    Every write to a user's prompts bumps users.history_version in the same
+    transaction. An entry is only served while its version matches the one
+    loaded with the user, so writes made by other workers invalidate it. Writes
+    made here are applied to the entry as well (write-through), so it stays a hit.
+    Entries hold lesson text, so besides max_users the cache is bounded by
+    max_bytes, evicting least recently used users.
+    """
+
+    def __init__(self, max_users: int = 1000, rows_per_user: int = 50, max_bytes: int = 64 * 1024 * 1024):
+        self.max_users = max_users
+        self.rows_per_user = rows_per_user
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[int, _History]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def covers(self, skip: int, limit: int) -> bool:
+        return self.max_users > 0 and skip + limit <= self.rows_per_user
+
+    def get(self, user_id: int, version: int, skip: int, limit: int) -> Optional[List[dict]]:
+        """A page of the user's history if the cached copy is current and long enough"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry.version != version or (skip + limit > len(entry.rows) and not entry.complete):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry.rows[skip:skip + limit]
+
+    def fill(self, user_id: int, version: int, rows: List[dict]) -> None:
+        with self._lock:
+            current = self._entries.get(user_id)
+            if current is not None and current.version > version:
+                # Read from a replica behind a write this worker already applied
+                return
+            if current is not None:
+                self._remove(user_id)
+            rows = rows[:self.rows_per_user]
+            entry = _History(version, rows, len(rows) < self.rows_per_user, _rows_size(rows))
+            if entry.size > self.max_bytes:
+                return
+            self._entries[user_id] = entry
+            self._bytes += entry.size
+            self._evict()
+
+    def _remove(self, user_id: int) -> None:
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _evict(self) -> None:
+        while self._entries and (len(self._entries) > self.max_users or self._bytes > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+
+    def apply(self, versions: Dict[int, int], change: Optional[Callable[[_History], None]]) -> None:
+        """Bring entries to the versions just committed, or drop them if they missed another write"""
+        with self._lock:
+            for user_id, version in versions.items():
+                entry = self._entries.get(user_id)
+                if entry is None:
+                    continue
+                if change is None or entry.version != version - 1:
+                    self._remove(user_id)
+                    continue
+                change(entry)
+                entry.version = version
+                self._bytes -= entry.size
+                entry.size = _rows_size(entry.rows)
+                self._bytes += entry.size
+            self._evict()
+
+    def discard(self, user_id: int) -> None:
+        with self._lock:
+            self._remove(user_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "users": len(self._entries),
+                "max_users": self.max_users,
+                "rows_per_user": self.rows_per_user,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            }
+
+_history_cache: Optional[HistoryCache] = None
+
+def get_history_cache() -> HistoryCache:
+    """Shared cache for this worker, sized from settings on first use"""
+    global _history_cache
+    if _history_cache is None:
+        settings = get_settings()
+        _history_cache = HistoryCache(
+            settings.history_cache_users if settings.history_cache_enabled else 0,
+            settings.history_cache_rows,
+            settings.history_cache_max_mb * 1024 * 1024
+        )
+    return _history_cache
+
+def recent_history(db: Session, user: User, skip: int, limit: int) -> List[dict]:
+    """A page of the user's history, from the cache when it covers the page"""
+    cache = get_history_cache()
+    if not cache.covers(skip, limit):
+        return [row._asdict() for row in history_query(db).filter(Prompt.user_id == user.id).offset(skip).limit(limit)]
+    rows = cache.get(user.id, user.history_version, skip, limit)
+    if rows is not None:
+        return rows
+    # The version is read before the rows, so the rows may already include a write
+    # committed in between; the changes applied for such a write are idempotent
+    version = db.query(User.history_version).filter(User.id == user.id).scalar() or 0
+    rows = [row._asdict() for row in history_query(db).filter(Prompt.user_id == user.id).limit(cache.rows_per_user)]
+    cache.fill(user.id, version, rows)
+    return rows[skip:skip + limit]
+
+@dataclass
+class HistoryWrite:
+    """History versions bumped inside a transaction, applied to the cache once it commits"""
+    versions: Dict[int, int] = field(default_factory=dict)
+    change: Optional[Callable[[_History], None]] = None
+
+    def apply(self) -> None:
+        if self.versions:
+            get_history_cache().apply(self.versions, self.change)
+
+def bump_history_versions(db: Session, user_ids: Iterable[int]) -> Dict[int, int]:
+    """Increment the users' history versions in the current transaction; returns the new versions"""
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return {}
+    # Setting updated_at to itself keeps its onupdate from firing: the profile did not change
+    db.query(User).filter(User.id.in_(user_ids)).update(
+        {User.history_version: User.history_version + 1, User.updated_at: User.updated_at},
+        synchronize_session=False
+    )
+    # The rows are locked by the update above, so these are exactly the versions this commit creates
+    return dict(db.query(User.id, User.history_version).filter(User.id.in_(user_ids)).all())
+
+def prompt_created(db: Session, prompt_id: int) -> HistoryWrite:
+    """Call after flushing a new prompt: its summary is put at the top of the cached history"""
+    row = history_query(db).filter(Prompt.id == prompt_id).first()
+    if row is None:
+        return HistoryWrite()
+    summary = row._asdict()
+    rows_per_user = get_history_cache().rows_per_user
+
+    def change(entry: _History) -> None:
+        # The entry may have been filled after this commit, with the prompt already in it
+        entry.rows = [summary] + [row for row in entry.rows if row["id"] != prompt_id]
+        if len(entry.rows) > rows_per_user:
+            entry.rows = entry.rows[:rows_per_user]
+            entry.complete = False
+
+    return HistoryWrite(bump_history_versions(db, [summary["user_id"]]), change)
+
+def prompts_updated(db: Session, prompt_ids: Iterable[int]) -> HistoryWrite:
+    """Call after updating prompts: their cached summaries are replaced with the new values"""
+    summaries = {row.id: row._asdict() for row in history_query(db).filter(Prompt.id.in_(list(prompt_ids)))}
+    if not summaries:
+        return HistoryWrite()
+
+    def change(entry: _History) -> None:
+        entry.rows = [summaries.get(row["id"], row) for row in entry.rows]
+
+    return HistoryWrite(bump_history_versions(db, {row["user_id"] for row in summaries.values()}), change)
+
+def prompts_deleted(db: Session, rows: Iterable) -> HistoryWrite:
+    """Call before deleting prompts, given their (id, user_id) rows: they are removed from the cached history"""
+    rows = list(rows)
+    deleted_ids = {row.id for row in rows}
+
+    def change(entry: _History) -> None:
+        entry.rows = [row for row in entry.rows if row["id"] not in deleted_ids]
+
+    return HistoryWrite(bump_history_versions(db, {row.user_id for row in rows}), change)
+
+def prompts_replaced(db: Session, user_ids: Iterable[int]) -> HistoryWrite:
+    """Call for bulk writes (imports): the users' cached histories are dropped"""
+    return HistoryWrite(bump_history_versions(db, user_ids))
\ No newline at end of file
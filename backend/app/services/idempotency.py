@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+import logging
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models.idempotency_key import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+PURGE_INTERVAL_SECONDS = 3600
+
+def request_fingerprint(payload: dict) -> str:
+    """Stable hash of a request body, to spot a key reused for a different request"""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+def claim_idempotency_key(db: Session, user_id: int, key: str, request_hash: str) -> Optional[int]:
+    """Reserve key for this request
+
+    Returns None once the key is reserved, or the prompt id an earlier request
+    with the same key created. Raises 409 while that request is still in
+    flight and 422 when the key was used for a different request.
+    """
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters"
+        )
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(hours=get_settings().idempotency_key_ttl_hours)
+    try:
+        # The unique (user_id, key) index makes the first request win; the rest land below
+        db.add(IdempotencyKey(user_id=user_id, key=key, request_hash=request_hash, expires_at=expires_at))
+        db.commit()
+        return None
+    except IntegrityError:
+        db.rollback()
+
+    # An expired key that the purge has not removed yet is taken over
+    reclaimed = db.query(IdempotencyKey).filter(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key,
+        IdempotencyKey.expires_at < now
+    ).update({
+        IdempotencyKey.request_hash: request_hash,
+        IdempotencyKey.prompt_id: None,
+        IdempotencyKey.expires_at: expires_at
+    }, synchronize_session=False)
+    db.commit()
+    if reclaimed:
+        return None
+
+    existing = db.query(IdempotencyKey).filter(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key
+    ).first()
+    if existing is None or existing.prompt_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is still in progress"
+        )
+    if existing.request_hash != request_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used for a different request"
+        )
+    return existing.prompt_id
+
+def attach_prompt(db: Session, user_id: int, key: str, prompt_id: int) -> None:
+    """Record the prompt a key created; call before the transaction inserting the prompt commits"""
+    db.query(IdempotencyKey).filter(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key
+    ).update({IdempotencyKey.prompt_id: prompt_id}, synchronize_session=False)
+
+def release_idempotency_key(db: Session, user_id: int, key: str) -> None:
+    """Forget a reservation whose request failed, so the client can retry with the same key"""
+    db.rollback()
+    db.query(IdempotencyKey).filter(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key,
+        IdempotencyKey.prompt_id.is_(None)
+    ).delete(synchronize_session=False)
+    db.commit()
+
+def purge_idempotency_keys() -> int:
+    """Delete expired keys; served by the expires_at index"""
+    db = SessionLocal()
+    try:
+        deleted = db.query(IdempotencyKey).filter(
+            IdempotencyKey.expires_at < datetime.now(timezone.utc)
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+    finally:
+        db.close()
+
+# TTL cleanup running in this worker
+_purge_task: Optional[asyncio.Task] = None
+
+async def _purge_forever() -> None:
+    while True:
+        await asyncio.sleep(PURGE_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(purge_idempotency_keys)
+        except Exception:
+            logger.exception("Error purging idempotency keys")
+
+def start_idempotency_purge() -> None:
+    global _purge_task
+    if _purge_task is None or _purge_task.done():
+        _purge_task = asyncio.create_task(_purge_forever())
+
+async def stop_idempotency_purge() -> None:
+    global _purge_task
+    if _purge_task is not None:
+        _purge_task.cancel()
+        try:
+            await _purge_task
+        except asyncio.CancelledError:
+            pass
+        _purge_task = None
\ No newline at end of file
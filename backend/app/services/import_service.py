@@ -0,0 +1,366 @@
+import csv
+import io
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.orm import Session
+
+from app.models.category import Category, SubCategory
+from app.models.prompt import Prompt, STATUS_DONE, STATUS_QUEUED
+from app.models.user import User
+from app.services.history_cache import bump_history_versions
+
+# Loading strategies
+METHOD_AUTO = "auto"
+METHOD_COPY = "copy"
+METHOD_INSERT = "insert"
+METHODS = (METHOD_AUTO, METHOD_COPY, METHOD_INSERT)
+
+DEFAULT_BATCH_SIZE = 1000
+
+@dataclass
+class ImportResult:
+    table: str
+    rows_read: int = 0
+    rows_inserted: int = 0
+    rows_skipped: int = 0
+    seconds: float = 0.0
+    method: str = METHOD_INSERT
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        if self.seconds <= 0:
+            return float(self.rows_inserted)
+        return self.rows_inserted / self.seconds
+
+    def summary(self) -> str:
+        return (
+            f"{self.table}: read {self.rows_read}, inserted {self.rows_inserted}, "
+            f"skipped {self.rows_skipped} in {self.seconds:.2f}s "
+            f"({self.rows_per_second:.0f} rows/s via {self.method})"
+        )
+
+class ImportValidationError(ValueError):
+    """Raised when input records fail validation"""
+
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        super().__init__(f"{len(errors)} invalid record(s): " + "; ".join(errors[:5]))
+
+def load_records(path: str) -> List[dict]:
+    """Read records from a JSON or CSV file"""
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            return [dict(row) for row in csv.DictReader(f)]
+
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    # A taxonomy may be given as {"Category": ["Sub", ...]} like seed_data.py
+    if isinstance(data, dict):
+        if "records" in data:
+            return list(data["records"])
+        return taxonomy_records_from_mapping(data)
+    if not isinstance(data, list):
+        raise ImportValidationError([f"{path}: expected a list of records"])
+    return data
+
+def taxonomy_records_from_mapping(mapping: Dict[str, Iterable[str]]) -> List[dict]:
+    """Flatten a {category: [subcategories]} mapping into taxonomy records"""
+    records = []
+    for category_name, subcategories in mapping.items():
+        records.append({"category": category_name})
+        for subcategory_name in subcategories or []:
+            records.append({"category": category_name, "subcategory": subcategory_name})
+    return records
+
+def _clean(value) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+def _parse_datetime(value) -> Optional[datetime]:
+    value = _clean(value)
+    if value is None:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    # Offsets are normalized so the same instant always compares (and is stored) alike
+    return parsed.astimezone(timezone.utc) if parsed.tzinfo else parsed
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Comparable form of a timestamp: aware values are converted to UTC before the offset is dropped"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def validate_taxonomy(records: List[dict]) -> Tuple[List[Tuple[str, Optional[str]]], List[str]]:
+    """Validate taxonomy records and drop duplicates within the input"""
+    rows = []
+    errors = []
+    seen = set()
+    for line, record in enumerate(records, start=1):
+        category_name = _clean(record.get("category"))
+        subcategory_name = _clean(record.get("subcategory") or record.get("sub_category"))
+        if not category_name:
+            errors.append(f"record {line}: category is required")
+            continue
+        key = (category_name, subcategory_name)
+        if key in seen:
+            continue
+        seen.add(key)
+        rows.append(key)
+    return rows, errors
+
+def validate_prompts(records: List[dict]) -> Tuple[List[dict], List[str]]:
+    """Validate historical prompt records and drop duplicates within the input"""
+    rows = []
+    errors = []
+    seen = set()
+    for line, record in enumerate(records, start=1):
+        row = {
+            "username": _clean(record.get("username")),
+            "category": _clean(record.get("category")),
+            "subcategory": _clean(record.get("subcategory") or record.get("sub_category")),
+            "prompt": _clean(record.get("prompt")),
+            "response": _clean(record.get("response")),
+        }
+        missing = [name for name in ("username", "category", "subcategory", "prompt") if not row[name]]
+        if missing:
+            errors.append(f"record {line}: missing {', '.join(missing)}")
+            continue
+        try:
+            row["created_at"] = _parse_datetime(record.get("created_at"))
+        except ValueError:
+            errors.append(f"record {line}: invalid created_at {record.get('created_at')!r}")
+            continue
+        row["username"] = row["username"].lower()
+        key = (row["username"], row["category"], row["subcategory"], row["prompt"], row["created_at"])
+        if key in seen:
+            continue
+        seen.add(key)
+        rows.append(row)
+    return rows, errors
+
+def _resolve_method(db: Session, method: str) -> str:
+    if method not in METHODS:
+        raise ValueError(f"Unknown import method: {method}")
+    is_postgres = db.get_bind().dialect.name == "postgresql"
+    if method == METHOD_COPY and not is_postgres:
+        raise ValueError("COPY is only available on PostgreSQL")
+    if method == METHOD_AUTO:
+        return METHOD_COPY if is_postgres else METHOD_INSERT
+    return method
+
+def _insert_batches(db: Session, table, rows: List[dict], batch_size: int) -> None:
+    """Insert rows with multi-row INSERT statements"""
+    for start in range(0, len(rows), batch_size):
+        db.execute(insert(table), rows[start:start + batch_size])
+
+def _copy_rows(db: Session, table_name: str, columns: List[str], rows: List[dict]) -> None:
+    """Stream rows into a table with PostgreSQL COPY"""
+    buffer = io.StringIO()
+    for row in rows:
+        # COPY only treats an unquoted \N as NULL, so every value is quoted and a
+        # literal \N in the data stays text
+        buffer.write(",".join(
+            r"\N" if row[column] is None else '"' + str(row[column]).replace('"', '""') + '"'
+            for column in columns
+        ))
+        buffer.write("\n")
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table_name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+def import_taxonomy(
+    db: Session,
+    records: List[dict],
+    method: str = METHOD_AUTO,
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> List[ImportResult]:
+    """Import categories and subcategories, skipping names that already exist.
+
+    Runs inside the caller's transaction; the caller commits.
+    """
+    method = _resolve_method(db, method)
+    rows, errors = validate_taxonomy(records)
+    if errors:
+        raise ImportValidationError(errors)
+
+    category_result = ImportResult(table="categories", method=METHOD_INSERT)
+    subcategory_result = ImportResult(table="sub_categories", method=method)
+
+    # Categories are few; a single multi-row insert is enough
+    started = time.perf_counter()
+    category_names = list(dict.fromkeys(category_name for category_name, _ in rows))
+    category_result.rows_read = len(category_names)
+    existing = {name for name, in db.execute(select(Category.name))}
+    new_categories = [{"name": name} for name in category_names if name not in existing]
+    if new_categories:
+        _insert_batches(db, Category.__table__, new_categories, batch_size)
+    category_result.rows_inserted = len(new_categories)
+    category_result.rows_skipped = len(category_names) - len(new_categories)
+    category_result.seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    category_ids = {
+        name: category_id
+        for category_id, name in db.execute(select(Category.id, Category.name))
+    }
+    existing_subcategories = set(db.execute(select(SubCategory.category_id, SubCategory.name)))
+    subcategory_keys = [(category_ids[c], s) for c, s in rows if s]
+    subcategory_result.rows_read = len(subcategory_keys)
+    new_subcategories = [
+        {"category_id": category_id, "name": name}
+        for category_id, name in subcategory_keys
+        if (category_id, name) not in existing_subcategories
+    ]
+    if new_subcategories:
+        if method == METHOD_COPY:
+            _copy_rows(db, SubCategory.__tablename__, ["category_id", "name"], new_subcategories)
+        else:
+            _insert_batches(db, SubCategory.__table__, new_subcategories, batch_size)
+    subcategory_result.rows_inserted = len(new_subcategories)
+    subcategory_result.rows_skipped = len(subcategory_keys) - len(new_subcategories)
+    subcategory_result.seconds = time.perf_counter() - started
+
+    return [category_result, subcategory_result]
+
+def import_prompts(
+    db: Session,
+    records: List[dict],
+    method: str = METHOD_AUTO,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    skip_invalid: bool = False
+) -> ImportResult:
+    """Import historical prompts for existing users and subcategories.
+
+    A prompt is considered already imported when the same user asked the same
+    prompt in the same subcategory at the same time, so re-running an import
+    is a no-op. Runs inside the caller's transaction; the caller commits.
+    """
+    method = _resolve_method(db, method)
+    result = ImportResult(table="prompts", method=method, rows_read=len(records))
+    started = time.perf_counter()
+
+    rows, errors = validate_prompts(records)
+
+    # Resolve names to ids in memory instead of per row
+    user_ids = {
+        username: user_id
+        for user_id, username in db.execute(
+            select(User.id, User.username).where(
+                User.username.in_({row["username"] for row in rows})
+            )
+        )
+    }
+    subcategory_ids = {
+        (category_name, subcategory_name): (category_id, subcategory_id)
+        for category_id, category_name, subcategory_id, subcategory_name in db.execute(
+            select(Category.id, Category.name, SubCategory.id, SubCategory.name)
+            .join(SubCategory, SubCategory.category_id == Category.id)
+        )
+    }
+
+    resolved = []
+    for row in rows:
+        user_id = user_ids.get(row["username"])
+        ids = subcategory_ids.get((row["category"], row["subcategory"]))
+        if user_id is None:
+            errors.append(f"unknown user {row['username']!r}")
+            continue
+        if ids is None:
+            errors.append(f"unknown subcategory {row['category']!r} / {row['subcategory']!r}")
+            continue
+        resolved.append({
+            "user_id": user_id,
+            "category_id": ids[0],
+            "sub_category_id": ids[1],
+            "prompt": row["prompt"],
+            "response": row["response"],
+            "created_at": row["created_at"],
+            "status": STATUS_QUEUED if row["response"] is None else STATUS_DONE,
+        })
+
+    result.errors = errors
+    if errors and not skip_invalid:
+        raise ImportValidationError(errors)
+
+    if method == METHOD_COPY:
+        result.rows_inserted = _copy_prompts(db, resolved)
+    else:
+        result.rows_inserted = _insert_new_prompts(db, resolved, batch_size)
+    if result.rows_inserted:
+        # Workers drop their cached history for these users
+        bump_history_versions(db, {row["user_id"] for row in resolved})
+
+    result.rows_skipped = result.rows_read - result.rows_inserted
+    result.seconds = time.perf_counter() - started
+    return result
+
+_PROMPT_COLUMNS = ["user_id", "category_id", "sub_category_id", "prompt", "response", "created_at", "status"]
+
+def _copy_prompts(db: Session, rows: List[dict]) -> int:
+    """COPY prompts into a staging table and insert only the ones not yet present"""
+    db.execute(text(
+        "CREATE TEMP TABLE prompts_import ("
+        "user_id integer, category_id integer, sub_category_id integer, "
+        "prompt text, response text, created_at timestamptz, status varchar(16)"
+        ") ON COMMIT DROP"
+    ))
+    _copy_rows(db, "prompts_import", _PROMPT_COLUMNS, rows)
+    inserted = db.execute(text(
+        "INSERT INTO prompts (user_id, category_id, sub_category_id, prompt, response, created_at, status) "
+        "SELECT s.user_id, s.category_id, s.sub_category_id, s.prompt, s.response, "
+        "COALESCE(s.created_at, now()), s.status "
+        "FROM prompts_import s "
+        "WHERE NOT EXISTS ("
+        "  SELECT 1 FROM prompts p "
+        "  WHERE p.user_id = s.user_id "
+        "  AND p.sub_category_id = s.sub_category_id "
+        "  AND p.prompt = s.prompt "
+        "  AND (s.created_at IS NULL OR p.created_at = s.created_at)"
+        ")"
+    ))
+    return inserted.rowcount
+
+def _insert_new_prompts(db: Session, rows: List[dict], batch_size: int) -> int:
+    """Insert prompts in batches, skipping ones that already exist"""
+    inserted = 0
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        existing = {}
+        for user_id, sub_category_id, prompt, created_at in db.execute(
+            select(Prompt.user_id, Prompt.sub_category_id, Prompt.prompt, Prompt.created_at).where(
+                Prompt.user_id.in_({row["user_id"] for row in batch})
+            )
+        ):
+            existing.setdefault((user_id, sub_category_id, prompt), set()).add(_naive_utc(created_at))
+
+        new_rows = []
+        for row in batch:
+            times = existing.get((row["user_id"], row["sub_category_id"], row["prompt"]))
+            created_at = _naive_utc(row["created_at"])
+            if times is not None and (created_at is None or created_at in times):
+                continue
+            new_rows.append({k: v for k, v in row.items() if k != "created_at" or v is not None})
+
+        # Rows without a timestamp fall back to the column default
+        for has_created_at in (True, False):
+            group = [row for row in new_rows if ("created_at" in row) == has_created_at]
+            if group:
+                db.execute(insert(Prompt.__table__), group)
+        inserted += len(new_rows)
+    return inserted
\ No newline at end of file
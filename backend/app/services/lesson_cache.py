@@ -0,0 +1,310 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, time as clock_time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models.cached_lesson import CachedLesson
+from app.models.category import Category, SubCategory
+from app.models.prompt import Prompt
+from app.services.ai_service import get_ai_service, normalize_prompt
+from app.services.generation_scheduler import LANE_BULK, get_generation_scheduler
+from app.services.lesson_generation import lesson_topic
+from app.services.token_budget import count_tokens
+
+logger = logging.getLogger(__name__)
+
+HITS_FLUSH_SECONDS = 60
+
+# Cache hits counted in this worker since the last flush, by cached lesson id
+_pending_hits: Counter = Counter()
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(normalize_prompt(prompt).encode()).hexdigest()
+
+def find_cached_lesson(db: Session, sub_category_id: int, prompt: str) -> Optional[CachedLesson]:
+    """Stored lesson for this prompt in the subcategory, unless it is older than the max age
+
+    The hit is counted in memory; writing it here would lock the hottest row
+    for the rest of every request serving it.
+    """
+    max_age = timedelta(days=get_settings().lesson_cache_max_age_days)
+    cached = db.query(CachedLesson).filter(
+        CachedLesson.sub_category_id == sub_category_id,
+        CachedLesson.prompt_hash == prompt_hash(prompt),
+        CachedLesson.generated_at >= datetime.now(timezone.utc) - max_age
+    ).first()
+    if cached is not None:
+        _pending_hits[cached.id] += 1
+    return cached
+
+def flush_cached_lesson_hits() -> int:
+    """Add the hits counted in this worker to cached_lessons.hits, one short transaction"""
+    if not _pending_hits:
+        return 0
+    hits = dict(_pending_hits)
+    _pending_hits.clear()
+    db = SessionLocal()
+    try:
+        for lesson_id, count in hits.items():
+            # Lessons dropped since the hit simply match no row
+            db.query(CachedLesson).filter(CachedLesson.id == lesson_id).update(
+                {CachedLesson.hits: CachedLesson.hits + count}, synchronize_session=False
+            )
+        db.commit()
+    except Exception:
+        _pending_hits.update(hits)
+        raise
+    finally:
+        db.close()
+    return len(hits)
+
+# Hit counter flush running in this worker
+_flush_task: Optional[asyncio.Task] = None
+
+async def _flush_hits_forever() -> None:
+    while True:
+        await asyncio.sleep(HITS_FLUSH_SECONDS)
+        try:
+            await asyncio.to_thread(flush_cached_lesson_hits)
+        except Exception:
+            logger.exception("Error flushing cached lesson hits")
+
+def start_hits_flush() -> None:
+    global _flush_task
+    if _flush_task is None or _flush_task.done():
+        _flush_task = asyncio.create_task(_flush_hits_forever())
+
+async def stop_hits_flush() -> None:
+    """Stop the periodic flush and write the hits counted since the last one"""
+    global _flush_task
+    if _flush_task is not None:
+        _flush_task.cancel()
+        try:
+            await _flush_task
+        except asyncio.CancelledError:
+            pass
+        _flush_task = None
+    try:
+        await asyncio.to_thread(flush_cached_lesson_hits)
+    except Exception:
+        logger.exception("Error flushing cached lesson hits")
+
+def invalidate_cached_lessons(db: Session, category_id: Optional[int] = None, sub_category_id: Optional[int] = None) -> int:
+    """Drop stored lessons whose template changed; the caller commits"""
+    query = db.query(CachedLesson)
+    if sub_category_id is not None:
+        query = query.filter(CachedLesson.sub_category_id == sub_category_id)
+    elif category_id is not None:
+        query = query.filter(CachedLesson.sub_category_id.in_(
+            db.query(SubCategory.id).filter(SubCategory.category_id == category_id)
+        ))
+    return query.delete(synchronize_session=False)
+
+def parse_window(window: str) -> Tuple[clock_time, clock_time]:
+    """Parse "HH:MM-HH:MM"; the window may wrap past midnight"""
+    start, end = (part.strip() for part in window.split("-", 1))
+    return clock_time.fromisoformat(start), clock_time.fromisoformat(end)
+
+def in_window(window: str, now: Optional[datetime] = None) -> bool:
+    """Whether the local server time is inside the off-peak window"""
+    start, end = parse_window(window)
+    current = (now or datetime.now()).time()
+    if start <= end:
+        return start <= current < end
+    return current >= start or current < end
+
+@dataclass
+class PopularPrompt:
+    sub_category_id: int
+    prompt: str
+    count: int
+
+def popular_prompts(db: Session, since: datetime, per_subcategory: int, min_count: int) -> List[PopularPrompt]:
+    """Most frequent normalized prompts per subcategory since a point in time"""
+    postgres = db.get_bind().dialect.name == "postgresql"
+    normalized = func.lower(func.trim(Prompt.prompt))
+    if postgres:
+        # Collapse whitespace in the database so HAVING can drop rare prompts early
+        normalized = func.regexp_replace(normalized, r"\s+", " ", "g")
+    query = db.query(
+        Prompt.sub_category_id,
+        func.min(Prompt.prompt).label("sample"),
+        func.count(Prompt.id).label("count")
+    ).filter(Prompt.created_at >= since).group_by(Prompt.sub_category_id, normalized)
+    if postgres:
+        query = query.having(func.count(Prompt.id) >= min_count)
+
+    # Merge variants the database could not normalize, then keep the top prompts per subcategory
+    counts: Dict[Tuple[int, str], PopularPrompt] = {}
+    for row in query.all():
+        key = (row.sub_category_id, normalize_prompt(row.sample))
+        popular = counts.get(key)
+        if popular is None:
+            counts[key] = PopularPrompt(row.sub_category_id, " ".join(row.sample.split()), row.count)
+        else:
+            popular.count += row.count
+    by_subcategory: Dict[int, List[PopularPrompt]] = {}
+    for popular in counts.values():
+        if popular.count >= min_count:
+            by_subcategory.setdefault(popular.sub_category_id, []).append(popular)
+    results = []
+    for prompts in by_subcategory.values():
+        prompts.sort(key=lambda popular: popular.count, reverse=True)
+        results.extend(prompts[:per_subcategory])
+    results.sort(key=lambda popular: popular.count, reverse=True)
+    return results
+
+@dataclass
+class WarmProgress:
+    candidates: int = 0
+    fresh: int = 0
+    generated: int = 0
+    failed: int = 0
+    tokens: int = 0
+    budget_exhausted: bool = False
+    window_closed: bool = False
+    dry_run: bool = False
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    def summary(self) -> str:
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        budget = ", token budget reached" if self.budget_exhausted else ""
+        window = ", stopped at the end of the off-peak window" if self.window_closed else ""
+        return (
+            f"{self.candidates} popular prompts, {self.fresh} already fresh, {self.generated} generated, "
+            f"{self.failed} failed, {self.tokens} tokens in {elapsed:.1f}s{budget}{window}"
+        )
+
+class LessonWarmer:
+    """Pre-generates lessons for the most asked prompts in each subcategory"""
+
+    def __init__(
+        self,
+        token_budget: int = 200000,
+        per_subcategory: int = 3,
+        min_count: int = 3,
+        lookback: timedelta = timedelta(days=30),
+        refresh_after: timedelta = timedelta(days=7)
+    ):
+        self.token_budget = token_budget
+        self.per_subcategory = per_subcategory
+        self.min_count = min_count
+        self.lookback = lookback
+        self.refresh_after = refresh_after
+
+    @classmethod
+    def from_settings(cls, **overrides) -> "LessonWarmer":
+        settings = get_settings()
+        options = dict(
+            token_budget=settings.warm_token_budget,
+            per_subcategory=settings.warm_per_subcategory,
+            min_count=settings.warm_min_count,
+            lookback=timedelta(days=settings.warm_lookback_days),
+            refresh_after=timedelta(days=settings.warm_refresh_days)
+        )
+        options.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(**options)
+
+    async def warm(self, dry_run: bool = False, window: Optional[str] = None) -> WarmProgress:
+        """Generate missing or stale lessons, most popular first, until the token budget runs out
+
+        With a window ("HH:MM-HH:MM"), the run also stops before the next
+        lesson once the local time is outside it.
+        """
+        progress = WarmProgress(dry_run=dry_run)
+        now = datetime.now(timezone.utc)
+        db = SessionLocal()
+        try:
+            candidates = popular_prompts(db, now - self.lookback, self.per_subcategory, self.min_count)
+            fresh_hashes = {
+                (sub_category_id, hash_value)
+                for sub_category_id, hash_value in db.query(CachedLesson.sub_category_id, CachedLesson.prompt_hash).filter(
+                    CachedLesson.generated_at >= now - self.refresh_after
+                )
+            }
+            names = {
+                sub_category.id: (category_name, sub_category.name)
+                for sub_category, category_name in db.query(SubCategory, Category.name).join(Category)
+            }
+        finally:
+            db.close()
+
+        progress.candidates = len(candidates)
+        default_tokens = get_settings().default_lesson_tokens
+        ai_service = get_ai_service()
+        try:
+            for popular in candidates:
+                if window is not None and not in_window(window):
+                    progress.window_closed = True
+                    break
+                if (popular.sub_category_id, prompt_hash(popular.prompt)) in fresh_hashes:
+                    progress.fresh += 1
+                    continue
+                if popular.sub_category_id not in names:
+                    continue
+                # Stop before a lesson that would likely overrun the budget
+                if progress.tokens + count_tokens(popular.prompt) + default_tokens > self.token_budget:
+                    progress.budget_exhausted = True
+                    break
+                if dry_run:
+                    progress.tokens += count_tokens(popular.prompt) + default_tokens
+                    continue
+
+                category_name, sub_category_name = names[popular.sub_category_id]
+                # The bulk lane of this process's scheduler. Run from warm_lessons.py that is a
+                # scheduler of its own, not shared with the API workers, so their learners get
+                # no priority over it; the off-peak window is what keeps it out of their way.
+                async with get_generation_scheduler().slot(None, LANE_BULK):
+                    result = await ai_service.generate(
+                        lesson_topic(category_name, sub_category_name),
+                        popular.prompt,
+                        category_name,
+                        sub_category_name
+                    )
+                progress.tokens += result.prompt_tokens + result.completion_tokens
+                if result.fallback:
+                    progress.failed += 1
+                    continue
+                store_cached_lesson(popular, result)
+                progress.generated += 1
+        finally:
+            progress.finished_at = time.time()
+        return progress
+
+def store_cached_lesson(popular: PopularPrompt, result) -> None:
+    """Insert or refresh the stored lesson for a popular prompt"""
+    db = SessionLocal()
+    try:
+        values = {
+            CachedLesson.prompt: popular.prompt,
+            CachedLesson.response: result.content,
+            CachedLesson.model: result.model,
+            CachedLesson.prompt_tokens: result.prompt_tokens,
+            CachedLesson.completion_tokens: result.completion_tokens,
+            CachedLesson.popularity: popular.count,
+            CachedLesson.generated_at: func.now()
+        }
+        hash_value = prompt_hash(popular.prompt)
+        updated = db.query(CachedLesson).filter(
+            CachedLesson.sub_category_id == popular.sub_category_id,
+            CachedLesson.prompt_hash == hash_value
+        ).update(values, synchronize_session=False)
+        if not updated:
+            db.add(CachedLesson(
+                sub_category_id=popular.sub_category_id,
+                prompt_hash=hash_value,
+                **{column.key: value for column, value in values.items() if column.key != "generated_at"}
+            ))
+        db.commit()
+    finally:
+        db.close()
\ No newline at end of file
@@ -0,0 +1,214 @@
+import asyncio
+import json
+from collections import deque
+from datetime import datetime, timedelta, timezone
+import logging
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import event, or_, text
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal, get_engine
+from app.models.lesson_event import LessonEvent
+from app.models.prompt import Prompt
+
+logger = logging.getLogger(__name__)
+
+# Postgres NOTIFY channel shared by every worker
+CHANNEL = "lesson_events"
+# Events buffered per WebSocket before the oldest are dropped (clients catch up with ?since=)
+QUEUE_SIZE = 100
+PURGE_INTERVAL_SECONDS = 600
+# Ids are taken when an event is inserted but it is delivered when its transaction commits,
+# so a lower id can arrive after a higher one. Replays reach this far back before the last
+# event the client saw; lesson transactions are short, so a minute is plenty.
+REPLAY_OVERLAP = timedelta(seconds=60)
+# Event ids remembered per socket to drop the ones already delivered
+SEEN_IDS = 1000
+
+def event_payload(lesson_event: LessonEvent) -> dict:
+    return {
+        "type": "lesson_ready",
+        "id": lesson_event.id,
+        "user_id": lesson_event.user_id,
+        "prompt_id": lesson_event.prompt_id
+    }
+
+def record_lessons_ready(db: Session, prompt_ids: List[int]) -> List[LessonEvent]:
+    """Write outbox events for completed prompts; subscribers hear about them once db commits"""
+    rows = db.query(Prompt.id, Prompt.user_id).filter(Prompt.id.in_(prompt_ids)).all()
+    events = [LessonEvent(user_id=row.user_id, prompt_id=row.id) for row in rows]
+    db.add_all(events)
+    db.flush()
+
+    payloads = [event_payload(lesson_event) for lesson_event in events]
+    if db.get_bind().dialect.name == "postgresql":
+        # NOTIFY is transactional, so listeners never see a lesson that was rolled back
+        for payload in payloads:
+            db.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": CHANNEL, "payload": json.dumps(payload)}
+            )
+    else:
+        # Single-process databases (sqlite) publish in-process after commit
+        db.info.setdefault("lesson_events", []).extend(payloads)
+    return events
+
+def replay_lesson_events(user_id: int, since_id: int, limit: int = QUEUE_SIZE) -> List[dict]:
+    """Events a reconnecting client may have missed, oldest first
+
+    Besides every id above since_id this includes events created up to
+    REPLAY_OVERLAP before that one, which may have committed after it; the
+    client drops the ids it has already seen.
+    """
+    db = SessionLocal()
+    try:
+        missed = LessonEvent.id > since_id
+        since_created_at = db.query(LessonEvent.created_at).filter(
+            LessonEvent.id == since_id,
+            LessonEvent.user_id == user_id
+        ).scalar()
+        if since_created_at is not None:
+            missed = or_(missed, LessonEvent.created_at >= since_created_at - REPLAY_OVERLAP)
+        events = db.query(LessonEvent).filter(
+            LessonEvent.user_id == user_id,
+            missed
+        ).order_by(LessonEvent.id).limit(limit).all()
+        return [event_payload(lesson_event) for lesson_event in events]
+    finally:
+        db.close()
+
+def purge_lesson_events(older_than: timedelta) -> int:
+    """Delete delivered events past the replay window"""
+    db = SessionLocal()
+    try:
+        cutoff = datetime.now(timezone.utc) - older_than
+        deleted = db.query(LessonEvent).filter(LessonEvent.created_at < cutoff).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+    finally:
+        db.close()
+
+class SeenIds:
+    """The most recent event ids delivered on one connection"""
+
+    def __init__(self, size: int = SEEN_IDS):
+        self.size = size
+        self._ids: Set[int] = set()
+        self._order = deque()
+
+    def add(self, event_id: int) -> bool:
+        """Remember an id; False if it was delivered already"""
+        if event_id in self._ids:
+            return False
+        self._ids.add(event_id)
+        self._order.append(event_id)
+        if len(self._order) > self.size:
+            self._ids.discard(self._order.popleft())
+        return True
+
+class LessonEventHub:
+    """Fans lesson events out to this worker's WebSocket subscribers"""
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        if get_engine().dialect.name == "postgresql":
+            self._tasks.append(asyncio.create_task(self._listen_forever()))
+        self._tasks.append(asyncio.create_task(self._purge_forever()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def publish(self, payload: dict) -> None:
+        """Deliver an event to the user's open sockets; must run on the event loop"""
+        for queue in self._subscribers.get(payload["user_id"], ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(payload)
+
+    def publish_threadsafe(self, payload: dict) -> None:
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.publish, payload)
+
+    async def _listen_forever(self) -> None:
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Lesson event listener disconnected: %s", e)
+            await asyncio.sleep(5)
+
+    async def _listen(self) -> None:
+        """LISTEN on a dedicated connection and publish notifications as they arrive"""
+        engine = get_engine()
+        connect_args, connect_kwargs = engine.dialect.create_connect_args(engine.url)
+        connection = engine.dialect.connect(*connect_args, **connect_kwargs)
+        connection.autocommit = True
+        connection.cursor().execute(f"LISTEN {CHANNEL}")
+
+        disconnected = self._loop.create_future()
+
+        def on_readable():
+            try:
+                connection.poll()
+            except Exception as e:
+                if not disconnected.done():
+                    disconnected.set_exception(e)
+                return
+            while connection.notifies:
+                notification = connection.notifies.pop(0)
+                self.publish(json.loads(notification.payload))
+
+        fileno = connection.fileno()
+        self._loop.add_reader(fileno, on_readable)
+        try:
+            await disconnected
+        finally:
+            self._loop.remove_reader(fileno)
+            connection.close()
+
+    async def _purge_forever(self) -> None:
+        retention = timedelta(hours=get_settings().lesson_event_retention_hours)
+        while True:
+            await asyncio.sleep(PURGE_INTERVAL_SECONDS)
+            try:
+                await asyncio.to_thread(purge_lesson_events, retention)
+            except Exception:
+                logger.exception("Error purging lesson events")
+
+lesson_event_hub = LessonEventHub()
+
+@event.listens_for(SessionLocal, "after_commit")
+def _publish_committed(session):
+    for payload in session.info.pop("lesson_events", []):
+        lesson_event_hub.publish_threadsafe(payload)
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop("lesson_events", None)
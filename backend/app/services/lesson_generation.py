@@ -0,0 +1,109 @@
+import logging
+from typing import Optional
+
+from sqlalchemy import func
+
+from app.database import SessionLocal
+from app.logging_config import log_context
+from app.models.prompt import Prompt, STATUS_DONE, STATUS_FAILED, STATUS_FALLBACK, STATUS_GENERATING
+from app.services.ai_service import get_ai_service
+from app.services.generation_scheduler import LANE_INTERACTIVE, get_generation_scheduler
+from app.services.history_cache import prompts_updated
+from app.services.lesson_events import record_lessons_ready
+from app.services.token_budget import token_budget
+
+logger = logging.getLogger(__name__)
+
+def lesson_topic(category_name: str, sub_category_name: str) -> str:
+    return f"{category_name} - {sub_category_name}"
+
+def _update_prompts(prompt_ids, values: dict, ready: bool = False) -> None:
+    # One short unit of work: the pooled connection is held only for this statement and its commit
+    db = SessionLocal()
+    try:
+        db.query(Prompt).filter(Prompt.id.in_(prompt_ids)).update(values, synchronize_session=False)
+        history = prompts_updated(db, prompt_ids)
+        if ready:
+            # Outbox events commit with the lesson and wake the users' WebSockets
+            record_lessons_ready(db, prompt_ids)
+        db.commit()
+        history.apply()
+    finally:
+        db.close()
+
+def _mark_generating(prompt_ids) -> None:
+    _update_prompts(prompt_ids, {
+        Prompt.status: STATUS_GENERATING,
+        Prompt.started_at: func.now()
+    })
+
+async def generate_ai_response(
+    prompt_id: int,
+    topic: str,
+    prompt_text: str,
+    category_name: str,
+    sub_category_name: str,
+    provider: Optional[str] = None,
+    user_id: Optional[int] = None,
+    lane: str = LANE_INTERACTIVE
+) -> str:
+    """Background task to generate AI response; returns the prompt's final status
+
+    No database connection is held while the provider is working: the status
+    updates before and after the call each use their own short session. The
+    prompt stays queued until the scheduler gives it a slot in its lane, unless
+    an identical prompt is already generating or queued, which it then joins
+    without taking a slot of its own.
+    """
+    # Tracked so a shutting-down worker waits for the lesson to be stored
+    ai_service = get_ai_service()
+    # Logs from the generation carry the request id of the API call that queued it
+    with ai_service.in_flight(), log_context(prompt_id=prompt_id, user_id=user_id):
+        try:
+            # Identical prompts in flight share one generation; only its leader waits for a slot
+            result, prompt_ids = await ai_service.generate_coalesced(
+                topic=topic,
+                prompt=prompt_text,
+                category=category_name,
+                sub_category=sub_category_name,
+                provider=provider,
+                prompt_id=prompt_id,
+                # Users share a lane by expected lesson length, not by request count
+                admission=get_generation_scheduler().slot(
+                    user_id, lane, token_budget.typical_lesson_tokens(sub_category_name)
+                ),
+                on_start=_mark_generating
+            )
+
+            # Update every waiting prompt with the AI response and its token usage in one statement
+            if prompt_ids:
+                _update_prompts(prompt_ids, {
+                    Prompt.response: result.content,
+                    Prompt.prompt_tokens: result.prompt_tokens,
+                    Prompt.completion_tokens: result.completion_tokens,
+                    Prompt.status: STATUS_FALLBACK if result.fallback else STATUS_DONE,
+                    Prompt.model: result.model,
+                    Prompt.finished_at: func.now()
+                }, ready=True)
+            logger.info(
+                "Lesson generated for %s prompt(s)", len(prompt_ids),
+                extra={
+                    "sample": True,
+                    "model": result.model,
+                    "fallback": result.fallback,
+                    "prompt_tokens": result.prompt_tokens,
+                    "completion_tokens": result.completion_tokens,
+                }
+            )
+            return STATUS_FALLBACK if result.fallback else STATUS_DONE
+
+        except Exception:
+            logger.exception("Error generating AI response for prompt %s", prompt_id)
+            try:
+                _update_prompts([prompt_id], {
+                    Prompt.status: STATUS_FAILED,
+                    Prompt.finished_at: func.now()
+                })
+            except Exception:
+                logger.exception("Error marking prompt %s as failed", prompt_id)
+            return STATUS_FAILED
\ No newline at end of file
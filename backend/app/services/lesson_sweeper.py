@@ -0,0 +1,266 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, func, or_, text
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models.category import Category, SubCategory
+from app.models.prompt import (
+    Prompt,
+    STATUS_DONE,
+    STATUS_FAILED,
+    STATUS_FALLBACK,
+    STATUS_GENERATING,
+    STATUS_QUEUED,
+)
+from app.services.ai_service import get_ai_service
+from app.services.generation_scheduler import LANE_BULK
+from app.services.history_cache import prompts_updated
+from app.services.lesson_generation import generate_ai_response, lesson_topic
+from app.services.llm_providers import parse_routes
+from app.services.worker_registry import current_worker_id, live_workers
+
+logger = logging.getLogger(__name__)
+
+# Longest pause between requests to a provider that keeps failing
+MAX_BACKOFF_SECONDS = 30.0
+
+@dataclass
+class SweepProgress:
+    found: int = 0
+    claimed: int = 0
+    done: int = 0
+    fallback: int = 0
+    failed: int = 0
+    dry_run: bool = False
+    running: bool = True
+    error: Optional[str] = None
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    def record(self, status: str) -> None:
+        if status == STATUS_DONE:
+            self.done += 1
+        elif status == STATUS_FALLBACK:
+            self.fallback += 1
+        else:
+            self.failed += 1
+
+    def summary(self) -> str:
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return (
+            f"{self.found} found, {self.claimed} re-enqueued, {self.done} regenerated, "
+            f"{self.fallback} fell back, {self.failed} failed in {elapsed:.1f}s"
+        )
+
+class ProviderPacer:
+    """Spaces out requests per provider, backing off while a provider keeps failing"""
+
+    def __init__(self, requests_per_second: Optional[Dict[str, float]] = None):
+        self.requests_per_second = requests_per_second or {}
+        self._next_at: Dict[str, float] = {}
+        self._backoff: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    @classmethod
+    def from_settings(cls) -> "ProviderPacer":
+        rates = parse_routes(get_settings().sweep_provider_rps)
+        return cls({name: float(rate) for name, rate in rates.items()})
+
+    def interval(self, provider: str) -> float:
+        rate = self.requests_per_second.get(provider)
+        base = 1 / rate if rate else 0.0
+        backoff = self._backoff.get(provider, 0.0)
+        return max(base, backoff)
+
+    async def wait(self, provider: str) -> None:
+        lock = self._locks.setdefault(provider, asyncio.Lock())
+        async with lock:
+            delay = self._next_at.get(provider, 0.0) - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_at[provider] = time.monotonic() + self.interval(provider)
+
+    def record(self, provider: str, succeeded: bool) -> None:
+        if succeeded:
+            self._backoff.pop(provider, None)
+        else:
+            self._backoff[provider] = min(max(self._backoff.get(provider, 0.0) * 2, 0.5), MAX_BACKOFF_SECONDS)
+
+def sweep_candidates(
+    db: Session,
+    after_id: int,
+    limit: int,
+    stuck_after: timedelta,
+    max_attempts: int
+) -> List:
+    """Next batch of failed, fallback or stuck prompts by id (keyset), via ix_prompts_retryable_id
+
+    A queued prompt is only stuck when no live worker holds it: one waiting
+    in a busy bulk lane is still going to be generated. A generating prompt
+    is stuck once it started more than stuck_after ago, or its worker is gone.
+    """
+    cutoff = datetime.now(timezone.utc) - stuck_after
+    orphaned = or_(Prompt.worker_id.is_(None), Prompt.worker_id.notin_(live_workers()))
+    return db.query(
+        Prompt.id,
+        Prompt.user_id,
+        Prompt.prompt,
+        Prompt.attempts,
+        Category.name.label("category_name"),
+        SubCategory.name.label("sub_category_name")
+    ).join(Category, Prompt.category_id == Category.id).join(
+        SubCategory, Prompt.sub_category_id == SubCategory.id
+    ).filter(
+        # Literal predicate so Postgres can match the partial index
+        text("prompts.status <> 'done'"),
+        Prompt.id > after_id,
+        Prompt.attempts < max_attempts,
+        or_(
+            Prompt.status.in_((STATUS_FAILED, STATUS_FALLBACK)),
+            and_(Prompt.status == STATUS_GENERATING, Prompt.started_at < cutoff),
+            and_(Prompt.status.in_((STATUS_QUEUED, STATUS_GENERATING)), orphaned)
+        )
+    ).order_by(Prompt.id).limit(limit).all()
+
+def claim_prompts(db: Session, rows: List) -> List:
+    """Re-enqueue rows; a row another sweeper already claimed is skipped"""
+    claimed = []
+    for row in rows:
+        updated = db.query(Prompt).filter(
+            Prompt.id == row.id,
+            Prompt.attempts == row.attempts
+        ).update({
+            Prompt.attempts: Prompt.attempts + 1,
+            Prompt.status: STATUS_QUEUED,
+            Prompt.worker_id: current_worker_id(),
+            Prompt.enqueued_at: func.now(),
+            Prompt.started_at: None,
+            Prompt.finished_at: None
+        }, synchronize_session=False)
+        if updated:
+            claimed.append(row)
+    history = prompts_updated(db, [row.id for row in claimed])
+    db.commit()
+    history.apply()
+    return claimed
+
+class LessonSweeper:
+    """Finds prompts without a real lesson and regenerates them"""
+
+    def __init__(
+        self,
+        batch_size: int = 100,
+        concurrency: int = 4,
+        stuck_after: timedelta = timedelta(minutes=15),
+        max_attempts: int = 3,
+        pacer: Optional[ProviderPacer] = None
+    ):
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.stuck_after = stuck_after
+        self.max_attempts = max_attempts
+        self.pacer = pacer or ProviderPacer()
+
+    @classmethod
+    def from_settings(cls, **overrides) -> "LessonSweeper":
+        settings = get_settings()
+        options = dict(
+            batch_size=settings.sweep_batch_size,
+            concurrency=settings.sweep_concurrency,
+            stuck_after=timedelta(minutes=settings.sweep_stuck_minutes),
+            max_attempts=settings.sweep_max_attempts,
+            pacer=ProviderPacer.from_settings()
+        )
+        options.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(**options)
+
+    async def sweep(
+        self,
+        limit: Optional[int] = None,
+        dry_run: bool = False,
+        progress: Optional[SweepProgress] = None
+    ) -> SweepProgress:
+        """Regenerate up to limit prompts in batches with bounded concurrency"""
+        progress = progress or SweepProgress(dry_run=dry_run)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        after_id = 0
+        try:
+            while limit is None or progress.found < limit:
+                db = SessionLocal()
+                try:
+                    batch = sweep_candidates(db, after_id, self.batch_size, self.stuck_after, self.max_attempts)
+                    if not batch:
+                        break
+                    after_id = batch[-1].id
+                    if limit is not None:
+                        batch = batch[:limit - progress.found]
+                    progress.found += len(batch)
+                    claimed = [] if dry_run else claim_prompts(db, batch)
+                finally:
+                    db.close()
+
+                progress.claimed += len(claimed)
+                await asyncio.gather(*(self._regenerate(row, semaphore, progress) for row in claimed))
+        except Exception as e:
+            progress.error = str(e)
+            raise
+        finally:
+            progress.running = False
+            progress.finished_at = time.time()
+        return progress
+
+    async def _regenerate(self, row, semaphore: asyncio.Semaphore, progress: SweepProgress) -> None:
+        async with semaphore:
+            provider = get_ai_service().router.resolve(row.category_name, row.sub_category_name).name
+            await self.pacer.wait(provider)
+            status = await generate_ai_response(
+                row.id,
+                lesson_topic(row.category_name, row.sub_category_name),
+                row.prompt,
+                row.category_name,
+                row.sub_category_name,
+                user_id=row.user_id,
+                lane=LANE_BULK
+            )
+            self.pacer.record(provider, status == STATUS_DONE)
+            progress.record(status)
+
+# Admin-triggered sweep running in this worker
+_sweep_task: Optional[asyncio.Task] = None
+_sweep_progress: Optional[SweepProgress] = None
+
+def start_sweep_job(limit: Optional[int] = None, dry_run: bool = False) -> SweepProgress:
+    """Start a background sweep; raises RuntimeError if one is already running here"""
+    global _sweep_task, _sweep_progress
+    if _sweep_task is not None and not _sweep_task.done():
+        raise RuntimeError("A lesson sweep is already running")
+    _sweep_progress = SweepProgress(dry_run=dry_run)
+    _sweep_task = asyncio.create_task(
+        LessonSweeper.from_settings().sweep(limit=limit, dry_run=dry_run, progress=_sweep_progress)
+    )
+    _sweep_task.add_done_callback(_log_sweep_result)
+    return _sweep_progress
+
+def _log_sweep_result(task: asyncio.Task) -> None:
+    if task.cancelled():
+        logger.info("Lesson sweep cancelled")
+    elif task.exception() is not None:
+        logger.error("Lesson sweep failed", exc_info=task.exception())
+    else:
+        logger.info("Lesson sweep finished: %s", task.result().summary())
+
+def get_sweep_progress() -> Optional[SweepProgress]:
+    return _sweep_progress
+
+async def stop_sweep_job() -> None:
+    """Cancel a running sweep; re-enqueued prompts are picked up by the next sweep"""
+    if _sweep_task is not None and not _sweep_task.done():
+        _sweep_task.cancel()
+        await asyncio.gather(_sweep_task, return_exceptions=True)
@@ -0,0 +1,378 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+import logging
+from typing import Dict, Optional
+
+from app.config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+# Provider names
+OPENAI = "openai"
+COMPATIBLE = "compatible"
+LOCAL = "local"
+MOCK = "mock"
+
+@dataclass
+class CompletionRequest:
+    system_message: str
+    user_message: str
+    max_tokens: int
+    topic: str
+    prompt: str
+    category: Optional[str] = None
+    sub_category: Optional[str] = None
+    temperature: float = 0.7
+
+@dataclass
+class Completion:
+    content: str
+    model: str
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+class ProviderError(Exception):
+    """Raised when a provider cannot produce a completion"""
+
+class LLMProvider(ABC):
+    """A backend able to turn a system + user message into a lesson"""
+
+    name: str
+    model: str
+
+    @abstractmethod
+    async def complete(self, request: CompletionRequest) -> Completion:
+        ...
+
+    async def aclose(self) -> None:
+        """Release network clients or model memory"""
+
+def _chat_messages(request: CompletionRequest):
+    return [
+        {"role": "system", "content": request.system_message},
+        {"role": "user", "content": request.user_message}
+    ]
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI through the official SDK"""
+
+    def __init__(self, api_key: str, model: str = "gpt-4o-mini", name: str = OPENAI):
+        self.name = name
+        self.model = model
+        self._api_key = api_key
+        self._client = None
+
+    @property
+    def client(self):
+        # The SDK is slow to import; load it with the first request
+        if self._client is None:
+            import openai
+
+            self._client = openai.AsyncOpenAI(api_key=self._api_key)
+        return self._client
+
+    async def complete(self, request: CompletionRequest) -> Completion:
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=_chat_messages(request),
+                max_tokens=request.max_tokens,
+                temperature=request.temperature
+            )
+        except Exception as e:
+            raise ProviderError(f"OpenAI API error: {e}")
+
+        usage = response.usage
+        return Completion(
+            content=response.choices[0].message.content.strip(),
+            model=response.model or self.model,
+            prompt_tokens=usage.prompt_tokens if usage else None,
+            completion_tokens=usage.completion_tokens if usage else None
+        )
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+
+class OpenAICompatibleProvider(LLMProvider):
+    """Any server exposing the OpenAI /chat/completions API (vLLM, llama.cpp, Ollama, ...)"""
+
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        api_key: Optional[str] = None,
+        name: str = COMPATIBLE,
+        timeout: float = 120.0
+    ):
+        self.name = name
+        self.model = model
+        self._base_url = base_url.rstrip("/")
+        self._headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._timeout = timeout
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(base_url=self._base_url, headers=self._headers, timeout=self._timeout)
+        return self._client
+
+    async def complete(self, request: CompletionRequest) -> Completion:
+        try:
+            response = await self.client.post("/chat/completions", json={
+                "model": self.model,
+                "messages": _chat_messages(request),
+                "max_tokens": request.max_tokens,
+                "temperature": request.temperature
+            })
+            response.raise_for_status()
+            data = response.json()
+            content = data["choices"][0]["message"]["content"]
+        except Exception as e:
+            raise ProviderError(f"{self.name} endpoint error: {e}")
+
+        usage = data.get("usage") or {}
+        return Completion(
+            content=content.strip(),
+            model=data.get("model") or self.model,
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens")
+        )
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+
+class LocalModelProvider(LLMProvider):
+    """A GGUF model run in-process on the CPU with llama-cpp-python"""
+
+    def __init__(self, model_path: str, threads: Optional[int] = None, context_tokens: int = 4096, name: str = LOCAL):
+        self.name = name
+        self.model = os.path.basename(model_path)
+        self.model_path = model_path
+        self.threads = threads
+        self.context_tokens = context_tokens
+        self._llm = None
+        # llama.cpp contexts are not thread-safe; run one completion at a time
+        self._lock = asyncio.Lock()
+
+    def _load(self):
+        if self._llm is None:
+            try:
+                from llama_cpp import Llama
+            except ImportError:
+                raise ProviderError("llama-cpp-python is required for the in-process local model")
+            self._llm = Llama(
+                model_path=self.model_path,
+                n_ctx=self.context_tokens,
+                n_threads=self.threads,
+                verbose=False
+            )
+        return self._llm
+
+    async def complete(self, request: CompletionRequest) -> Completion:
+        async with self._lock:
+            try:
+                llm = await asyncio.to_thread(self._load)
+                data = await asyncio.to_thread(
+                    llm.create_chat_completion,
+                    messages=_chat_messages(request),
+                    max_tokens=request.max_tokens,
+                    temperature=request.temperature
+                )
+            except ProviderError:
+                raise
+            except Exception as e:
+                raise ProviderError(f"Local model error: {e}")
+
+        usage = data.get("usage") or {}
+        return Completion(
+            content=data["choices"][0]["message"]["content"].strip(),
+            model=self.model,
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens")
+        )
+
+    async def aclose(self) -> None:
+        self._llm = None
+
+class MockProvider(LLMProvider):
+    """Canned lessons with optional simulated latency, for development and load tests"""
+
+    def __init__(self, latency_ms: int = 0, name: str = MOCK):
+        self.name = name
+        self.model = MOCK
+        self.latency_ms = latency_ms
+
+    async def complete(self, request: CompletionRequest) -> Completion:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return Completion(
+            content=generate_mock_lesson(request.topic, request.prompt, request.category, request.sub_category),
+            model=self.model
+        )
+
+def parse_routes(value: Optional[str]) -> Dict[str, str]:
+    """Parse LLM_ROUTES, e.g. "Languages=local;Science/Physics=openai".
+
+    Keys are a category name or "Category/Subcategory"; values are provider names.
+    """
+    routes = {}
+    for entry in (value or "").split(";"):
+        if "=" not in entry:
+            continue
+        target, provider = entry.rsplit("=", 1)
+        if target.strip() and provider.strip():
+            routes[target.strip()] = provider.strip()
+    return routes
+
+class ProviderRouter:
+    """Picks a provider per request, per subcategory, per category, or the default"""
+
+    def __init__(self, providers: Dict[str, LLMProvider], default: str, routes: Optional[Dict[str, str]] = None):
+        if default not in providers:
+            raise ValueError(f"Default LLM provider '{default}' is not configured")
+        self.providers = providers
+        self.default = default
+        self.routes = routes or {}
+        unknown = set(self.routes.values()) - set(providers)
+        if unknown:
+            raise ValueError(f"LLM_ROUTES refers to unconfigured provider(s): {', '.join(sorted(unknown))}")
+
+    @classmethod
+    def from_env(cls, settings: Optional[Settings] = None) -> "ProviderRouter":
+        settings = settings or get_settings()
+        providers: Dict[str, LLMProvider] = {
+            MOCK: MockProvider(latency_ms=settings.mock_llm_latency_ms)
+        }
+
+        if settings.openai_api_key:
+            providers[OPENAI] = OpenAIProvider(settings.openai_api_key, model=settings.openai_model)
+
+        if settings.llm_base_url:
+            providers[COMPATIBLE] = OpenAICompatibleProvider(
+                base_url=settings.llm_base_url,
+                model=settings.llm_model,
+                api_key=settings.llm_api_key
+            )
+
+        # A local model is either served by a local OpenAI-compatible server or loaded in-process
+        if settings.local_llm_url:
+            providers[LOCAL] = OpenAICompatibleProvider(
+                base_url=settings.local_llm_url,
+                model=settings.local_llm_model,
+                name=LOCAL
+            )
+        elif settings.local_model_path:
+            providers[LOCAL] = LocalModelProvider(
+                settings.local_model_path,
+                threads=settings.local_model_threads,
+                context_tokens=settings.local_model_context_tokens
+            )
+
+        default = settings.llm_provider
+        if not default:
+            if OPENAI in providers:
+                default = OPENAI
+            else:
+                logger.warning("OPENAI_API_KEY not set and no LLM_PROVIDER configured; serving mock lessons")
+                default = MOCK
+
+        return cls(providers, default, parse_routes(settings.llm_routes))
+
+    def resolve(
+        self,
+        category: Optional[str] = None,
+        sub_category: Optional[str] = None,
+        provider: Optional[str] = None
+    ) -> LLMProvider:
+        """Return the provider for a request; an explicit name wins over the routing table"""
+        if provider:
+            if provider not in self.providers:
+                raise ValueError(f"Unknown LLM provider: {provider}")
+            return self.providers[provider]
+        name = (
+            self.routes.get(f"{category}/{sub_category}")
+            or self.routes.get(category or "")
+            or self.default
+        )
+        return self.providers[name]
+
+    async def aclose(self) -> None:
+        for provider in self.providers.values():
+            await provider.aclose()
+
+def generate_mock_lesson(
+    topic: str,
+    prompt: str,
+    category: Optional[str] = None,
+    sub_category: Optional[str] = None
+    ) -> str:
+    """Generate a mock lesson when no real provider is available"""
+
+    category_context = ""
+    if category and sub_category:
+        category_context = f" in {category} - {sub_category}"
+    elif category:
+        category_context = f" in {category}"
+
+    mock_lesson = f"""
+    # {topic}{category_context}
+
+    ## Introduction
+    This is a comprehensive lesson about **{topic}** based on your request: "{prompt}"
+
+    ## Key Concepts
+
+    ### What is {topic}?
+    {topic} is an important subject that deserves careful study and understanding. This lesson will provide you with fundamental knowledge and practical insights.
+
+    ### Why Study {topic}?
+    Understanding {topic} is valuable because:
+    - It provides foundational knowledge in this field
+    - It helps develop critical thinking skills
+    - It has practical applications in real-world scenarios
+    - It connects to broader concepts and ideas
+
+    ## Main Content
+
+    ### Core Principles
+    The fundamental principles of {topic} include several key elements that work together to create a comprehensive understanding. These principles have been developed through extensive research and practical application.
+
+    ### Practical Examples
+    Here are some practical examples to help illustrate the concepts:
+
+    1. **Example 1**: Real-world applications demonstrate how these principles work in practice
+    2. **Example 2**: Case studies show the impact and importance of understanding this topic
+    3. **Example 3**: Current examples highlight the relevance in today's world
+
+    ### Advanced Concepts
+    For those interested in deeper learning, advanced concepts in {topic} include:
+    - Complex interactions between different elements
+    - Historical development and evolution
+    - Future trends and developments
+    - Connections to other fields of study
+
+    ## Summary and Key Takeaways
+
+    ### What We've Learned
+    - {topic} is a multifaceted subject with many important aspects
+    - Understanding the core principles is essential for practical application
+    - Real-world examples help illustrate theoretical concepts
+    - Advanced concepts provide pathways for deeper learning
+
+    ### Next Steps
+    To continue your learning journey:
+    - Practice applying these concepts in different contexts
+    - Explore related topics and connections
+    - Seek out additional resources and materials
+    - Consider practical applications in your own life or work
+
+    *Note: This lesson was generated using the AI Learning Platform. For the most current information, consider consulting additional authoritative sources.*
+    """
+    return mock_lesson.strip()
\ No newline at end of file
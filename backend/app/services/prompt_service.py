@@ -1,18 +1,23 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
-from typing import List, Optional
-from app.models.prompt import Prompt
+from typing import List, Optional, Tuple
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models.prompt import Prompt, STATUS_DONE
 from app.models.user import User
 from app.models.category import Category, SubCategory
 from app.schemas.prompt import (
     PromptCreate, PromptUpdate, PromptWithDetails, Prompt as PromptSchema
 )
-from app.services.ai_service import ai_service
+from app.services.history_cache import HistoryWrite, prompt_created
+from app.services.lesson_cache import find_cached_lesson
+from app.services.lesson_events import record_lessons_ready
+from app.services.lesson_generation import generate_ai_response, lesson_topic
+from app.services.worker_registry import current_worker_id
 
-async def create_prompt(db: Session, prompt_data: PromptCreate) -> PromptSchema:
-    user = db.query(User).filter(User.id == prompt_data.user_id).first()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+def prompt_topic_names(db: Session, prompt_data: PromptCreate) -> Tuple[str, str]:
+    """Category and subcategory names for a new prompt; 404 unless the subcategory belongs to the category"""
     category = db.query(Category).filter(Category.id == prompt_data.category_id).first()
     if not category:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
@@ -25,24 +30,69 @@ async def create_prompt(db: Session, prompt_data: PromptCreate) -> PromptSchema:
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Subcategory not found or doesn't belong to the specified category"
         )
-    db_prompt = Prompt(**prompt_data.dict())
+    return category.name, sub_category.name
+
+def add_prompt(db: Session, user_id: int, prompt_data: PromptCreate) -> Tuple[Prompt, HistoryWrite]:
+    """Insert a prompt in the current transaction; the caller commits, then applies the HistoryWrite
+
+    Popular prompts are answered from their pre-generated lesson and stored
+    done; any other prompt is stored queued for generate_ai_response.
+    """
+    db_prompt = Prompt(user_id=user_id, worker_id=current_worker_id(), **prompt_data.dict(exclude={"provider"}))
+    cached = None
+    if not prompt_data.provider and get_settings().lesson_cache_enabled:
+        cached = find_cached_lesson(db, prompt_data.sub_category_id, prompt_data.prompt)
+    if cached is not None:
+        db_prompt.response = cached.response
+        db_prompt.model = cached.model
+        db_prompt.prompt_tokens = cached.prompt_tokens
+        db_prompt.completion_tokens = cached.completion_tokens
+        db_prompt.status = STATUS_DONE
+        db_prompt.started_at = func.now()
+        db_prompt.finished_at = func.now()
     db.add(db_prompt)
-    db.commit()
-    db.refresh(db_prompt)
+    db.flush()
+    if cached is not None:
+        record_lessons_ready(db, [db_prompt.id])
+    return db_prompt, prompt_created(db, db_prompt.id)
 
-    # Generate AI lesson and update the prompt
-    topic = f"{category.name} - {sub_category.name}"
-    ai_response = await ai_service.generate_lesson(
-        topic=topic,
-        prompt=prompt_data.prompt,
-        category=category.name,
-        sub_category=sub_category.name
-    )
-    db_prompt.response = ai_response
-    db.commit()
-    db.refresh(db_prompt)
+async def create_prompt(user_id: int, prompt_data: PromptCreate) -> Prompt:
+    """Create a prompt and wait for its lesson
+
+    The insert, the generation and the final read are separate units of work,
+    so no pooled connection sits idle in a transaction during the LLM call.
+    """
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        category_name, sub_category_name = prompt_topic_names(db, prompt_data)
+        db_prompt, history = add_prompt(db, user_id, prompt_data)
+        db.commit()
+        history.apply()
+        prompt_id = db_prompt.id
+        answered = db_prompt.status == STATUS_DONE
+    finally:
+        db.close()
+
+    if not answered:
+        # Generate AI lesson; the status updates open their own short sessions
+        await generate_ai_response(
+            prompt_id,
+            lesson_topic(category_name, sub_category_name),
+            prompt_data.prompt,
+            category_name,
+            sub_category_name,
+            prompt_data.provider,
+            user_id
+        )
 
-    return db_prompt
+    db = SessionLocal()
+    try:
+        return db.query(Prompt).filter(Prompt.id == prompt_id).first()
+    finally:
+        db.close()
 
 def get_prompt(db: Session, prompt_id: int) -> PromptWithDetails:
     prompt = db.query(Prompt).filter(Prompt.id == prompt_id).first()
@@ -0,0 +1,92 @@
+import logging
+from typing import Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models.category import Category, SubCategory
+from app.models.prompt import Prompt
+from app.models.user import User
+from app.services.history_cache import get_history_cache, prompts_deleted
+from app.services.template_registry import template_registry
+
+logger = logging.getLogger(__name__)
+
+def count_prompts(db: Session, column, value: int) -> int:
+    """Number of prompts where column == value; served by the prompts foreign key indexes"""
+    return db.query(func.count(Prompt.id)).filter(column == value).scalar() or 0
+
+def purge_prompts(column, value: int, chunk_size: Optional[int] = None) -> int:
+    """Delete prompts where column == value in chunks, one short transaction per chunk
+
+    Only (id, user_id) pairs are read, never ORM rows, so memory stays flat;
+    each transaction holds its locks only for one chunk.
+    """
+    chunk_size = chunk_size or get_settings().purge_chunk_size
+    deleted = 0
+    while True:
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                select(Prompt.id, Prompt.user_id).where(column == value).order_by(Prompt.id).limit(chunk_size)
+            ).all()
+            if not rows:
+                return deleted
+            history = prompts_deleted(db, rows)
+            result = db.execute(
+                delete(Prompt).where(Prompt.id.in_([row.id for row in rows])).execution_options(synchronize_session=False)
+            )
+            db.commit()
+            history.apply()
+        finally:
+            db.close()
+        deleted += result.rowcount or 0
+        if len(rows) < chunk_size:
+            return deleted
+
+def _delete_row(model, row_id: int) -> None:
+    # The remaining children (lesson events, subcategories) are removed by ON DELETE CASCADE
+    db = SessionLocal()
+    try:
+        db.execute(delete(model).where(model.id == row_id).execution_options(synchronize_session=False))
+        db.commit()
+    finally:
+        db.close()
+
+def purge_user(user_id: int) -> int:
+    """Delete a user's prompts in chunks, then the user; returns the prompts deleted"""
+    try:
+        deleted = purge_prompts(Prompt.user_id, user_id)
+        _delete_row(User, user_id)
+        get_history_cache().discard(user_id)
+        logger.info("Purged user %s (%s prompts)", user_id, deleted)
+        return deleted
+    except Exception:
+        logger.exception("Error purging user %s", user_id)
+        raise
+
+def purge_category(category_id: int) -> int:
+    """Delete a category's prompts in chunks, then the category and its subcategories"""
+    try:
+        deleted = purge_prompts(Prompt.category_id, category_id)
+        _delete_row(Category, category_id)
+        template_registry.reload()
+        logger.info("Purged category %s (%s prompts)", category_id, deleted)
+        return deleted
+    except Exception:
+        logger.exception("Error purging category %s", category_id)
+        raise
+
+def purge_subcategory(subcategory_id: int) -> int:
+    """Delete a subcategory's prompts in chunks, then the subcategory"""
+    try:
+        deleted = purge_prompts(Prompt.sub_category_id, subcategory_id)
+        _delete_row(SubCategory, subcategory_id)
+        template_registry.reload()
+        logger.info("Purged subcategory %s (%s prompts)", subcategory_id, deleted)
+        return deleted
+    except Exception:
+        logger.exception("Error purging subcategory %s", subcategory_id)
+        raise
\ No newline at end of file
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import threading
+import time
+from textwrap import dedent
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models.category import Category, SubCategory
+
+logger = logging.getLogger(__name__)
+
+BASE_SYSTEM_MESSAGE = dedent("""\
+    You are an expert educator and tutor. Your role is to create engaging,
+    educational lessons that are clear, informative, and easy to understand.
+
+    Guidelines:
+    - Provide comprehensive but digestible explanations
+    - Use examples and analogies when helpful
+    - Structure your response with clear sections
+    - Include key takeaways or summary points
+    - Keep the tone engaging and educational""")
+
+def compile_system_message(
+    category: Optional[str],
+    sub_category: Optional[str],
+    category_guidance: Optional[str] = None,
+    sub_category_guidance: Optional[str] = None
+) -> str:
+    """Build the system message for a category/subcategory.
+
+    The result depends only on the taxonomy and its stored guidance, never on
+    the request, so the same subcategory always gets a byte-identical prefix.
+    """
+    parts = [BASE_SYSTEM_MESSAGE]
+    if category and sub_category:
+        parts.append(f"Context: You are teaching about {sub_category} in the {category} domain.")
+    elif category:
+        parts.append(f"Context: You are teaching in the {category} domain.")
+    for guidance in (category_guidance, sub_category_guidance):
+        if guidance and guidance.strip():
+            parts.append(guidance.strip())
+    return "\n\n".join(parts)
+
+class TemplateRegistry:
+    """Precompiled system messages per (category, subcategory), refreshed from the database"""
+
+    def __init__(self):
+        self._templates: Dict[Tuple[Optional[str], Optional[str]], str] = {}
+        self._lesson_tokens: Dict[Tuple[str, str], int] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        # Background reload started by a stale lookup, if one is running
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def load(self, db: Session) -> int:
+        """Compile templates for every category and subcategory; returns the count"""
+        templates = {}
+        lesson_tokens = {}
+        categories = db.query(Category).all()
+        guidance = {category.id: category.system_prompt for category in categories}
+        for category in categories:
+            templates[(category.name, None)] = compile_system_message(
+                category.name, None, category.system_prompt
+            )
+        for sub_category in db.query(SubCategory).join(Category).all():
+            key = (sub_category.category.name, sub_category.name)
+            templates[key] = compile_system_message(
+                key[0], key[1], guidance.get(sub_category.category_id), sub_category.system_prompt
+            )
+            if sub_category.lesson_tokens:
+                lesson_tokens[key] = sub_category.lesson_tokens
+
+        # Swap in the new maps at once so readers never see a partial reload
+        with self._lock:
+            self._templates = templates
+            self._lesson_tokens = lesson_tokens
+            self._loaded_at = time.monotonic()
+        return len(templates)
+
+    def reload(self) -> int:
+        db = SessionLocal()
+        try:
+            return self.load(db)
+        finally:
+            db.close()
+
+    def _refresh_if_stale(self) -> None:
+        # Re-read periodically so edits made through another worker show up
+        refresh_seconds = get_settings().template_refresh_seconds
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < refresh_seconds:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Scripts without an event loop can afford to wait for the query
+            self._reload_or_retry_later()
+            return
+        # Lookups come from inside lesson generation: reload in a thread and keep
+        # serving the current templates meanwhile, rather than block the event loop
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = loop.create_task(asyncio.to_thread(self._reload_or_retry_later))
+
+    def _reload_or_retry_later(self) -> None:
+        try:
+            self.reload()
+        except Exception:
+            # Keep serving the templates we have; retry after the next interval
+            logger.exception("Error reloading system message templates")
+            self._loaded_at = time.monotonic()
+
+    def system_message(self, category: Optional[str], sub_category: Optional[str]) -> str:
+        """Return the precompiled system message, compiling unknown pairs once"""
+        self._refresh_if_stale()
+        key = (category, sub_category)
+        template = self._templates.get(key)
+        if template is None:
+            template = compile_system_message(category, sub_category)
+            with self._lock:
+                self._templates.setdefault(key, template)
+        return template
+
+    def lesson_tokens(self, category: Optional[str], sub_category: Optional[str]) -> Optional[int]:
+        """Configured typical lesson length for a subcategory, if any"""
+        return self._lesson_tokens.get((category, sub_category))
+
+template_registry = TemplateRegistry()
\ No newline at end of file
@@ -0,0 +1,114 @@
+import logging
+import math
+from typing import Dict, Optional, Tuple
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Headroom over the typical lesson length so lessons are rarely cut off
+LESSON_HEADROOM = 1.25
+# Extra completion tokens granted per prompt token (longer questions need longer answers)
+PROMPT_LENGTH_FACTOR = 0.5
+# Weight of the newest lesson in the running per-subcategory average
+LESSON_LENGTH_SMOOTHING = 0.2
+
+TRUNCATION_MARKER = "\n\n[... input truncated ...]\n\n"
+
+_encoding = None
+_encoding_loaded = False
+
+def _get_encoding():
+    """Load the tiktoken encoding on first use, if tiktoken is installed"""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+        except ImportError:
+            return None
+        # o200k_base needs a newer tiktoken than the pinned one; either may need a download
+        for name in ("o200k_base", "cl100k_base"):
+            try:
+                _encoding = tiktoken.get_encoding(name)
+                break
+            except Exception:
+                continue
+        else:
+            logger.warning("No tiktoken encoding could be loaded; approximating token counts")
+    return _encoding
+
+def count_tokens(text: Optional[str]) -> int:
+    """Count tokens locally, approximating when tiktoken is not installed"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # Roughly four characters per token for English prose
+    return math.ceil(len(text) / 4)
+
+def truncate_to_tokens(text: str, max_tokens: int) -> Tuple[str, bool]:
+    """Trim text to max_tokens, keeping its beginning and end"""
+    if count_tokens(text) <= max_tokens:
+        return text, False
+
+    budget = max(max_tokens - count_tokens(TRUNCATION_MARKER), 0)
+    head_tokens = budget * 2 // 3
+    tail_tokens = budget - head_tokens
+
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text)
+        head = encoding.decode(tokens[:head_tokens])
+        tail = encoding.decode(tokens[-tail_tokens:]) if tail_tokens else ""
+    else:
+        head = text[:head_tokens * 4]
+        tail = text[-tail_tokens * 4:] if tail_tokens else ""
+
+    return head.rstrip() + TRUNCATION_MARKER + tail.lstrip(), True
+
+class TokenBudget:
+    """Sizes completion budgets from prompt length and typical lesson length"""
+
+    def __init__(self):
+        self._lesson_tokens: Dict[str, float] = {}
+
+    def typical_lesson_tokens(self, sub_category: Optional[str]) -> int:
+        return int(self._lesson_tokens.get(sub_category or "", get_settings().default_lesson_tokens))
+
+    def record_lesson(self, sub_category: Optional[str], completion_tokens: Optional[int]) -> None:
+        """Fold a finished lesson's length into the subcategory's running average"""
+        if not completion_tokens:
+            return
+        key = sub_category or ""
+        previous = self._lesson_tokens.get(key)
+        if previous is None:
+            self._lesson_tokens[key] = float(completion_tokens)
+        else:
+            self._lesson_tokens[key] = (
+                previous * (1 - LESSON_LENGTH_SMOOTHING)
+                + completion_tokens * LESSON_LENGTH_SMOOTHING
+            )
+
+    def max_tokens_for(
+        self,
+        sub_category: Optional[str],
+        prompt_tokens: int,
+        typical_tokens: Optional[int] = None
+    ) -> int:
+        """Completion budget for a request whose messages use prompt_tokens.
+
+        typical_tokens overrides the observed lesson length, e.g. when an admin
+        configured one for the subcategory.
+        """
+        settings = get_settings()
+        budget = (
+            (typical_tokens or self.typical_lesson_tokens(sub_category)) * LESSON_HEADROOM
+            + prompt_tokens * PROMPT_LENGTH_FACTOR
+        )
+        budget = min(max(int(budget), settings.min_completion_tokens), settings.max_completion_tokens)
+        # Never ask for more than the context window has left
+        return max(min(budget, settings.context_window_tokens - prompt_tokens), 1)
+
+token_budget = TokenBudget()
\ No newline at end of file
@@ -0,0 +1,85 @@
+import hashlib
+import logging
+import secrets
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+def hash_refresh_token(token: str) -> str:
+    # Refresh tokens are 256 random bits, so a fast hash is enough (unlike passwords)
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def issue_refresh_token(db: Session, user_id: int, family_id: Optional[str] = None) -> str:
+    """Store a new refresh token for the user and return it; the caller commits"""
+    token = secrets.token_urlsafe(32)
+    now = datetime.now(timezone.utc)
+    db.add(RefreshToken(
+        user_id=user_id,
+        token_hash=hash_refresh_token(token),
+        family_id=family_id or secrets.token_hex(16),
+        expires_at=now + timedelta(days=get_settings().refresh_token_expire_days)
+    ))
+    return token
+
+def purge_expired_refresh_tokens(db: Session, user_id: int) -> int:
+    """Drop the user's expired tokens; revoked ones stay until expiry to detect reuse"""
+    return db.query(RefreshToken).filter(
+        RefreshToken.user_id == user_id,
+        RefreshToken.expires_at < datetime.now(timezone.utc)
+    ).delete(synchronize_session=False)
+
+def revoke_token_family(db: Session, family_id: str) -> int:
+    return db.query(RefreshToken).filter(
+        RefreshToken.family_id == family_id,
+        RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: datetime.now(timezone.utc)}, synchronize_session=False)
+
+def rotate_refresh_token(db: Session, token: str) -> Optional[Tuple[User, str]]:
+    """Exchange a refresh token for its user and a new token in the same family
+
+    The old token is revoked by a conditional UPDATE, so two concurrent
+    refreshes cannot both succeed. Presenting a token that was already
+    rotated means it leaked (or was replayed): the whole family is revoked.
+    Returns None when the token is unknown, expired, revoked or the user is
+    inactive; the caller commits.
+    """
+    token_hash = hash_refresh_token(token)
+    now = datetime.now(timezone.utc)
+    claimed = db.query(RefreshToken).filter(
+        RefreshToken.token_hash == token_hash,
+        RefreshToken.revoked_at.is_(None),
+        RefreshToken.expires_at > now
+    ).update({RefreshToken.revoked_at: now}, synchronize_session=False)
+
+    stored = db.query(RefreshToken).filter(RefreshToken.token_hash == token_hash).first()
+    if stored is None:
+        return None
+    if not claimed:
+        if stored.revoked_at is not None:
+            logger.warning("Refresh token reuse; revoking its session", extra={"user_id": stored.user_id})
+            revoke_token_family(db, stored.family_id)
+        return None
+
+    user = db.query(User).filter(User.id == stored.user_id).first()
+    if user is None or not user.is_active:
+        revoke_token_family(db, stored.family_id)
+        return None
+    # Sliding session: each rotation starts a fresh expiry window
+    return user, issue_refresh_token(db, user.id, stored.family_id)
+
+def revoke_refresh_token(db: Session, token: str) -> bool:
+    """Revoke the token's whole family (logout on that device); the caller commits"""
+    stored = db.query(RefreshToken).filter(
+        RefreshToken.token_hash == hash_refresh_token(token)
+    ).first()
+    if stored is None:
+        return False
+    revoke_token_family(db, stored.family_id)
+    return True
\ No newline at end of file
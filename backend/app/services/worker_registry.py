@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import select
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models.worker import Worker
+from app.services.generation_scheduler import get_generation_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process in workers and on the prompts its scheduler holds
+WORKER_ID = uuid.uuid4().hex
+# A worker that missed this many heartbeats is presumed dead
+MISSED_HEARTBEATS = 3
+
+_heartbeat_task: Optional[asyncio.Task] = None
+_registered = False
+
+def current_worker_id() -> Optional[str]:
+    """This process's id once it is registered, else None (the prompt then has no owner)"""
+    return WORKER_ID if _registered else None
+
+def live_workers():
+    """Select of the ids of workers that sent a heartbeat recently"""
+    window = timedelta(seconds=get_settings().worker_heartbeat_seconds * MISSED_HEARTBEATS)
+    return select(Worker.id).where(Worker.seen_at >= datetime.now(timezone.utc) - window)
+
+def heartbeat() -> int:
+    """Register this worker or refresh its seen_at, and forget workers long gone
+
+    Returns the number of live workers.
+    """
+    global _registered
+    now = datetime.now(timezone.utc)
+    db = SessionLocal()
+    try:
+        updated = db.query(Worker).filter(Worker.id == WORKER_ID).update(
+            {Worker.seen_at: now}, synchronize_session=False
+        )
+        if not updated:
+            db.add(Worker(id=WORKER_ID, hostname=socket.gethostname()[:255], pid=os.getpid(), seen_at=now))
+        db.query(Worker).filter(Worker.seen_at < now - timedelta(days=1)).delete(synchronize_session=False)
+        db.commit()
+        _registered = True
+        return db.query(Worker).filter(Worker.id.in_(live_workers())).count()
+    finally:
+        db.close()
+
+def deregister() -> None:
+    """Remove this worker; prompts still queued here become the sweeper's"""
+    global _registered
+    _registered = False
+    db = SessionLocal()
+    try:
+        db.query(Worker).filter(Worker.id == WORKER_ID).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+async def _beat() -> None:
+    workers = await asyncio.to_thread(heartbeat)
+    # GENERATION_CONCURRENCY is shared by every live worker
+    get_generation_scheduler().set_workers(workers)
+
+async def _heartbeat_forever() -> None:
+    while True:
+        await asyncio.sleep(get_settings().worker_heartbeat_seconds)
+        try:
+            await _beat()
+        except Exception:
+            logger.exception("Worker heartbeat failed")
+
+async def start_worker_heartbeat() -> None:
+    """Register this worker, then keep its heartbeat going in the background"""
+    global _heartbeat_task
+    try:
+        await _beat()
+    except Exception:
+        logger.exception("Could not register worker %s", WORKER_ID)
+    if _heartbeat_task is None or _heartbeat_task.done():
+        _heartbeat_task = asyncio.create_task(_heartbeat_forever())
+
+async def stop_worker_heartbeat() -> None:
+    global _heartbeat_task
+    if _heartbeat_task is not None:
+        _heartbeat_task.cancel()
+        try:
+            await _heartbeat_task
+        except asyncio.CancelledError:
+            pass
+        _heartbeat_task = None
+    try:
+        await asyncio.to_thread(deregister)
+    except Exception:
+        logger.exception("Could not deregister worker %s", WORKER_ID)
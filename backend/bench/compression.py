@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Measure bytes on the wire for a learning history page and a lesson re-view.
+
+    LLM_PROVIDER=mock uvicorn app.main:app
+    python -m bench.compression --username bench_user_1 --limit 50
+
+Fetches GET /api/prompts/my-prompts with each Accept-Encoding and reports the
+transferred size, then fetches one completed prompt and repeats the request
+with If-None-Match to show the 304 revalidation.
+"""
+
+import argparse
+import sys
+import time
+
+import httpx
+
+from bench.seed import BENCH_PASSWORD, BENCH_USER_PREFIX
+
+ENCODINGS = ("identity", "gzip", "br")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Response compression benchmark")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", default=f"{BENCH_USER_PREFIX}1")
+    parser.add_argument("--password", default=BENCH_PASSWORD)
+    parser.add_argument("--limit", type=int, default=50, help="History page size")
+    parser.add_argument("--runs", type=int, default=5, help="Requests per encoding (median time)")
+    return parser.parse_args(argv)
+
+def fetch_raw(client: httpx.Client, url: str, headers: dict):
+    """Return (status, transferred bytes, response headers, seconds) without decoding the body"""
+    started = time.perf_counter()
+    with client.stream("GET", url, headers=headers) as response:
+        size = sum(len(chunk) for chunk in response.iter_raw())
+        return response.status_code, size, response.headers, time.perf_counter() - started
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    with httpx.Client(base_url=args.base_url, timeout=60) as client:
+        login = client.post("/api/auth/login", data={"username": args.username, "password": args.password})
+        if login.status_code != 200:
+            print(f"❌ Login failed for {args.username}: {login.status_code}")
+            return 1
+        auth = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        history_url = f"/api/prompts/my-prompts?limit={args.limit}"
+        print(f"History page ({history_url}):")
+        identity_size = None
+        for encoding in ENCODINGS:
+            timings = []
+            for _ in range(args.runs):
+                status, size, headers, seconds = fetch_raw(client, history_url, {**auth, "Accept-Encoding": encoding})
+                timings.append(seconds)
+            served = headers.get("content-encoding", "identity")
+            if identity_size is None:
+                identity_size = size
+            saved = 100 * (1 - size / identity_size) if identity_size else 0
+            timings.sort()
+            print(f"  {encoding:>8}: {size:>9} bytes as {served:<8} ({saved:5.1f}% saved), "
+                  f"median {timings[len(timings) // 2] * 1000:.1f}ms")
+
+        prompts = client.get(history_url, headers=auth).json()
+        completed = next((prompt for prompt in prompts if prompt.get("response")), None)
+        if completed is None:
+            print("No completed prompt to revalidate.")
+            return 0
+        prompt_url = f"/api/prompts/{completed['id']}"
+        _, first_size, headers, _ = fetch_raw(client, prompt_url, {**auth, "Accept-Encoding": "gzip"})
+        etag = headers.get("etag")
+        status, second_size, _, _ = fetch_raw(
+            client, prompt_url, {**auth, "Accept-Encoding": "gzip", "If-None-Match": etag or ""}
+        )
+        print(f"\nLesson re-view ({prompt_url}): first {first_size} bytes, then {status} with {second_size} bytes")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Drive a scripted mixed workload against a running API and report latency
+percentiles and throughput per endpoint.
+
+    # Server with a stubbed LLM
+    LLM_PROVIDER=mock MOCK_LLM_LATENCY_MS=800 uvicorn app.main:app
+
+    python -m bench.loadtest --concurrency 50 --duration 60 --save-baseline bench/baselines/main.json
+    python -m bench.loadtest --concurrency 50 --duration 60 --baseline bench/baselines/main.json
+
+Virtual users log in as the bench users created by bench.seed and then loop
+over a weighted mix of requests. With --baseline, the run fails (exit code 1)
+when an endpoint's p95 latency or throughput regresses by more than
+--max-regression.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+from bench.seed import BENCH_ADMIN, BENCH_PASSWORD, BENCH_USER_PREFIX
+
+# Share of requests per scripted action
+DEFAULT_MIX = {
+    "history": 40,
+    "categories": 15,
+    "profile": 15,
+    "bootstrap": 5,
+    "get_prompt": 15,
+    "create_prompt": 10,
+    "admin_users": 3,
+    "admin_prompts": 2,
+}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mixed-workload API benchmark")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run after warm-up")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds of unmeasured warm-up")
+    parser.add_argument("--users", type=int, default=1000, help="Number of seeded bench users to log in as")
+    parser.add_argument("--relogin", type=float, default=0.01, help="Chance per request to log in again")
+    parser.add_argument("--mix", default=None, help="JSON object overriding the request mix")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--save-baseline", help="Store the results as a baseline file")
+    parser.add_argument("--baseline", help="Compare against a stored baseline file")
+    parser.add_argument("--max-regression", type=float, default=0.15,
+                        help="Allowed relative p95/RPS regression against the baseline")
+    return parser.parse_args(argv)
+
+class Recorder:
+    """Collects latencies per endpoint once measuring has started"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.measuring = False
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+
+    def start(self):
+        self.measuring = True
+        self.started_at = time.perf_counter()
+
+    def stop(self):
+        self.measuring = False
+        self.stopped_at = time.perf_counter()
+
+    def record(self, name: str, seconds: float, ok: bool):
+        if not self.measuring:
+            return
+        self.latencies[name].append(seconds)
+        if not ok:
+            self.errors[name] += 1
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+def summarize(recorder: Recorder) -> dict:
+    elapsed = (recorder.stopped_at or time.perf_counter()) - (recorder.started_at or 0)
+    endpoints = {}
+    for name, values in sorted(recorder.latencies.items()):
+        endpoints[name] = {
+            "requests": len(values),
+            "errors": recorder.errors.get(name, 0),
+            "rps": len(values) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+        }
+    total = sum(len(values) for values in recorder.latencies.values())
+    return {
+        "duration_s": elapsed,
+        "total_requests": total,
+        "total_rps": total / elapsed if elapsed else 0.0,
+        "endpoints": endpoints,
+    }
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, username: str, rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.username = username
+        self.rng = rng
+        self.headers: Dict[str, str] = {}
+        self.categories: list = []
+        self.prompt_ids: List[int] = []
+
+    async def timed(self, name: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        self.recorder.record(name, time.perf_counter() - started, ok)
+        return response
+
+    async def login(self):
+        response = await self.timed(
+            "POST /api/auth/login", "POST", "/api/auth/login",
+            data={"username": self.username, "password": BENCH_PASSWORD}
+        )
+        if response is not None and response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def run(self, actions: List[str], weights: List[int], relogin: float, stop: asyncio.Event):
+        await self.login()
+        while not stop.is_set():
+            if not self.headers or self.rng.random() < relogin:
+                await self.login()
+                continue
+            action = self.rng.choices(actions, weights=weights)[0]
+            await getattr(self, f"do_{action}")()
+
+    async def do_history(self):
+        response = await self.timed("GET /api/prompts/my-prompts", "GET", "/api/prompts/my-prompts")
+        if response is not None and response.status_code == 200:
+            self.prompt_ids = [prompt["id"] for prompt in response.json()][:20] or self.prompt_ids
+
+    async def do_categories(self):
+        response = await self.timed("GET /api/categories/", "GET", "/api/categories/")
+        if response is not None and response.status_code == 200:
+            self.categories = response.json()
+
+    async def do_bootstrap(self):
+        response = await self.timed("GET /api/bootstrap", "GET", "/api/bootstrap")
+        if response is not None and response.status_code == 200:
+            self.categories = response.json()["categories"]
+
+    async def do_profile(self):
+        await self.timed("GET /api/auth/profile", "GET", "/api/auth/profile")
+
+    async def do_get_prompt(self):
+        if not self.prompt_ids:
+            return await self.do_history()
+        prompt_id = self.rng.choice(self.prompt_ids)
+        await self.timed("GET /api/prompts/{id}", "GET", f"/api/prompts/{prompt_id}")
+
+    async def do_create_prompt(self):
+        if not self.categories:
+            return await self.do_categories()
+        category = self.rng.choice(self.categories)
+        if not category.get("sub_categories"):
+            return
+        sub_category = self.rng.choice(category["sub_categories"])
+        await self.timed("POST /api/prompts/", "POST", "/api/prompts/", json={
+            "category_id": category["id"],
+            "sub_category_id": sub_category["id"],
+            "prompt": f"Give me an introduction to {sub_category['name']}",
+        })
+
+    async def do_admin_users(self):
+        await self.timed("GET /api/users/ (admin)", "GET", "/api/users/")
+
+    async def do_admin_prompts(self):
+        await self.timed("GET /api/prompts/ (admin)", "GET", "/api/prompts/")
+
+async def run_benchmark(args) -> dict:
+    rng = random.Random(args.seed)
+    mix = dict(DEFAULT_MIX)
+    if args.mix:
+        mix.update(json.loads(args.mix))
+    actions = [name for name, weight in mix.items() if weight > 0]
+
+    recorder = Recorder()
+    stop = asyncio.Event()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        users = []
+        for i in range(args.concurrency):
+            # Admin actions only run for the admin virtual user
+            if i == 0 and (mix.get("admin_users") or mix.get("admin_prompts")):
+                user_actions = actions
+                username = BENCH_ADMIN
+            else:
+                user_actions = [a for a in actions if not a.startswith("admin_")]
+                username = f"{BENCH_USER_PREFIX}{rng.randrange(args.users)}"
+            users.append((VirtualUser(client, recorder, username, random.Random(rng.random())), user_actions))
+
+        tasks = [
+            asyncio.create_task(user.run(user_actions, [mix[a] for a in user_actions], args.relogin, stop))
+            for user, user_actions in users
+        ]
+        await asyncio.sleep(args.warmup)
+        recorder.start()
+        await asyncio.sleep(args.duration)
+        recorder.stop()
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return summarize(recorder)
+
+def compare(results: dict, baseline: dict, max_regression: float) -> List[str]:
+    """Return a list of regressions beyond the allowed threshold"""
+    regressions = []
+    for name, current in results["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + max_regression):
+            regressions.append(
+                f"{name}: p95 {previous['p95_ms']:.1f}ms -> {current['p95_ms']:.1f}ms"
+            )
+        if previous["rps"] and current["rps"] < previous["rps"] * (1 - max_regression):
+            regressions.append(f"{name}: RPS {previous['rps']:.1f} -> {current['rps']:.1f}")
+    return regressions
+
+def print_report(results: dict, baseline: Optional[dict] = None):
+    print(f"{'endpoint':34} {'reqs':>7} {'err':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, stats in results["endpoints"].items():
+        line = (
+            f"{name:34} {stats['requests']:>7} {stats['errors']:>5} {stats['rps']:>8.1f} "
+            f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}"
+        )
+        previous = (baseline or {}).get("endpoints", {}).get(name)
+        if previous and previous["p95_ms"]:
+            change = (stats["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] * 100
+            line += f"  (p95 {change:+.0f}%)"
+        print(line)
+    print(f"Total: {results['total_requests']} requests, {results['total_rps']:.1f} req/s")
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = asyncio.run(run_benchmark(args))
+    results["config"] = {
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "users": args.users,
+        "mix": args.mix,
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"Results written to {path}")
+
+    if baseline:
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print("❌ Regressions against baseline:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print("✅ No regressions against baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
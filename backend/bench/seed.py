@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Seed a realistic benchmark dataset: the full seed_data taxonomy, many users
+and a large prompt history.
+
+    python -m bench.seed --users 10000 --prompts 2000000
+
+Users are named bench_user_<n> (password bench123) plus an admin bench_admin
+(password bench123). Activity per user is skewed so a few users own most of
+the history, and a handful of popular questions repeat in every subcategory.
+Prompts are streamed with COPY on PostgreSQL and multi-row inserts elsewhere.
+"""
+
+import argparse
+import csv
+import io
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, insert, select, text
+
+from app.auth import get_password_hash
+from app.database import SessionLocal, init_db
+from app.models.category import SubCategory
+from app.models.prompt import Prompt, STATUS_DONE, STATUS_QUEUED
+from app.models.user import User
+from app.services.llm_providers import generate_mock_lesson
+from seed_data import seed_categories
+
+BENCH_PASSWORD = "bench123"
+BENCH_USER_PREFIX = "bench_user_"
+BENCH_ADMIN = "bench_admin"
+
+POPULAR_QUESTIONS = [
+    "Give me an introduction to {sub}",
+    "Explain the basics of {sub} for a beginner",
+    "What are the most important ideas in {sub}?",
+    "Summarize the history of {sub}",
+]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Seed a benchmark dataset")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--prompts", type=int, default=100000)
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Prompts per COPY/INSERT chunk")
+    parser.add_argument("--unanswered", type=float, default=0.02, help="Share of prompts without a response")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for a reproducible dataset")
+    return parser.parse_args(argv)
+
+def seed_users(db, count: int) -> list:
+    """Create bench users that don't exist yet; returns all bench user ids"""
+    # One bcrypt hash shared by every bench user keeps seeding fast
+    hashed_password = get_password_hash(BENCH_PASSWORD)
+    existing = {name for name, in db.execute(
+        select(User.username).where(User.username.like(f"{BENCH_USER_PREFIX}%"))
+    )}
+    rows = [
+        {
+            "username": f"{BENCH_USER_PREFIX}{i}",
+            "email": f"{BENCH_USER_PREFIX}{i}@example.com",
+            "full_name": f"Bench User {i}",
+            "phone": None,
+            "hashed_password": hashed_password,
+            "is_active": True,
+            "is_admin": False,
+        }
+        for i in range(count)
+        if f"{BENCH_USER_PREFIX}{i}" not in existing
+    ]
+    if not db.query(User).filter(User.username == BENCH_ADMIN).first():
+        rows.append({
+            "username": BENCH_ADMIN,
+            "email": f"{BENCH_ADMIN}@example.com",
+            "full_name": "Bench Admin",
+            "phone": None,
+            "hashed_password": hashed_password,
+            "is_active": True,
+            "is_admin": True,
+        })
+    for start in range(0, len(rows), 5000):
+        db.execute(insert(User.__table__), rows[start:start + 5000])
+    db.commit()
+    return [user_id for user_id, in db.execute(
+        select(User.id).where(User.username.like(f"{BENCH_USER_PREFIX}%")).order_by(User.id)
+    )]
+
+def _prompt_rows(count, user_ids, subcategories, lessons, unanswered, rng):
+    """Yield prompt rows with skewed user activity and repeated popular questions"""
+    now = datetime.now(timezone.utc)
+    # Pareto weights: a few heavy users, a long tail of light ones
+    weights = [1 / (rank + 1) ** 1.1 for rank in range(len(user_ids))]
+    users = rng.choices(user_ids, weights=weights, k=count)
+    for n, user_id in enumerate(users):
+        category_id, sub_category_id, sub_name = rng.choice(subcategories)
+        if rng.random() < 0.3:
+            prompt = rng.choice(POPULAR_QUESTIONS).format(sub=sub_name)
+        else:
+            prompt = f"Question {n} about {sub_name}: how does concept {rng.randint(1, 5000)} work?"
+        response = None if rng.random() < unanswered else lessons[sub_category_id]
+        created_at = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+        status = STATUS_QUEUED if response is None else STATUS_DONE
+        yield (user_id, category_id, sub_category_id, prompt, response, created_at, status, created_at)
+
+def _copy_chunk(db, rows) -> None:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([r"\N" if value is None else value for value in row])
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            "COPY prompts (user_id, category_id, sub_category_id, prompt, response, created_at, status, enqueued_at) "
+            "FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+def seed_prompts(db, count: int, user_ids: list, chunk_size: int, unanswered: float, rng) -> float:
+    """Stream count prompts into the database; returns rows per second"""
+    subcategories = [
+        (sub.category_id, sub.id, sub.name)
+        for sub in db.query(SubCategory).join(SubCategory.category).all()
+    ]
+    lessons = {
+        sub.id: generate_mock_lesson(f"{sub.category.name} - {sub.name}", "Benchmark lesson", sub.category.name, sub.name)
+        for sub in db.query(SubCategory).all()
+    }
+    use_copy = db.get_bind().dialect.name == "postgresql"
+    columns = ["user_id", "category_id", "sub_category_id", "prompt", "response", "created_at", "status", "enqueued_at"]
+
+    started = time.perf_counter()
+    chunk = []
+    inserted = 0
+    for row in _prompt_rows(count, user_ids, subcategories, lessons, unanswered, rng):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            inserted += _flush(db, chunk, use_copy, columns)
+            chunk = []
+            print(f"  {inserted}/{count} prompts ({inserted / (time.perf_counter() - started):.0f} rows/s)")
+    if chunk:
+        inserted += _flush(db, chunk, use_copy, columns)
+    elapsed = time.perf_counter() - started
+    return inserted / elapsed if elapsed else float(inserted)
+
+def _flush(db, chunk, use_copy, columns) -> int:
+    if use_copy:
+        _copy_chunk(db, chunk)
+    else:
+        db.execute(insert(Prompt.__table__), [dict(zip(columns, row)) for row in chunk])
+    db.commit()
+    return len(chunk)
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+
+    init_db()
+
+    print("🌱 Seeding taxonomy...")
+    seed_categories()
+
+    db = SessionLocal()
+    try:
+        print(f"👥 Seeding {args.users} users...")
+        user_ids = seed_users(db, args.users)
+
+        existing = db.query(func.count(Prompt.id)).filter(Prompt.user_id.in_(user_ids[:1000])).scalar()
+        if existing:
+            print(f"Bench prompts already present ({existing}+). Skipping prompt seeding.")
+            return
+        print(f"📝 Seeding {args.prompts} prompts...")
+        rate = seed_prompts(db, args.prompts, user_ids, args.chunk_size, args.unanswered, rng)
+        if db.get_bind().dialect.name == "postgresql":
+            # Fresh statistics so the planner sees the real table size
+            db.execute(text("ANALYZE"))
+            db.commit()
+        print(f"✅ Seeded {args.prompts} prompts at {rate:.0f} rows/s")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
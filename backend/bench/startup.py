@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Measure the cold-start cost of importing the application.
+
+    python -m bench.startup --runs 10 --top 15
+    python -m bench.startup --max-ms 800   # exit code 1 when over target
+
+Importing the app must not touch the database or build LLM clients; the
+default target (STARTUP_TARGET_MS) leaves room for FastAPI and SQLAlchemy only.
+
+Each run imports app.main in a fresh interpreter and times the import. The
+slowest modules come from a separate run with -X importtime.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Median import budget for app.main in milliseconds
+STARTUP_TARGET_MS = 1000
+
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); "
+    "import {module}; "
+    "print(time.perf_counter() - started)"
+)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Application import-time benchmark")
+    parser.add_argument("--module", default="app.main", help="Module to import")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15, help="Show the N slowest imports")
+    parser.add_argument("--max-ms", type=float, default=STARTUP_TARGET_MS,
+                        help="Fail when the median import time exceeds this (0 disables)")
+    return parser.parse_args(argv)
+
+def time_import(module: str) -> float:
+    """Import module in a fresh interpreter and return the seconds it took"""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET.format(module=module)],
+        capture_output=True, text=True, check=True, env=os.environ.copy()
+    )
+    return float(output.stdout.strip().splitlines()[-1])
+
+def slowest_imports(module: str, top: int):
+    """Return (cumulative microseconds, module) for the slowest imports"""
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True, env=os.environ.copy()
+    )
+    rows = []
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = [part.strip() for part in line.split(":", 1)[1].split("|")]
+        rows.append((int(cumulative_us), name))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    timings = [time_import(args.module) * 1000 for _ in range(args.runs)]
+    median = statistics.median(timings)
+    print(f"import {args.module}: median {median:.0f}ms, min {min(timings):.0f}ms, max {max(timings):.0f}ms over {args.runs} runs")
+
+    if args.top:
+        print("\nSlowest imports (cumulative):")
+        for cumulative_us, name in slowest_imports(args.module, args.top):
+            print(f"  {cumulative_us / 1000:8.1f}ms  {name}")
+
+    if args.max_ms and median > args.max_ms:
+        print(f"\n❌ Median import time {median:.0f}ms exceeds target {args.max_ms:.0f}ms")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,32 @@
+"""
+Gunicorn configuration for production: N uvicorn workers sized from the CPU
+count, with graceful draining on shutdown.
+
+    python init_db.py && gunicorn -c gunicorn.conf.py app.main:app
+
+Migrations run once before gunicorn starts; set AUTO_CREATE_TABLES=false so the
+workers do not run them again.
+"""
+
+import multiprocessing
+import os
+
+bind = f"{os.getenv('API_HOST', '0.0.0.0')}:{os.getenv('API_PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Async workers spend most of their time waiting on the database and the LLM,
+# so one per core is enough; WEB_CONCURRENCY overrides
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+
+# Seconds a worker gets after SIGTERM to finish in-flight requests and lesson
+# generations before it is killed
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", 60))
+timeout = int(os.getenv("WORKER_TIMEOUT", 120))
+keepalive = int(os.getenv("KEEPALIVE", 5))
+
+# Recycle workers now and then to bound memory growth; jitter avoids restarting all at once
+max_requests = int(os.getenv("MAX_REQUESTS", 10000))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", 1000))
+
+accesslog = "-"
+errorlog = "-"
\ No newline at end of file
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Bulk import tool for categories, subcategories and historical prompts.
+
+Examples:
+    python import_data.py taxonomy categories.json
+    python import_data.py prompts history.csv --method copy --batch-size 5000
+
+Input may be JSON (a list of records, or a {"Category": ["Sub", ...]} mapping
+for taxonomy) or CSV with a header row. Taxonomy records use the columns
+category and subcategory; prompt records use username, category, subcategory,
+prompt, and optionally response and created_at (ISO 8601).
+
+Everything is loaded in a single transaction and names that already exist are
+skipped, so re-running the same import is safe.
+"""
+
+import argparse
+import sys
+
+from app.database import SessionLocal
+from app.services.import_service import (
+    DEFAULT_BATCH_SIZE,
+    METHOD_AUTO,
+    METHODS,
+    ImportValidationError,
+    import_prompts,
+    import_taxonomy,
+    load_records,
+)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import taxonomy and prompt history")
+    parser.add_argument("kind", choices=["taxonomy", "prompts"], help="What the input file contains")
+    parser.add_argument("path", help="JSON or CSV input file")
+    parser.add_argument("--method", choices=METHODS, default=METHOD_AUTO,
+                        help="copy (PostgreSQL COPY), insert (batched multi-row INSERT) or auto")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Rows per INSERT statement")
+    parser.add_argument("--skip-invalid", action="store_true",
+                        help="Import valid prompt rows even if some rows are invalid")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Validate and load, then roll back instead of committing")
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+    """Main import function"""
+    args = parse_args(argv)
+    records = load_records(args.path)
+    print(f"📦 Read {len(records)} records from {args.path}")
+
+    db = SessionLocal()
+    try:
+        if args.kind == "taxonomy":
+            results = import_taxonomy(db, records, method=args.method, batch_size=args.batch_size)
+        else:
+            results = [import_prompts(
+                db,
+                records,
+                method=args.method,
+                batch_size=args.batch_size,
+                skip_invalid=args.skip_invalid
+            )]
+
+        for result in results:
+            for error in result.errors[:20]:
+                print(f"  ⚠️  {error}")
+            print(f"  {result.summary()}")
+
+        if args.dry_run:
+            db.rollback()
+            print("Dry run: changes rolled back.")
+        else:
+            db.commit()
+            print("✅ Import committed.")
+        return 0
+
+    except ImportValidationError as e:
+        db.rollback()
+        print("❌ Validation failed, nothing imported:")
+        for error in e.errors[:20]:
+            print(f"  - {error}")
+        return 1
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error importing data: {e}")
+        return 1
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
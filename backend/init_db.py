@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Apply pending database migrations (alembic/versions).
+
+    python init_db.py
+
+Run this once per deploy, before the workers start. A database created before
+migrations existed is stamped at the baseline revision first. The API also
+migrates on startup unless AUTO_CREATE_TABLES=false, which is only meant for a
+single development process.
+"""
+
+from app.database import init_db
+from app.logging_config import configure_logging
+
+def main():
+    configure_logging()
+    init_db()
+    print("✅ Database schema is up to date")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Regenerate lessons that failed, fell back to the mock lesson, or got stuck:
+generating for longer than SWEEP_STUCK_MINUTES, or queued in a worker that
+is no longer running.
+
+Examples:
+    python sweep_lessons.py --dry-run
+    python sweep_lessons.py --limit 500 --concurrency 8
+    python sweep_lessons.py --loop --interval 300   # periodic job
+
+Prompts are re-enqueued at most SWEEP_MAX_ATTEMPTS times. Requests to each
+provider are paced by SWEEP_PROVIDER_RPS (e.g. "openai=2;local=0.5") and slow
+down while a provider keeps failing.
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import timedelta
+
+from app.logging_config import configure_logging
+from app.services.ai_service import close_ai_service
+from app.services.lesson_sweeper import LessonSweeper
+from app.services.template_registry import template_registry
+from app.services.worker_registry import start_worker_heartbeat, stop_worker_heartbeat
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Retry failed, fallback and stuck lessons")
+    parser.add_argument("--limit", type=int, help="Regenerate at most this many prompts per sweep")
+    parser.add_argument("--batch-size", type=int, help="Prompts fetched per query")
+    parser.add_argument("--concurrency", type=int, help="Lessons generated at once")
+    parser.add_argument("--stuck-minutes", type=int, help="Prompts generating for longer than this are retried")
+    parser.add_argument("--max-attempts", type=int, help="Skip prompts re-enqueued this many times")
+    parser.add_argument("--dry-run", action="store_true", help="Only count matching prompts")
+    parser.add_argument("--loop", action="store_true", help="Keep sweeping every --interval seconds")
+    parser.add_argument("--interval", type=float, default=300, help="Seconds between sweeps with --loop")
+    return parser.parse_args(argv)
+
+async def run(args) -> int:
+    sweeper = LessonSweeper.from_settings(
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        stuck_after=timedelta(minutes=args.stuck_minutes) if args.stuck_minutes else None,
+        max_attempts=args.max_attempts
+    )
+    # Prompts this sweep re-enqueues belong to it while it runs
+    await start_worker_heartbeat()
+    try:
+        while True:
+            progress = await sweeper.sweep(limit=args.limit, dry_run=args.dry_run)
+            print(f"🧹 {progress.summary()}")
+            if not args.loop:
+                return 0
+            await asyncio.sleep(args.interval)
+    finally:
+        await stop_worker_heartbeat()
+        await close_ai_service()
+
+def main(argv=None) -> int:
+    """Main sweep function"""
+    args = parse_args(argv)
+    configure_logging()
+    try:
+        # Compiled up front; during the run templates refresh in the background
+        template_registry.reload()
+        return asyncio.run(run(args))
+    except KeyboardInterrupt:
+        return 130
+    except Exception as e:
+        print(f"❌ Error sweeping lessons: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""No pooled database connection may be checked out while the LLM provider works"""
+import asyncio
+import os
+import tempfile
+
+# Settings are read once per process, so point them at a throwaway database before importing the app
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ["LLM_PROVIDER"] = "mock"
+os.environ["LESSON_CACHE_ENABLED"] = "false"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import SessionLocal, get_engine
+from app.main import app
+from app.models.category import Category, SubCategory
+from app.models.prompt import Prompt, STATUS_DONE
+from app.models.user import User
+from app.schemas.prompt import PromptCreate
+from app.services import ai_service as ai_service_module
+from app.services import prompt_service
+from app.services.ai_service import AIService
+from app.services.llm_providers import Completion, CompletionRequest, LLMProvider, ProviderRouter
+
+class ConnectionCheckingProvider(LLMProvider):
+    """Stub provider that fails if a connection is checked out during generation"""
+
+    name = "stub"
+    model = "stub-model"
+
+    def __init__(self):
+        self.checked_out = []
+
+    async def complete(self, request: CompletionRequest) -> Completion:
+        checked_out = get_engine().pool.checkedout()
+        self.checked_out.append(checked_out)
+        # AIService falls back to a mock lesson on errors; the tests check for STATUS_DONE as well
+        assert checked_out == 0, f"{checked_out} connection(s) held during generation"
+        return Completion(content="Stub lesson", model=self.model, prompt_tokens=10, completion_tokens=20)
+
+@pytest.fixture
+def provider(monkeypatch):
+    stub = ConnectionCheckingProvider()
+    monkeypatch.setattr(ai_service_module, "_ai_service", AIService(ProviderRouter({stub.name: stub}, stub.name)))
+    return stub
+
+@pytest.fixture
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def learner(client):
+    response = client.post("/api/auth/register", json={
+        "username": "learner",
+        "full_name": "Test Learner",
+        "password": "secret123"
+    })
+    assert response.status_code in (201, 400)
+    token = client.post("/api/auth/login", data={"username": "learner", "password": "secret123"}).json()["access_token"]
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == "learner").first()
+        category = db.query(Category).filter(Category.name == "Science").first()
+        if category is None:
+            category = Category(name="Science")
+            db.add(category)
+            db.flush()
+            db.add(SubCategory(name="Physics", category_id=category.id))
+            db.commit()
+        sub_category = db.query(SubCategory).filter(SubCategory.category_id == category.id).first()
+        return {
+            "user_id": user.id,
+            "headers": {"Authorization": f"Bearer {token}"},
+            "category_id": category.id,
+            "sub_category_id": sub_category.id,
+        }
+    finally:
+        db.close()
+
+def _prompt_status(prompt_id: int) -> str:
+    db = SessionLocal()
+    try:
+        return db.query(Prompt.status).filter(Prompt.id == prompt_id).scalar()
+    finally:
+        db.close()
+
+def test_create_prompt_route_releases_connection(client, learner, provider):
+    response = client.post("/api/prompts/", headers=learner["headers"], json={
+        "category_id": learner["category_id"],
+        "sub_category_id": learner["sub_category_id"],
+        "prompt": "Why does the moon have phases?"
+    })
+
+    assert response.status_code == 201
+    # The background generation has run by the time the test client returns
+    assert provider.checked_out == [0]
+    assert _prompt_status(response.json()["id"]) == STATUS_DONE
+
+def test_prompt_service_releases_connection(client, learner, provider):
+    prompt = asyncio.run(prompt_service.create_prompt(learner["user_id"], PromptCreate(
+        category_id=learner["category_id"],
+        sub_category_id=learner["sub_category_id"],
+        prompt="What is a black hole?"
+    )))
+
+    assert provider.checked_out == [0]
+    assert prompt.status == STATUS_DONE
+    assert prompt.response == "Stub lesson"
\ No newline at end of file
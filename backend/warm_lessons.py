@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Pre-generate lessons for the most popular prompts in each subcategory.
+
+Examples:
+    python warm_lessons.py --dry-run --force
+    python warm_lessons.py --budget 50000 --per-subcategory 5
+    python warm_lessons.py --loop --interval 3600   # periodic job, runs only off-peak
+
+Prompts asked at least WARM_MIN_COUNT times in the last WARM_LOOKBACK_DAYS are
+generated (or refreshed after WARM_REFRESH_DAYS) until WARM_TOKEN_BUDGET
+tokens are spent. Outside WARM_WINDOW (local time, e.g. "01:00-05:00") the
+job does nothing unless --force is given, and a run still going when the
+window closes stops before its next lesson. Matching prompts are then answered
+from the stored lesson without calling the LLM.
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import timedelta
+
+from app.config import get_settings
+from app.logging_config import configure_logging
+from app.services.ai_service import close_ai_service
+from app.services.lesson_cache import LessonWarmer, in_window
+from app.services.template_registry import template_registry
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate lessons for popular prompts")
+    parser.add_argument("--budget", type=int, help="Token budget per run")
+    parser.add_argument("--per-subcategory", type=int, help="Popular prompts kept per subcategory")
+    parser.add_argument("--min-count", type=int, help="Times a prompt must have been asked")
+    parser.add_argument("--lookback-days", type=int, help="History window used to rank prompts")
+    parser.add_argument("--refresh-days", type=int, help="Regenerate stored lessons older than this")
+    parser.add_argument("--force", action="store_true", help="Run even outside the off-peak window")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be generated")
+    parser.add_argument("--loop", action="store_true", help="Keep warming every --interval seconds")
+    parser.add_argument("--interval", type=float, default=3600, help="Seconds between runs with --loop")
+    return parser.parse_args(argv)
+
+async def run(args) -> int:
+    warmer = LessonWarmer.from_settings(
+        token_budget=args.budget,
+        per_subcategory=args.per_subcategory,
+        min_count=args.min_count,
+        lookback=timedelta(days=args.lookback_days) if args.lookback_days else None,
+        refresh_after=timedelta(days=args.refresh_days) if args.refresh_days else None
+    )
+    window = get_settings().warm_window
+    try:
+        while True:
+            if args.force or in_window(window):
+                progress = await warmer.warm(dry_run=args.dry_run, window=None if args.force else window)
+                print(f"🔥 {progress.summary()}")
+            else:
+                print(f"⏸️  Outside the off-peak window {window}; skipping")
+            if not args.loop:
+                return 0
+            await asyncio.sleep(args.interval)
+    finally:
+        await close_ai_service()
+
+def main(argv=None) -> int:
+    """Main warming function"""
+    args = parse_args(argv)
+    configure_logging()
+    try:
+        # Compiled up front; during the run templates refresh in the background
+        template_registry.reload()
+        return asyncio.run(run(args))
+    except KeyboardInterrupt:
+        return 130
+    except Exception as e:
+        print(f"❌ Error warming lessons: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
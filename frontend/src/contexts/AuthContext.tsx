@@ -1,6 +1,6 @@
 import React, { createContext, useContext, useState, useEffect, ReactNode } from 'react';
 import { UserProfile, LoginData, CreateUserData } from '../types';
-import { authApi, isAuthenticated } from '../services/api';
+import { authApi, bootstrapApi, isAuthenticated } from '../services/api';
 
 interface AuthContextType {
   user: UserProfile | null;
@@ -35,7 +35,8 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
   const refreshProfile = async () => {
     try {
       setIsLoading(true);
-      const profile = await authApi.getProfile();
+      // One request also prefetches the categories and history the pages need
+      const { profile } = await bootstrapApi.load();
       setUser(profile);
       setIsLoggedIn(true);
     } catch (error) {
@@ -1,5 +1,5 @@
-import React, { useState, useEffect } from 'react';
-import { categoryApi, promptApi } from '../services/api';
+import React, { useState, useEffect, useRef } from 'react';
+import { categoryApi, promptApi, lessonEvents, newIdempotencyKey } from '../services/api';
 import { Category, SubCategory, CreatePromptData, Prompt } from '../types';
 import { useAuth } from '../contexts/AuthContext';
 import LoadingSpinner from '../components/LoadingSpinner';
@@ -24,6 +24,8 @@ const LearningPage: React.FC = () => {
   
   const [submittedPrompt, setSubmittedPrompt] = useState<Prompt | null>(null);
   const [aiResponse, setAiResponse] = useState<string>('');
+  // Kept across resubmits of the same form so a retried request never generates twice
+  const idempotencyKey = useRef<string | null>(null);
 
   useEffect(() => {
     loadInitialData();
@@ -37,27 +39,46 @@ const LearningPage: React.FC = () => {
     }
   }, [formData.category_id]);
 
-  // Poll for AI response after submitting prompt
+  // Wait for the lesson_ready event instead of polling for the AI response
   useEffect(() => {
-    let pollInterval: NodeJS.Timeout;
-    
-    if (submittedPrompt && !submittedPrompt.response) {
-      pollInterval = setInterval(async () => {
-        try {
-          const updatedPrompt = await promptApi.getPrompt(submittedPrompt.id);
-          if (updatedPrompt.response) {
-            setSubmittedPrompt(updatedPrompt);
-            setAiResponse(updatedPrompt.response);
-            clearInterval(pollInterval);
-          }
-        } catch (error) {
-          console.error('Error polling for response:', error);
+    if (!submittedPrompt || submittedPrompt.response) return;
+
+    let retryTimer: ReturnType<typeof setTimeout> | null = null;
+    let cancelled = false;
+
+    // Returns whether the lesson was there
+    const loadResponse = async (): Promise<boolean> => {
+      try {
+        const updatedPrompt = await promptApi.getPrompt(submittedPrompt.id);
+        if (updatedPrompt.response && !cancelled) {
+          setSubmittedPrompt(updatedPrompt);
+          setAiResponse(updatedPrompt.response);
+          return true;
         }
-      }, 2000);
-    }
+      } catch (error) {
+        console.error('Error loading response:', error);
+      }
+      return false;
+    };
+
+    // The event can arrive before the lesson is readable; retry a few times with backoff
+    const loadReadyResponse = async (attempt: number = 0) => {
+      if (cancelled || (await loadResponse()) || attempt >= 5) return;
+      retryTimer = setTimeout(() => loadReadyResponse(attempt + 1), 500 * 2 ** attempt);
+    };
+
+    const unsubscribe = lessonEvents.subscribe((event) => {
+      if (event.prompt_id === submittedPrompt.id) {
+        loadReadyResponse();
+      }
+    });
+    // The lesson may have been stored before the socket opened
+    loadResponse();
 
     return () => {
-      if (pollInterval) clearInterval(pollInterval);
+      cancelled = true;
+      if (retryTimer) clearTimeout(retryTimer);
+      unsubscribe();
     };
   }, [submittedPrompt]);
 
@@ -91,6 +112,7 @@ const LearningPage: React.FC = () => {
 
   const handleInputChange = (e: React.ChangeEvent<HTMLInputElement | HTMLSelectElement | HTMLTextAreaElement>) => {
     const { name, value } = e.target;
+    idempotencyKey.current = null;
     setFormData(prev => ({
       ...prev,
       [name]: value,
@@ -118,13 +140,22 @@ const LearningPage: React.FC = () => {
         prompt: formData.prompt.trim()
       };
 
-      const createdPrompt = await promptApi.createPrompt(promptData);
+      if (!idempotencyKey.current) {
+        idempotencyKey.current = newIdempotencyKey();
+      }
+      const createdPrompt = await promptApi.createPrompt(promptData, idempotencyKey.current);
+      idempotencyKey.current = null;
       setSubmittedPrompt(createdPrompt);
       
-      setAlert({
-        type: 'info',
-        message: 'Prompt submitted! AI is generating your lesson...'
-      });
+      if (createdPrompt.response) {
+        // Popular prompts are answered from pre-generated lessons straight away
+        setAiResponse(createdPrompt.response);
+      } else {
+        setAlert({
+          type: 'info',
+          message: 'Prompt submitted! AI is generating your lesson...'
+        });
+      }
 
       // Reset form
       setFormData({
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { User, Category, Prompt, CreateUserData, CreatePromptData, LoginData, AuthToken, UserProfile } from '../types';
+import { User, Category, Prompt, CreateUserData, CreatePromptData, LoginData, AuthToken, UserProfile, LessonReadyEvent, Bootstrap } from '../types';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000';
 
@@ -15,13 +15,21 @@ const getToken = (): string | null => {
   return localStorage.getItem('access_token');
 };
 
-const setToken = (token: string): void => {
+const getRefreshToken = (): string | null => {
+  return localStorage.getItem('refresh_token');
+};
+
+const setToken = (token: string, refreshToken?: string | null): void => {
   localStorage.setItem('access_token', token);
+  if (refreshToken) {
+    localStorage.setItem('refresh_token', refreshToken);
+  }
   api.defaults.headers.common['Authorization'] = `Bearer ${token}`;
 };
 
 const removeToken = (): void => {
   localStorage.removeItem('access_token');
+  localStorage.removeItem('refresh_token');
   delete api.defaults.headers.common['Authorization'];
 };
 
@@ -31,12 +39,73 @@ if (token) {
   api.defaults.headers.common['Authorization'] = `Bearer ${token}`;
 }
 
+// Read-your-writes: the API reports when a request wrote (X-Last-Write) and keeps reads
+// on the primary database for a few seconds after the time we send back
+const LAST_WRITE_KEY = 'last_write';
+
+api.interceptors.request.use((config) => {
+  const lastWrite = sessionStorage.getItem(LAST_WRITE_KEY);
+  if (lastWrite) {
+    config.headers['X-Last-Write'] = lastWrite;
+  }
+  return config;
+});
+
+const rememberLastWrite = (headers: any): void => {
+  const lastWrite = headers?.['x-last-write'];
+  if (lastWrite && Number(lastWrite) > Number(sessionStorage.getItem(LAST_WRITE_KEY) || 0)) {
+    sessionStorage.setItem(LAST_WRITE_KEY, lastWrite);
+  }
+};
+
+// Refresh tokens rotate on every use, so concurrent 401s share one refresh request
+let refreshRequest: Promise<string> | null = null;
+
+const refreshAccessToken = (): Promise<string> => {
+  if (!refreshRequest) {
+    const refreshToken = getRefreshToken();
+    if (!refreshToken) {
+      return Promise.reject(new Error('No refresh token'));
+    }
+    refreshRequest = axios
+      .post<AuthToken>(`${API_BASE_URL}/api/auth/refresh`, { refresh_token: refreshToken })
+      .then((response) => {
+        setToken(response.data.access_token, response.data.refresh_token);
+        return response.data.access_token;
+      })
+      .finally(() => {
+        refreshRequest = null;
+      });
+  }
+  return refreshRequest;
+};
+
+// Categories and history from the last /bootstrap call, handed to the first page that asks
+let bootstrapped: { categories?: Category[]; history?: Prompt[] } = {};
+
 // Add response interceptor for error handling
 api.interceptors.response.use(
-  (response) => response,
-  (error) => {
-    if (error.response?.status === 401) {
-      // Token expired or invalid, remove it and redirect to login
+  (response) => {
+    rememberLastWrite(response.headers);
+    return response;
+  },
+  async (error) => {
+    rememberLastWrite(error.response?.headers);
+    const original = error.config;
+    const isAuthRequest = original?.url?.startsWith('/auth/login') || original?.url?.startsWith('/auth/refresh');
+    if (error.response?.status === 401 && original && !original._retried && !isAuthRequest && getRefreshToken()) {
+      // Access token expired: renew it with the refresh token and replay the request once
+      original._retried = true;
+      try {
+        const accessToken = await refreshAccessToken();
+        original.headers['Authorization'] = `Bearer ${accessToken}`;
+        return api(original);
+      } catch {
+        // Fall through to the login redirect below
+      }
+    }
+    if (error.response?.status === 401 && !isAuthRequest) {
+      // Session expired or revoked, remove it and redirect to login
       removeToken();
       window.location.href = '/login';
     }
@@ -60,7 +129,7 @@ export const authApi = {
     });
     
     const token = response.data;
-    setToken(token.access_token);
+    setToken(token.access_token, token.refresh_token);
     return token;
   },
 
@@ -75,6 +144,12 @@ export const authApi = {
   },
 
   logout: (): void => {
+    bootstrapped = {};
+    // Revoke the session server-side; the local tokens are dropped either way
+    const refreshToken = getRefreshToken();
+    if (refreshToken) {
+      api.post('/auth/logout', { refresh_token: refreshToken }).catch(() => undefined);
+    }
     removeToken();
   },
 
@@ -84,6 +159,15 @@ export const authApi = {
   },
 };
 
+// Profile, categories and the first history page in one request
+export const bootstrapApi = {
+  load: async (): Promise<Bootstrap> => {
+    const response = await api.get('/bootstrap');
+    bootstrapped = { categories: response.data.categories, history: response.data.history };
+    return response.data;
+  },
+};
+
 // User API endpoints
 export const userApi = {
   getUsers: async (): Promise<User[]> => {
@@ -109,6 +193,11 @@ export const userApi = {
 // Category API endpoints
 export const categoryApi = {
   getCategories: async (): Promise<Category[]> => {
+    const { categories } = bootstrapped;
+    if (categories) {
+      bootstrapped.categories = undefined;
+      return categories;
+    }
     const response = await api.get('/categories/');
     return response.data;
   },
@@ -126,8 +215,12 @@ export const categoryApi = {
 
 // Prompt API endpoints
 export const promptApi = {
-  createPrompt: async (promptData: CreatePromptData): Promise<Prompt> => {
-    const response = await api.post('/prompts/', promptData);
+  // Resending with the same idempotencyKey returns the original prompt instead of generating again
+  createPrompt: async (promptData: CreatePromptData, idempotencyKey?: string): Promise<Prompt> => {
+    // The bootstrapped history no longer includes everything
+    bootstrapped.history = undefined;
+    const headers = idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : undefined;
+    const response = await api.post('/prompts/', promptData, { headers });
     return response.data;
   },
 
@@ -138,6 +231,11 @@ export const promptApi = {
   },
 
   getMyPrompts: async (): Promise<Prompt[]> => {
+    const { history } = bootstrapped;
+    if (history) {
+      bootstrapped.history = undefined;
+      return history;
+    }
     const response = await api.get('/prompts/my-prompts');
     return response.data;
   },
@@ -153,7 +251,69 @@ export const promptApi = {
   },
 };
 
+// Lesson notifications over WebSocket (replaces polling for AI responses)
+export const lessonEvents = {
+  // Calls onLessonReady for each completed lesson; returns a function that closes the connection
+  subscribe: (onLessonReady: (event: LessonReadyEvent) => void): (() => void) => {
+    const wsBaseUrl = API_BASE_URL.replace(/^http/, 'ws');
+    let socket: WebSocket | null = null;
+    let lastEventId: number | null = null;
+    // Events can commit out of id order and replays overlap, so skip ids already delivered
+    const seenIds = new Set<number>();
+    let retryDelay = 1000;
+    let retryTimer: ReturnType<typeof setTimeout> | null = null;
+    let closed = false;
+
+    const connect = () => {
+      const token = getToken();
+      if (!token || closed) return;
+      // Reconnects ask for the events missed while disconnected
+      const since = lastEventId !== null ? `&since=${lastEventId}` : '';
+      socket = new WebSocket(`${wsBaseUrl}/api/ws/lessons?token=${encodeURIComponent(token)}${since}`);
+
+      socket.onopen = () => {
+        retryDelay = 1000;
+      };
+      socket.onmessage = (message) => {
+        const event: LessonReadyEvent = JSON.parse(message.data);
+        if (seenIds.has(event.id)) return;
+        seenIds.add(event.id);
+        if (seenIds.size > 1000) {
+          // Sets iterate in insertion order, so this forgets the oldest id
+          seenIds.delete(seenIds.values().next().value as number);
+        }
+        lastEventId = Math.max(lastEventId ?? 0, event.id);
+        onLessonReady(event);
+      };
+      socket.onclose = (event) => {
+        if (closed) return;
+        if (event.code === 1008) {
+          // Rejected token: renew it before reconnecting
+          refreshAccessToken().then(connect, () => undefined);
+          return;
+        }
+        retryTimer = setTimeout(connect, retryDelay);
+        retryDelay = Math.min(retryDelay * 2, 30000);
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      if (retryTimer) clearTimeout(retryTimer);
+      socket?.close();
+    };
+  },
+};
+
 // Utility functions
+export const newIdempotencyKey = (): string => {
+  if (typeof crypto !== 'undefined' && 'randomUUID' in crypto) {
+    return crypto.randomUUID();
+  }
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+};
+
 export const isAuthenticated = (): boolean => {
   return !!getToken();
 };
@@ -167,5 +327,5 @@ export const isAdmin = async (): Promise<boolean> => {
   }
 };
 
-export { getToken, setToken, removeToken };
+export { getToken, getRefreshToken, setToken, removeToken };
 export default api;
\ No newline at end of file
@@ -60,6 +60,7 @@ export interface CreatePromptData {
 export interface AuthToken {
   access_token: string;
   token_type: string;
+  refresh_token?: string;
 }
 
 export interface UserProfile {
@@ -72,6 +73,19 @@ export interface UserProfile {
   created_at: string;
 }
 
+export interface Bootstrap {
+  profile: UserProfile;
+  categories: Category[];
+  history: Prompt[];
+}
+
+export interface LessonReadyEvent {
+  type: 'lesson_ready';
+  id: number;
+  user_id: number;
+  prompt_id: number;
+}
+
 export interface ApiResponse<T> {
   data: T;
   message?: string;